@@ -11,6 +11,7 @@ setup(
     author_email = 'email+labic.net@gustavorps.net, ligiaiv@gmail.com',
     license = 'MIT',
     packages = find_packages(),
+    package_data = {'ze.spiders': ['manifest.json']},
     entry_points = {
         'scrapy': ['settings = ze.settings'],
         'scrapy.commands': [
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+
+from twisted.internet import defer
+from scrapy import Item, Field
+
+from ze.utils.bodystore import BodyStore
+
+
+class Story(Item):
+    url = Field()
+    articleBody = Field()
+    articleBodyDigest = Field()
+    articleBodyExcerpt = Field()
+
+
+class BodyStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = BodyStore('file://' + self.tmp_dir, excerpt_length=20)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_content_addressed(self):
+        digest = self.store.digest('<p>body</p>')
+        self.assertEqual(digest, self.store.digest('<p>body</p>'))
+        self.assertNotEqual(digest, self.store.digest('<p>other body</p>'))
+        self.assertEqual(self.store.path(digest),
+                         '%s/%s/%s.html.gz' % (digest[:2], digest[2:4], digest))
+
+    def test_excerpt_on_word_boundary(self):
+        self.assertEqual(self.store.excerpt('<p>short</p>'), 'short')
+        self.assertEqual(self.store.excerpt('<p>one two\n three</p> <p>four five six</p>'),
+                         'one two three four…')
+
+    def test_compressed_deterministic(self):
+        body = 'ação ' * 100
+        self.assertEqual(self.store.compress(body), self.store.compress(body))
+        self.assertEqual(gzip.decompress(self.store.compress(body)).decode('utf-8'), body)
+
+    def test_stored_once(self):
+        digest = self.store.digest('<p>body</p>')
+        self.assertTrue(self.store._put(digest, '<p>body</p>'))
+        self.assertFalse(self.store._put(digest, '<p>body</p>'))
+        self.assertEqual(self.store.get(digest), '<p>body</p>')
+        self.assertEqual(os.listdir(os.path.dirname(os.path.join(self.tmp_dir,
+                                                                 self.store.path(digest)))),
+                         [digest + '.html.gz'])
+
+    def test_sink_values(self):
+        item = Story(url='http://g1.globo.com/a', articleBody='<p>body</p>',
+                     articleBodyDigest='digest', articleBodyExcerpt='body')
+        self.assertEqual(self.store.sink_values(item), {
+            'url': 'http://g1.globo.com/a', 'articleBodyDigest': 'digest',
+            'articleBodyExcerpt': 'body'})
+        self.store.inline_bodies = True
+        self.assertEqual(self.store.sink_values(item), {
+            'url': 'http://g1.globo.com/a', 'articleBody': '<p>body</p>'})
+        # not stored, the body is inline to all sinks
+        self.store.inline_bodies = False
+        self.assertEqual(self.store.sink_values(Story(articleBody='<p>body</p>')),
+                         {'articleBody': '<p>body</p>'})
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.values = {}
+
+    def inc_value(self, key, count=1):
+        self.values[key] = self.values.get(key, 0) + count
+
+
+class PipelineStore(object):
+    """Puts fired by the tests"""
+
+    fields = ('articleBody',)
+
+    def __init__(self):
+        self.puts = []
+        self.store = BodyStore('bodies', excerpt_length=20)
+
+    def digest(self, body):
+        return self.store.digest(body)
+
+    def excerpt(self, body):
+        return self.store.excerpt(body)
+
+    def put(self, digest, body):
+        d = defer.Deferred()
+        self.puts.append(d)
+        return d
+
+
+class BodyStorePipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        # the pipelines need the packages of requirements.txt
+        try:
+            from ze.pipelines import BodyStorePipeline
+        except ImportError as e:
+            raise unittest.SkipTest(str(e))
+        from scrapy.settings import Settings
+        settings = Settings({'BODY_STORE_ENABLED': True, 'BODY_STORE_URI': 'bodies',
+                             'BODY_STORE_FIELDS': 'articleBody'})
+        self.pipeline = BodyStorePipeline(settings, Stats())
+        self.pipeline.store = PipelineStore()
+
+    def process(self, body):
+        item = Story(url='http://g1.globo.com/a', articleBody=body)
+        results = []
+        defer.maybeDeferred(self.pipeline.process_item, item, None).addCallback(results.append)
+        return item, results
+
+    def test_moved_when_stored(self):
+        item, results = self.process('<p>body</p>')
+        self.assertEqual(results, [])
+        self.pipeline.store.puts[0].callback(True)
+        self.assertEqual(results, [item])
+        self.assertNotIn('articleBody', item)
+        self.assertEqual(item['articleBodyExcerpt'], 'body')
+
+    def test_duplicates_wait_the_put(self):
+        first, first_results = self.process('<p>body</p>')
+        second, second_results = self.process('<p>body</p>')
+        self.assertEqual(len(self.pipeline.store.puts), 1)
+        self.pipeline.store.puts[0].errback(IOError('unavailable'))
+        self.assertEqual(first_results, [first])
+        self.assertEqual(second_results, [second])
+        for item in (first, second):
+            self.assertEqual(dict(item), {'url': 'http://g1.globo.com/a',
+                                          'articleBody': '<p>body</p>'})
+
+        third, _ = self.process('<p>body</p>')
+        self.pipeline.store.puts[1].callback(True)
+        self.assertEqual(self.pipeline.digests, {})
+        # stored ones are found by the store
+        fourth, results = self.process('<p>body</p>')
+        self.pipeline.store.puts[2].callback(False)
+        self.assertEqual(results, [fourth])
+        self.assertEqual(fourth['articleBodyDigest'], third['articleBodyDigest'])
+        self.assertEqual(self.pipeline.stats.values['body_store/duplicated_count'], 2)
+
+    def test_bodies_kept_for_inline_sinks(self):
+        self.pipeline.keep_bodies = True
+        item, _ = self.process('<p>body</p>')
+        self.pipeline.store.puts[0].callback(True)
+        self.assertEqual(item['articleBody'], '<p>body</p>')
+        self.assertIn('articleBodyDigest', item)
+
+    def test_undeclared_fields_not_configured(self):
+        from scrapy.exceptions import NotConfigured
+
+        class Video(Item):
+            transcript = Field()
+            transcriptDigest = Field()
+
+        self.pipeline.store.fields = ('articleBody', 'transcript')
+        self.pipeline.check_item_classes([Story])
+        with self.assertRaisesRegex(NotConfigured, r'Video\.transcriptExcerpt'):
+            self.pipeline.check_item_classes([Story, Video])
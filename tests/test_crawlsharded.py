@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import unittest
+from datetime import datetime
+
+import pytest
+
+# the command imports the spiders, that need the requirements.txt
+crawlsharded = pytest.importorskip('ze.commands.crawlsharded')
+
+
+class MergeStatsTest(unittest.TestCase):
+
+    def test_counts_summed_maxima_and_gauges_greatest(self):
+        stats = crawlsharded.merge_stats([
+            {'item_scraped_count': 3, 'memusage/max': 100, 'memusage/startup': 50,
+             'request_depth_max': 2, 'timing/g1/parse/p95_ms': 12.5,
+             'adaptive_concurrency/g1.globo.com/max_concurrency': 4,
+             'start_time': datetime(2017, 1, 1, 10), 'finish_time': datetime(2017, 1, 1, 11)},
+            {'item_scraped_count': 4, 'memusage/max': 80, 'memusage/startup': 60,
+             'request_depth_max': 3, 'timing/g1/parse/p95_ms': 10.0,
+             'adaptive_concurrency/g1.globo.com/max_concurrency': 6,
+             'start_time': datetime(2017, 1, 1, 9), 'finish_time': datetime(2017, 1, 1, 12)},
+        ])
+        self.assertEqual(stats, {
+            'item_scraped_count': 7, 'memusage/max': 100, 'memusage/startup': 60,
+            'request_depth_max': 3, 'timing/g1/parse/p95_ms': 12.5,
+            'adaptive_concurrency/g1.globo.com/max_concurrency': 6,
+            'start_time': datetime(2017, 1, 1, 9), 'finish_time': datetime(2017, 1, 1, 12),
+        })
+
+    def test_counts_with_max_in_words_summed(self):
+        self.assertIsNone(crawlsharded.MAXIMUM_STATS.search('spider/maxima/json_ld/count'))
+        self.assertIsNone(crawlsharded.MAXIMUM_STATS.search('downloader/response_bytes'))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import pytest
+from scrapy import Field
+from scrapy.settings import Settings
+
+# the items need the loader of scrapy 1.x and the packages of requirements.txt
+items = pytest.importorskip('ze.items')
+pipelines = pytest.importorskip('ze.pipelines')
+from scrapy.loader.processors import MapCompose, TakeFirst
+from ze.exceptions import EmptyFields
+
+
+def improve(value):
+    return None if 'junk' in value else value.upper()
+
+
+class DeferredItem(items.BaseItem):
+    url = Field()
+    dateCreated = Field()
+    body = Field(input_processor=MapCompose(improve), output_processor=TakeFirst(),
+                 required=True, deferred=True)
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.values = {}
+
+    def inc_value(self, key, count=1):
+        self.values[key] = self.values.get(key, 0) + count
+
+
+def load(defer_processors, *values):
+    loader = items.ItemLoader(DeferredItem(url='http://example.com/'),
+                              defer_processors=defer_processors)
+    for value in values:
+        loader.add_value('body', value)
+    return loader.load_item()
+
+
+class DeferredProcessorTest(unittest.TestCase):
+
+    def test_same_value_as_loading(self):
+        for values in ((['junk', 'a'], 'b'), (['a'],), (['junk'], 'b')):
+            item = load(True, *values)
+            context, calls = item._deferred['body']
+            items.run_deferred_processor(item, 'body', calls, context)
+            self.assertEqual(item['body'], load(False, *values)['body'])
+
+    def test_raw_values_while_deferred(self):
+        item = load(True, ['junk', 'a'])
+        self.assertEqual(item['body'], 'junk')
+        self.assertFalse(hasattr(load(False, ['a']), '_deferred'))
+
+    def test_empty_value_removed(self):
+        item = load(True, ['junk'])
+        context, calls = item._deferred['body']
+        items.run_deferred_processor(item, 'body', calls, context)
+        self.assertNotIn('body', item)
+
+
+class DeferredProcessorsPipelineTest(unittest.TestCase):
+
+    def pipeline(self, **settings):
+        settings = Settings(dict(settings, DEFERRED_PROCESSORS_ENABLED=True))
+        return pipelines.DeferredProcessorsPipeline(settings=settings, stats=Stats())
+
+    def test_empty_required_kept_without_drop(self):
+        item = self.pipeline().process_item(load(True, ['junk']), None)
+        self.assertNotIn('body', item)
+
+    def test_empty_required_dropped(self):
+        pipeline = self.pipeline(DROP_ITEM_PIPELINE_ENABLED=True,
+                                 DROP_ITEM_PIPELINE_VALIDATIONS='empty_required_fields')
+        self.assertRaises(EmptyFields, pipeline.process_item, load(True, ['junk']), None)
+        self.assertEqual(pipeline.process_item(load(True, ['a']), None)['body'], 'A')
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from scrapy.http import Request, Response
+from scrapy.settings import Settings
+from scrapy.exceptions import IgnoreRequest
+
+from ze import settings as ze_settings
+from ze.middlewares.downloader.earlyabort import EarlyAbortMiddleware
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.values = {}
+
+    def inc_value(self, key, count=1):
+        self.values[key] = self.values.get(key, 0) + count
+
+
+class Spider(object):
+    name = 'spider'
+
+
+class EarlyAbortMiddlewareTest(unittest.TestCase):
+
+    def setUp(self):
+        settings = Settings()
+        settings.setmodule(ze_settings)
+        settings.set('EARLY_ABORT_ENABLED', True)
+        self.mw = EarlyAbortMiddleware(settings, Stats())
+
+    def response(self, content_type):
+        request = Request('http://example.com/page')
+        return request, Response(request.url, request=request,
+                                 headers={'Content-Type': content_type})
+
+    def test_pages_and_json_pass(self):
+        for content_type in ('text/html; charset=utf-8', 'application/json'):
+            request, response = self.response(content_type)
+            self.assertIs(self.mw.process_response(request, response, Spider()), response)
+
+    def test_media_is_ignored(self):
+        request, response = self.response('application/pdf')
+        self.assertRaises(IgnoreRequest, self.mw.process_response, request, response, Spider())
+        self.assertRaises(IgnoreRequest, self.mw.process_request,
+                          Request('http://example.com/edition.pdf'), Spider())
+
+    def test_spider_without_early_abort(self):
+        spider = Spider(); spider.early_abort = False
+        request, response = self.response('application/pdf')
+        self.assertIs(self.mw.process_response(request, response, spider), response)
+
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import unittest
+
+import pytest
+from twisted.internet import defer
+from twisted.web.test.requesthelper import DummyRequest
+from scrapy.settings import Settings
+
+# the service runs the spiders, that need the packages of requirements.txt
+serve = pytest.importorskip('ze.commands.serve')
+from ze.utils.extraction import Extractor, extract
+
+
+PAGE = '''<html><head>
+<meta charset="utf-8">
+<meta property="og:title" content="São Paulo tem chuva forte">
+</head><body><div itemprop="articleBody"><p>Ação da defesa civil</p></div></body></html>'''
+
+
+class ExtractorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        settings = Settings()
+        settings.setmodule('ze.settings')
+        settings.set('DEFERRED_PROCESSORS_ENABLED', False)
+        cls.extractor = Extractor(settings)
+
+    def test_encoding_of_the_page_meta(self):
+        # no charset on the headers, the meta of the page is used
+        result = self.extractor.extract('http://g1.globo.com/sp/noticia/a.html',
+                                        PAGE.encode('utf-8'), {b'Content-Type': [b'text/html']})
+        self.assertEqual(result['spider'], 'g1')
+        (item,) = result['items']
+        self.assertEqual(item['name'], 'São Paulo tem chuva forte')
+        self.assertIn('parse', result['timing'])
+
+    def test_unknown_domain(self):
+        self.assertRaises(LookupError, self.extractor.extract, 'http://example.com/', b'')
+
+
+class Registry(object):
+
+    def spider_name(self, url):
+        return 'g1' if url.startswith('http://g1.globo.com/') else None
+
+
+class Fetcher(object):
+
+    def __init__(self, page=None, error=None):
+        self.page = page
+        self.error = error
+        self.urls = []
+
+    def fetch(self, url):
+        self.urls.append(url)
+        if self.error:
+            return defer.fail(self.error)
+        return defer.succeed(self.page)
+
+
+class ProcessPool(object):
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def submit(self, func, *args):
+        self.calls.append((func, args))
+        if self.error:
+            return defer.fail(self.error)
+        return defer.succeed({'url': args[0], 'spider': 'g1', 'items': [],
+                              'timing': {'parse': 0.1}})
+
+
+class ExtractResourceTest(unittest.TestCase):
+
+    def render(self, process_pool, fetcher, url=None, html=None):
+        resource = serve.ExtractResource(process_pool, fetcher, Registry())
+        request = DummyRequest([b'extract'])
+        request._disconnected = False
+        if html is None:
+            request.args = {b'url': [url.encode('utf-8')]}
+        else:
+            request.method = b'POST'
+            request.content = io.BytesIO(json.dumps({'url': url, 'html': html}).encode('utf-8'))
+        body = resource.render(request)
+        if isinstance(body, bytes):
+            request.write(body)
+        return request.responseCode or 200, json.loads(b''.join(request.written).decode('utf-8'))
+
+    def test_fetched_on_the_reactor_parsed_on_the_pool(self):
+        page = ('http://g1.globo.com/a', b'<html></html>', {b'Content-Type': [b'text/html']})
+        pool = ProcessPool()
+        status, data = self.render(pool, Fetcher(page), 'http://g1.globo.com/a')
+        self.assertEqual(status, 200)
+        self.assertEqual(pool.calls, [(extract, page)])
+        self.assertEqual(sorted(data['timing']), ['fetch', 'parse'])
+
+    def test_html_not_fetched(self):
+        pool, fetcher = ProcessPool(), Fetcher()
+        status, _ = self.render(pool, fetcher, 'http://g1.globo.com/a', html=PAGE)
+        self.assertEqual(status, 200)
+        self.assertEqual(fetcher.urls, [])
+        ((_, (url, body, headers)),) = pool.calls
+        self.assertEqual(body.decode('utf-8'), PAGE)
+
+    def test_unknown_domain_not_found(self):
+        pool, fetcher = ProcessPool(), Fetcher()
+        status, data = self.render(pool, fetcher, 'http://example.com/a')
+        self.assertEqual(status, 404)
+        self.assertEqual((fetcher.urls, pool.calls), ([], []))
+
+    def test_redirected_to_unknown_domain_not_found(self):
+        status, _ = self.render(ProcessPool(LookupError('example.com')),
+                                Fetcher(('http://example.com/a', b'', {})),
+                                'http://g1.globo.com/a')
+        self.assertEqual(status, 404)
+
+    def test_fetch_failed_bad_gateway(self):
+        status, data = self.render(ProcessPool(), Fetcher(error=IOError('503 Service Unavailable')),
+                                   'http://g1.globo.com/a')
+        self.assertEqual(status, 502)
+        self.assertEqual(data['error'], '503 Service Unavailable')
+
+    def test_missing_url(self):
+        status, _ = self.render(ProcessPool(), Fetcher(), '')
+        self.assertEqual(status, 400)
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from scrapy.http import Request
+
+from ze.frontier.backends import MemoryFrontier, SQLiteFrontier, RedisFrontier
+
+
+class FrontierTestMixin(object):
+
+    def frontier(self, **kwargs):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.frontiers = []
+
+    def tearDown(self):
+        for frontier in self.frontiers:
+            frontier.close()
+
+    def open(self, **kwargs):
+        frontier = self.frontier(**kwargs)
+        frontier.open()
+        self.frontiers.append(frontier)
+        return frontier
+
+    def test_duplicates_filtered_by_all_nodes(self):
+        a, b = self.open(), self.open()
+        self.assertEqual(a.push([('f1', 'g1.globo.com', 0, b'1'),
+                                 ('f1', 'g1.globo.com', 0, b'1'),
+                                 (None, 'g1.globo.com', 0, b'2'),
+                                 (None, 'g1.globo.com', 0, b'2')]), [1])
+        self.assertEqual(b.push([('f1', 'g1.globo.com', 0, b'1'),
+                                 ('f2', 'g1.globo.com', 0, b'3')]), [0])
+        self.assertEqual(sorted(a.lease('a', 10)), [b'1', b'2', b'2', b'3'])
+
+    def test_seen_expire(self):
+        frontier = self.open(seen_ttl=0.2)
+        self.assertEqual(frontier.push([('f1', 'g1.globo.com', 0, b'1')]), [])
+        self.assertEqual(frontier.push([('f1', 'g1.globo.com', 0, b'1')]), [0])
+        time.sleep(0.3)
+        self.assertEqual(frontier.push([('f1', 'g1.globo.com', 0, b'1')]), [])
+
+    def test_lease_by_priority(self):
+        frontier = self.open()
+        frontier.push([(None, 'g1.globo.com', 0, b'low'), (None, 'g1.globo.com', 10, b'high'),
+                       (None, 'g1.globo.com', 5, b'mid')])
+        self.assertEqual(frontier.lease('a', 2), [b'high', b'mid'])
+        self.assertEqual(frontier.lease('a', 2), [b'low'])
+        self.assertFalse(frontier.has_pending())
+
+    def test_partitions_leased_by_one_node(self):
+        a, b = self.open(max_partitions=1), self.open(max_partitions=1)
+        a.push([(None, 'g1.globo.com', 0, b'1'), (None, 'g1.globo.com', 0, b'2'),
+                (None, 'extra.globo.com', 0, b'3')])
+        self.assertEqual(sorted(a.lease('a', 1) + b.lease('b', 1)), [b'1', b'3'])
+        self.assertEqual(a.lease('a', 1) + b.lease('b', 1), [b'2'])
+        self.assertFalse(a.has_pending())
+
+    def test_expired_leases_taken(self):
+        a, b = self.open(lease_ttl=0.2), self.open(lease_ttl=0.2)
+        a.push([(None, 'g1.globo.com', 0, b'1'), (None, 'g1.globo.com', 0, b'2')])
+        self.assertEqual(a.lease('a', 1), [b'1'])
+        self.assertEqual(b.lease('b', 1), [])
+        time.sleep(0.3)
+        self.assertEqual(b.lease('b', 1), [b'2'])
+
+    def test_released_leases_taken(self):
+        a, b = self.open(), self.open()
+        a.push([(None, 'g1.globo.com', 0, b'1'), (None, 'g1.globo.com', 0, b'2')])
+        self.assertEqual(a.lease('a', 1), [b'1'])
+        a.release('a')
+        self.assertEqual(b.lease('b', 1), [b'2'])
+
+
+class MemoryFrontierTest(FrontierTestMixin, unittest.TestCase):
+
+    def frontier(self, **kwargs):
+        return MemoryFrontier(self.id(), **kwargs)
+
+    def tearDown(self):
+        MemoryFrontier._stores.pop(self.id(), None)
+
+
+class SQLiteFrontierTest(FrontierTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        super(SQLiteFrontierTest, self).setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(SQLiteFrontierTest, self).tearDown()
+        shutil.rmtree(self.tmp_dir)
+
+    def frontier(self, **kwargs):
+        return SQLiteFrontier('sqlite:///' + os.path.join(self.tmp_dir, 'frontier.db'), **kwargs)
+
+
+class RedisFrontierTest(FrontierTestMixin, unittest.TestCase):
+
+    def setUp(self):
+        super(RedisFrontierTest, self).setUp()
+        try:
+            import fakeredis
+        except ImportError as e:
+            raise unittest.SkipTest(str(e))
+        self.server = fakeredis.FakeServer()
+        self.fakeredis = fakeredis
+
+    def frontier(self, **kwargs):
+        frontier = RedisFrontier(**kwargs)
+        frontier.redis = self.fakeredis.FakeStrictRedis(server=self.server)
+        return frontier
+
+    def test_seen_expire(self):
+        # fingerprints are remembered from seen_ttl to twice that
+        frontier = self.open(seen_ttl=0.2)
+        self.assertEqual(frontier.push([('f1', 'g1.globo.com', 0, b'1')]), [])
+        self.assertEqual(frontier.push([('f1', 'g1.globo.com', 0, b'1')]), [0])
+        time.sleep(0.45)
+        self.assertEqual(frontier.push([('f1', 'g1.globo.com', 0, b'1')]), [])
+
+    def test_partition_kept_when_pushed_while_emptied(self):
+        a, b = self.open(), self.open()
+        a.push([(None, 'g1.globo.com', 0, b'1')])
+        pipeline = a.redis.pipeline
+
+        def pushing_pipeline(*args, **kwargs):
+            # b pushes after a sees the queue empty, before a removes the partition
+            pipe = pipeline(*args, **kwargs)
+            multi = pipe.multi
+            def push_and_multi():
+                b.push([(None, 'g1.globo.com', 0, b'2')])
+                multi()
+            pipe.multi = push_and_multi
+            return pipe
+        a.redis.pipeline = pushing_pipeline
+
+        self.assertEqual(a.lease('a', 10), [b'1'])
+        a.redis.pipeline = pipeline
+        self.assertTrue(b.has_pending())
+        self.assertEqual(a.lease('a', 10), [b'2'])
+        self.assertFalse(a.has_pending())
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.values = {}
+
+    def inc_value(self, key, count=1, spider=None):
+        self.values[key] = self.values.get(key, 0) + count
+
+
+class DupeFilter(object):
+
+    def __init__(self):
+        self.logged = []
+
+    def request_seen(self, request):
+        return False
+
+    def log(self, request, spider):
+        self.logged.append(request.url)
+
+
+class Queue(object):
+
+    def __init__(self):
+        self.requests = []
+
+    def push(self, request, priority=0):
+        self.requests.append(request)
+
+    def pop(self):
+        return self.requests.pop(0) if self.requests else None
+
+    def __len__(self):
+        return len(self.requests)
+
+
+class FrontierSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            from ze.frontier.scheduler import FrontierScheduler
+        except ImportError as e:
+            raise unittest.SkipTest(str(e))
+        from scrapy import Spider
+        from twisted.internet import defer, threads
+        # frontier calls answered on the reactor thread
+        patcher = mock.patch.object(threads, 'deferToThread', defer.maybeDeferred)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.frontier = MemoryFrontier(self.id())
+        self.addCleanup(MemoryFrontier._stores.pop, self.id(), None)
+        self.scheduler = self.open(FrontierScheduler, Spider('g1'), 'a')
+
+    def open(self, scheduler_cls, spider, node):
+        # the state set by FrontierScheduler.open, without the loops
+        scheduler = scheduler_cls.__new__(scheduler_cls)
+        scheduler.frontier, scheduler.node, scheduler.spider = self.frontier, node, spider
+        scheduler.batch_size, scheduler.lease_interval = 2, 0
+        scheduler.crawler = mock.Mock(engine=mock.Mock(slot=None))
+        scheduler.stats, scheduler.df, scheduler.mqs = Stats(), DupeFilter(), Queue()
+        scheduler.pushing, scheduler.calls, scheduler.leasing = [], 0, False
+        scheduler.last_lease, scheduler.frontier_pending = 0, True
+        return scheduler
+
+    def test_pushed_by_batch(self):
+        self.assertTrue(self.scheduler.enqueue_request(Request('http://g1.globo.com/1')))
+        self.assertFalse(self.frontier.has_pending())
+        self.scheduler.enqueue_request(Request('http://g1.globo.com/1'))
+        self.assertEqual(self.scheduler.pushing, [])
+        self.assertTrue(self.frontier.has_pending())
+        self.assertEqual(self.scheduler.stats.values, {
+            'frontier/pushed_count': 1, 'frontier/duplicate_count': 1,
+            'scheduler/enqueued': 1})
+        self.assertEqual(self.scheduler.df.logged, ['http://g1.globo.com/1'])
+
+    def test_requests_leased(self):
+        self.scheduler.enqueue_request(Request('http://g1.globo.com/1', priority=1))
+        self.scheduler.enqueue_request(Request('http://g1.globo.com/2', priority=2))
+        self.assertEqual(self.scheduler.next_request().url, 'http://g1.globo.com/2')
+        self.assertEqual(self.scheduler.next_request().url, 'http://g1.globo.com/1')
+        self.assertIsNone(self.scheduler.next_request())
+        self.assertEqual(self.scheduler.stats.values['frontier/leased_count'], 2)
+        self.assertFalse(self.scheduler.has_pending_requests())
+
+    def test_push_failed_kept_on_local_queue(self):
+        self.frontier.push = mock.Mock(side_effect=IOError('frontier down'))
+        self.scheduler.enqueue_request(Request('http://g1.globo.com/1'))
+        self.scheduler.flush()
+        self.assertEqual([r.url for r in self.scheduler.mqs.requests], ['http://g1.globo.com/1'])
+        self.assertEqual(self.scheduler.stats.values['scheduler/enqueued'], 1)
+        self.assertTrue(self.scheduler.has_pending_requests())
+
+    def test_pending_while_other_node_leases(self):
+        for n in range(3):
+            self.scheduler.enqueue_request(Request('http://g1.globo.com/%d' % n))
+        self.assertTrue(self.scheduler.has_pending_requests())
+        self.scheduler.flush()
+        other = self.open(type(self.scheduler), self.scheduler.spider, 'b')
+        self.assertEqual(other.next_request().url, 'http://g1.globo.com/0')
+        self.assertEqual(len(other.mqs), 1)
+
+        # the partition is leased by b, a waits it to die or to release it
+        self.assertIsNone(self.scheduler.next_request())
+        self.assertTrue(self.scheduler.has_pending_requests())
+        self.frontier.release('b')
+        self.assertEqual(self.scheduler.next_request().url, 'http://g1.globo.com/2')
+        self.assertFalse(self.scheduler.has_pending_requests())
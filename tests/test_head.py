@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from scrapy.http import HtmlResponse
+
+from ze.utils.head import HeadMetadata
+
+
+PAGE = '''<!DOCTYPE html>
+<html lang="pt-br">
+<head>
+<meta charset="utf-8">
+<title>Enem 2017 &amp; inscrições | G1</title>
+<meta property="og:title" content="Enem 2017: inscrições terminam">
+<meta property="og:image" content="https://g1.globo.com/1.jpg">
+<meta property="og:image" content="https://g1.globo.com/2.jpg">
+<meta name=description content="Estudantes têm até sexta-feira">
+<meta itemprop="datePublished" content="2017-08-01">
+<link rel="canonical" href="https://g1.globo.com/enem.html">
+<script>var s = "<div>";</script>
+<noscript><img height="1" width="1" src="https://www.facebook.com/tr?id=1"/></noscript>
+<noscript><iframe src="https://www.googletagmanager.com/ns.html"></iframe></noscript>
+<meta name="author" content="Redação">
+</head>
+<body>
+<meta name="keywords" content="enem">
+<h1>Enem 2017</h1>
+</body>
+</html>
+'''
+
+
+class HeadMetadataTest(unittest.TestCase):
+
+    def setUp(self):
+        self.head = HeadMetadata.from_text(PAGE, chunk_size=64)
+
+    def test_attribute_selectors(self):
+        self.assertEqual(self.head.lookup("meta[property='og:title']::attr(content)"),
+                         ['Enem 2017: inscrições terminam'])
+        self.assertEqual(self.head.lookup('meta[property="og:image"]::attr(content)'),
+                         ['https://g1.globo.com/1.jpg', 'https://g1.globo.com/2.jpg'])
+        self.assertEqual(self.head.lookup('meta[name=description]::attr( content )'),
+                         ['Estudantes têm até sexta-feira'])
+        self.assertEqual(self.head.lookup('link[rel=canonical]::attr(href)'),
+                         ['https://g1.globo.com/enem.html'])
+
+    def test_title(self):
+        self.assertEqual(self.head.lookup('title::text'), ['Enem 2017 & inscrições | G1'])
+        self.assertEqual(self.head.lookup(' title ::text '), ['Enem 2017 & inscrições | G1'])
+
+    def test_tags_of_noscript_dont_end_the_head(self):
+        self.assertEqual(self.head.lookup('meta[name=author]::attr(content)'), ['Redação'])
+
+    def test_stops_at_the_body(self):
+        self.assertIsNone(self.head.lookup('meta[name=keywords]::attr(content)'))
+        head = HeadMetadata.from_text('<html><meta name="a" content="1"><div>'
+                                      '<meta name="b" content="2">')
+        self.assertEqual(head.lookup('meta[name=a]::attr(content)'), ['1'])
+        self.assertIsNone(head.lookup('meta[name=b]::attr(content)'))
+
+    def test_other_selectors_run_on_the_document(self):
+        for css in ('h1::text', 'meta[property="og:title"]::attr(name)',
+                    'meta[property^="og:"]::attr(content)', 'meta[name=author]',
+                    '[itemprop=datePublished]::attr(content)'):
+            self.assertIsNone(self.head.lookup(css), css)
+        self.assertIsNone(HeadMetadata.from_text('<body><h1>a</h1>').lookup('title::text'))
+
+    def test_from_response(self):
+        response = HtmlResponse('https://g1.globo.com/enem.html', body=PAGE.encode('utf-8'),
+                                encoding='utf-8')
+        head = HeadMetadata.from_response(response)
+        self.assertEqual(head.lookup('title::text'), response.css('title::text').extract())
+        self.assertEqual(head.lookup('meta[name=author]::attr(content)'),
+                         response.css('meta[name=author]::attr(content)').extract())
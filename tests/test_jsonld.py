@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+from datetime import datetime, timezone, timedelta
+
+from scrapy.http import HtmlResponse
+from scrapy.settings import Settings
+
+from ze.utils.jsonld import find_article, article_values
+
+
+ARTICLE = {
+    '@context': 'http://schema.org',
+    '@type': 'NewsArticle',
+    'headline': 'Enem 2017: inscrições terminam',
+    'description': 'Estudantes têm até sexta-feira',
+    'image': [{'@type': 'ImageObject', 'url': 'https://g1.globo.com/1.jpg'},
+              'https://g1.globo.com/2.jpg', ''],
+    'author': [{'@type': 'Person', 'name': ' Redação '}, 'Inep', {'@type': 'Person'}],
+    'keywords': ['enem', 'educação', 1],
+    'articleBody': 'Primeiro parágrafo.\n\n  Segundo <parágrafo> & fim.  \n',
+    'datePublished': '2017-08-01T10:30:00.000-03:00',
+    'dateModified': 'Tue, 01 Aug 2017 17:05:00 GMT',
+}
+
+
+class FindArticleTest(unittest.TestCase):
+
+    def test_graph_and_lists(self):
+        website = {'@type': 'WebSite', 'name': 'G1'}
+        graph = json.dumps({'@context': 'http://schema.org', '@graph': [website, ARTICLE]})
+        self.assertEqual(find_article([graph]), ARTICLE)
+        self.assertEqual(find_article([json.dumps([website, ARTICLE])]), ARTICLE)
+
+    def test_types(self):
+        blog = dict(ARTICLE, **{'@type': ['CreativeWork', 'BlogPosting']})
+        self.assertEqual(find_article([json.dumps(blog)]), blog)
+        for types in ('WebPage', ['Organization', 'WebSite'], None):
+            self.assertIsNone(find_article([json.dumps(dict(ARTICLE, **{'@type': types}))]))
+
+    def test_invalid_blocks_ignored(self):
+        blocks = ['{"@type": "NewsArticle",', '', json.dumps(ARTICLE)]
+        self.assertEqual(find_article(blocks), ARTICLE)
+        self.assertIsNone(find_article(['{"@type": "NewsArticle",', '"NewsArticle"']))
+        # control characters of the text of pages
+        self.assertEqual(find_article(['{"@type": "NewsArticle", "headline": "a\tb"}']),
+                         {'@type': 'NewsArticle', 'headline': 'a\tb'})
+
+
+class ArticleValuesTest(unittest.TestCase):
+
+    def test_values(self):
+        values, parsed_values = article_values(ARTICLE)
+        self.assertEqual(values, {
+            'name': 'Enem 2017: inscrições terminam',
+            'description': 'Estudantes têm até sexta-feira',
+            'image': ['https://g1.globo.com/1.jpg', 'https://g1.globo.com/2.jpg'],
+            'author': ['Redação', 'Inep'],
+            'keywords': 'enem,educação',
+            'articleBody': '<p>Primeiro parágrafo.</p>'
+                           '<p>Segundo &lt;parágrafo&gt; &amp; fim.</p>',
+        })
+        self.assertEqual(parsed_values, {
+            'datePublished': datetime(2017, 8, 1, 10, 30,
+                                      tzinfo=timezone(timedelta(hours=-3))),
+            'dateModified': datetime(2017, 8, 1, 17, 5, tzinfo=timezone.utc),
+        })
+
+    def test_name_and_invalid_values(self):
+        values, parsed_values = article_values({
+            '@type': 'Article', 'headline': ' ', 'name': 'Enem 2017',
+            'description': ['a'], 'image': {'@id': 'https://g1.globo.com/1.jpg'},
+            'author': {'name': 'Redação'}, 'keywords': 'enem, educação',
+            'datePublished': 'ontem', 'dateModified': 1501594200})
+        self.assertEqual(values, {'name': 'Enem 2017', 'image': ['https://g1.globo.com/1.jpg'],
+                                  'author': ['Redação'], 'keywords': 'enem, educação'})
+        self.assertEqual(parsed_values, {})
+        self.assertEqual(article_values({'@type': 'Article'}), ({}, {}))
+
+
+PAGE = '''<html><head><title>Enem</title>
+<script type="application/ld+json">%s</script></head>
+<body><h1>Título da página</h1>%s</body></html>'''
+
+
+class SpiderJsonLdTest(unittest.TestCase):
+
+    def setUp(self):
+        # the spiders need the packages of requirements.txt
+        try:
+            from ze.items import creativework  # noqa
+        except ImportError as e:
+            raise unittest.SkipTest(str(e))
+        from ze.spiders import ZeSpider
+
+        class Spider(ZeSpider):
+            name = 'g1'
+            allowed_domains = ['g1.globo.com']
+            items_refs = [{
+                'item': 'ze.items.creativework.ArticleItem',
+                'fields': {
+                    'name': {'selectors': {'css': ['h1::text']}},
+                    'description': {'selectors': {'css': ['.lead::text']}},
+                    'articleBody': {'selectors': {'css': ['.materia']}},
+                },
+            }]
+
+        self.spider = Spider()
+        self.spider.settings = Settings()
+        self.spider.settings.setmodule('ze.settings')
+
+    def item(self, body=''):
+        html = PAGE % (json.dumps(ARTICLE), body)
+        response = HtmlResponse('https://g1.globo.com/enem.html', body=html.encode('utf-8'),
+                                encoding='utf-8')
+        return next(self.spider.parse(response))
+
+    def test_json_ld_before_selectors(self):
+        item = self.item('<p class="lead">Descrição da página</p>')
+        self.assertEqual(item['name'], ARTICLE['headline'])
+        self.assertEqual(item['description'], ARTICLE['description'])
+
+    def test_fallback_fields_after_selectors(self):
+        item = self.item('<div class="materia"><p>Texto da página</p></div>')
+        self.assertIn('Texto da página', item['articleBody'])
+        self.assertNotIn('Primeiro parágrafo', item['articleBody'])
+
+        item = self.item()
+        self.assertIn('Primeiro parágrafo', item['articleBody'])
+
+    def test_without_json_ld(self):
+        self.spider.settings.set('JSON_LD_ENABLED', False)
+        item = self.item()
+        self.assertEqual(item['name'], 'Título da página')
+        self.assertNotIn('articleBody', item)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from scrapy.exceptions import NotConfigured
+from scrapy.settings import Settings
+from scrapy.signalmanager import SignalManager
+
+from ze.extensions import memory
+from ze.extensions.memory import MemoryWatchdog
+
+MB = 1024 * 1024
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.values = {}
+
+    def set_value(self, key, value):
+        self.values[key] = value
+
+    def inc_value(self, key, count=1):
+        self.values[key] = self.values.get(key, 0) + count
+
+
+class Downloader(object):
+    active = ()
+
+
+class ScraperSlot(object):
+    active_size = 0
+    itemproc_size = 0
+
+    def is_idle(self):
+        return True
+
+
+class Scraper(object):
+    slot = ScraperSlot()
+
+
+class Slot(object):
+    scheduler = ()
+
+
+class Engine(object):
+
+    def __init__(self):
+        self.slot = None
+        self.downloader = Downloader()
+        self.scraper = Scraper()
+        self.paused = False
+        self.open_spiders = ['spider']
+        self.closed = []
+
+    def pause(self):
+        self.paused = True
+
+    def unpause(self):
+        self.paused = False
+
+    def close_spider(self, spider, reason):
+        self.closed.append((spider, reason))
+
+
+class Crawler(object):
+
+    def __init__(self, **settings):
+        self.settings = Settings(settings)
+        self.signals = SignalManager()
+        self.stats = Stats()
+        self.engine = Engine()
+
+
+class MemoryWatchdogTest(unittest.TestCase):
+
+    def watchdog(self, sizes, **settings):
+        settings.setdefault('MEMORY_WATCHDOG_ENABLED', True)
+        watchdog = MemoryWatchdog(Crawler(**settings))
+        watchdog.get_virtual_size = lambda: sizes.pop(0)
+        return watchdog
+
+    def test_enabled_without_memusage(self):
+        watchdog = MemoryWatchdog(Crawler(MEMORY_WATCHDOG_ENABLED=True, MEMUSAGE_ENABLED=False,
+                                          MEMUSAGE_CHECK_INTERVAL_SECONDS=30))
+        self.assertTrue(watchdog.enabled)
+        self.assertEqual(watchdog.check_interval, 30)
+        self.assertIsInstance(watchdog.crawler, Crawler)
+
+    def test_disabled_without_memusage(self):
+        self.assertRaises(NotConfigured, MemoryWatchdog,
+                          Crawler(MEMORY_WATCHDOG_ENABLED=False, MEMUSAGE_ENABLED=False))
+
+    def test_paused_until_resume_size(self):
+        watchdog = self.watchdog([120 * MB, 110 * MB, 90 * MB, 70 * MB],
+                                 MEMORY_WATCHDOG_PAUSE_MB=100, MEMORY_WATCHDOG_RESUME_MB=80)
+        engine = watchdog.crawler.engine
+        engine.downloader.active = ['request']
+        engine.slot = Slot()
+        paused = []
+        for _ in range(4):
+            watchdog.sample()
+            paused.append(engine.paused)
+        self.assertEqual(paused, [True, True, True, False])
+        self.assertEqual(engine.closed, [])
+
+    def test_stopped_when_nothing_in_flight(self):
+        watchdog = self.watchdog([120 * MB, 110 * MB], MEMORY_WATCHDOG_PAUSE_MB=100)
+        watchdog.sample()
+        watchdog.sample()
+        self.assertEqual(watchdog.crawler.engine.closed, [('spider', 'memusage_exceeded')])
+        self.assertEqual(watchdog.crawler.stats.values['memusage/pause_limit_reached'], 1)
+
+    def test_snapshot_only_on_thresholds(self):
+        watchdog = self.watchdog([50 * MB, 150 * MB, 160 * MB, 250 * MB],
+                                 MEMORY_WATCHDOG_DUMP_MB='100, 200')
+        watchdog.baseline = 'baseline'
+        snapshots, dumps = [], []
+
+        class Snapshot(object):
+            def compare_to(self, baseline, key_type):
+                snapshots.append(baseline)
+                return []
+
+        take_snapshot = memory.tracemalloc.take_snapshot
+        memory.tracemalloc.take_snapshot = Snapshot
+        watchdog.dump = lambda threshold, size, statistics: dumps.append(threshold)
+        try:
+            for _ in range(4):
+                watchdog.sample()
+        finally:
+            memory.tracemalloc.take_snapshot = take_snapshot
+        self.assertEqual(snapshots, ['baseline', 'baseline'])
+        self.assertEqual(dumps, [100 * MB, 200 * MB])
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import random
+import unittest
+
+from scrapy.http import Request, Response
+from scrapy.settings import Settings
+
+from ze.utils.timing import Histogram
+from ze.middlewares.downloader.metrics import DomainMetricsMiddleware
+
+
+class Spider(object):
+    name = 'g1'
+
+
+class HistogramTest(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(7)
+        self.values = [random.expovariate(2) for _ in range(1000)]
+        self.histogram = Histogram()
+        for value in self.values:
+            self.histogram.add(value)
+
+    def test_percentiles_within_bucket_width(self):
+        values = sorted(self.values)
+        for percent in (50, 95, 99):
+            exact = values[int(percent / 100.0 * len(values)) - 1]
+            self.assertAlmostEqual(self.histogram.percentile(percent) / exact, 1, delta=0.2)
+
+    def test_cumulative_monotonic_and_bounded(self):
+        previous = 0
+        for bound in [0.001 * 1.1 ** i for i in range(120)]:
+            count = self.histogram.cumulative(bound)
+            self.assertGreaterEqual(count, previous)
+            self.assertLessEqual(count, sum(1 for v in self.values if v <= bound))
+            previous = count
+        self.assertEqual(self.histogram.cumulative(max(self.values) * 2), len(self.values))
+
+
+class DomainMetricsMiddlewareTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mw = DomainMetricsMiddleware(Settings({'DOMAIN_METRICS_ENABLED': True}))
+        self.spider = Spider()
+
+    def download(self, url, status=200, body=b'<html></html>', latency=0.1):
+        request = Request(url, meta={'download_latency': latency})
+        self.mw.process_request(request, self.spider)
+        self.mw.process_response(request, Response(url, status=status, body=body), self.spider)
+
+    def test_prometheus_textfile(self):
+        self.download('http://g1.globo.com/a')
+        self.download('http://g1.globo.com/b', status=404)
+        lines = self.mw.prometheus(self.spider).splitlines()
+        labels = 'spider="g1",domain="g1.globo.com"'
+        self.assertIn('ze_download_latency_seconds_count{%s} 2' % labels, lines)
+        self.assertIn('ze_download_ttfb_seconds_bucket{%s,le="0.25"} 2' % labels, lines)
+        self.assertIn('ze_download_ttfb_seconds_bucket{%s,le="0.05"} 0' % labels, lines)
+        self.assertIn('ze_download_responses_total{%s,status="404"} 1' % labels, lines)
+
+    def test_exceptions_counted(self):
+        request = Request('http://g1.globo.com/a')
+        self.mw.process_request(request, self.spider)
+        self.mw.process_exception(request, IOError(), self.spider)
+        snapshot = self.mw.json_snapshot(self.spider)['domains']['g1.globo.com']
+        self.assertEqual(snapshot['status'], {'OSError': 1})
+        self.assertEqual(snapshot['latency_ms']['count'], 1)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from ze.utils.priority import parse_pubdate, SeedPriority
+
+
+class Rates(object):
+
+    def __init__(self, rates=None):
+        self.rates = rates or {}
+
+    def get(self, domain, default=0.0):
+        return self.rates.get(domain, default)
+
+
+class ParsePubdateTest(unittest.TestCase):
+
+    def test_rfc822(self):
+        date = parse_pubdate('Thu, 01 Jun 2017 10:20:30 -0300')
+        self.assertEqual(date, datetime(2017, 6, 1, 13, 20, 30, tzinfo=timezone.utc))
+
+    def test_rfc822_without_zone_is_utc(self):
+        date = parse_pubdate('Thu, 01 Jun 2017 10:20:30 -0000')
+        self.assertIsNotNone(date.tzinfo)
+        self.assertEqual(date, datetime(2017, 6, 1, 10, 20, 30, tzinfo=timezone.utc))
+        # aware datetimes can be subtracted
+        datetime.now(timezone.utc) - date
+
+    def test_iso8601(self):
+        self.assertEqual(parse_pubdate('2017-06-01T10:20:30.000-03:00'),
+                         datetime(2017, 6, 1, 13, 20, 30, tzinfo=timezone.utc))
+        self.assertEqual(parse_pubdate('2017-06-01T10:20:30Z'),
+                         datetime(2017, 6, 1, 10, 20, 30, tzinfo=timezone.utc))
+        self.assertEqual(parse_pubdate('2017-06-01').tzinfo, timezone.utc)
+
+    def test_naive_datetime(self):
+        self.assertEqual(parse_pubdate(datetime(2017, 6, 1)).tzinfo, timezone.utc)
+
+    def test_invalid(self):
+        self.assertIsNone(parse_pubdate('yesterday'))
+        self.assertIsNone(parse_pubdate(None))
+
+
+class SeedPriorityTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = datetime(2017, 6, 1, 12, tzinfo=timezone.utc)
+        self.priority = SeedPriority(Rates({'fast.com': 10}))
+
+    def test_score_by_rank_freshness_and_rate(self):
+        fresh = self.priority.score('http://slow.com/a', {
+            'pubDate': (self.now - timedelta(hours=6)).isoformat()}, self.now)
+        self.assertAlmostEqual(fresh, 50.0)
+        self.assertAlmostEqual(self.priority.score('http://slow.com/a', {'rank': 0}), 50.0)
+        self.assertAlmostEqual(self.priority.score('http://fast.com/a', {}), 30 * 10 / 11.0)
+
+    def test_score_with_date_without_zone(self):
+        score = self.priority.score('http://slow.com/a',
+                                    {'pubDate': 'Thu, 01 Jun 2017 12:00:00 -0000'}, self.now)
+        self.assertAlmostEqual(score, 100.0)
+
+    def test_prioritize_rotates_domains(self):
+        urls = ['http://a.com/%d' % i for i in range(3)] + ['http://b.com/0']
+        meta = dict((u, {'rank': i}) for i, u in enumerate(urls))
+        seeds = self.priority.prioritize(urls, meta)
+        priorities = dict(seeds)
+        # the first seed of b.com goes before the second of a.com
+        self.assertGreater(priorities['http://b.com/0'], priorities['http://a.com/1'])
+        self.assertEqual([u for u, _ in seeds][:2], ['http://a.com/0', 'http://b.com/0'])
+
+    def test_prioritize_empty(self):
+        self.assertEqual(self.priority.prioritize([]), [])
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import shutil
+import signal
+import tempfile
+import unittest
+
+from scrapy import Spider
+from scrapy.settings import Settings
+
+from ze.utils.profiler import StackSampler
+from ze.extensions.profiler import SamplingProfiler
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.values = {}
+
+    def set_value(self, key, value):
+        self.values[key] = value
+
+
+class SampledSpider(Spider):
+    name = 'g1'
+
+    def parse(self, sampler):
+        sampler._sample(signal.SIGPROF, sys._getframe())
+
+
+def busy(seconds):
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+class StackSamplerTest(unittest.TestCase):
+
+    def test_samples_by_spider_on_stack(self):
+        sampler = StackSampler()
+        sampler.default_key = 'reactor'
+        SampledSpider().parse(sampler)
+        sampler._sample(signal.SIGPROF, sys._getframe())
+
+        self.assertEqual(sampler.samples, 2)
+        (line,) = sampler.collapsed('g1')
+        stack, _, count = line.rpartition(' ')
+        self.assertEqual(count, '1')
+        self.assertTrue(stack.endswith(';test_profiler.py:parse:%d'
+                                       % SampledSpider.parse.__code__.co_firstlineno))
+        self.assertEqual(len(sampler.collapsed('reactor')), 1)
+        self.assertEqual(sampler.pop('g1'), {stack: 1})
+        self.assertEqual(sampler.collapsed('g1'), [])
+
+    @unittest.skipUnless(hasattr(signal, 'setitimer'), 'signal.setitimer not available')
+    def test_samples_cpu_time(self):
+        sampler = StackSampler(interval=0.01)
+        sampler.default_key = 'reactor'
+        sampler.start()
+        try:
+            busy(0.3)
+        finally:
+            sampler.stop()
+        self.assertGreater(sampler.samples, 5)
+        self.assertTrue(any('test_profiler.py:busy' in line
+                            for line in sampler.collapsed('reactor')))
+
+
+@unittest.skipUnless(hasattr(signal, 'setitimer'), 'signal.setitimer not available')
+class SamplingProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        SamplingProfiler.sampler = None
+        SamplingProfiler.open_spiders = set()
+
+    def tearDown(self):
+        shutil.rmtree(self.profile_dir)
+        SamplingProfiler.sampler = None
+
+    def test_default_interval(self):
+        self.assertEqual(StackSampler().interval, 0.01)
+
+    def test_collapsed_file_by_spider(self):
+        stats = Stats()
+        profiler = SamplingProfiler(Settings({'ZE_PROFILE': True, 'PROFILE_INTERVAL': 0.01,
+                                              'PROFILE_DIR': self.profile_dir}), stats)
+        spider = SampledSpider()
+        profiler.spider_opened(spider)
+        try:
+            busy(0.2)
+        finally:
+            profiler.spider_closed(spider)
+
+        self.assertFalse(profiler.sampler.running)
+        (name,) = os.listdir(self.profile_dir)
+        self.assertTrue(name.startswith('g1-') and name.endswith('.collapsed'))
+        with open(os.path.join(self.profile_dir, name)) as f:
+            lines = f.read().splitlines()
+        self.assertGreater(stats.values['profile/samples'], 0)
+        self.assertTrue(any('test_profiler.py:busy' in line for line in lines))
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from scrapy.settings import Settings
+
+from ze.utils.projection import fields_projection, drop_validation_enabled
+
+
+class FieldsProjectionTest(unittest.TestCase):
+
+    def test_fields_argument_wins(self):
+        settings = Settings({'FIELDS_PROJECTION': 'name'})
+        self.assertEqual(fields_projection(settings, 'url, keywords'), set(['url', 'keywords']))
+        self.assertEqual(fields_projection(settings), set(['name']))
+
+    def test_union_of_enabled_sinks(self):
+        settings = Settings({
+            'FIELDS_PROJECTION_SINKS': {'A_ENABLED': 'name, url', 'B_ENABLED': 'image',
+                                        'C_ENABLED': 'author'},
+            'A_ENABLED': True, 'B_ENABLED': True,
+        })
+        self.assertEqual(fields_projection(settings), set(['name', 'url', 'image']))
+
+    def test_sink_without_fields_needs_all(self):
+        settings = Settings({'FIELDS_PROJECTION_SINKS': {'A_ENABLED': ''}, 'A_ENABLED': True})
+        self.assertIsNone(fields_projection(settings))
+
+    def test_feed_export_fields(self):
+        settings = Settings({'FEED_URI': 'items.jl', 'FEED_EXPORT_FIELDS': ['url', 'name']})
+        self.assertEqual(fields_projection(settings), set(['url', 'name']))
+        self.assertIsNone(fields_projection(Settings({'FEED_URI': 'items.jl'})))
+
+
+class DropValidationEnabledTest(unittest.TestCase):
+
+    def test_only_when_pipeline_and_validation_enabled(self):
+        validations = 'not_match_regex, empty_required_fields'
+        self.assertFalse(drop_validation_enabled(Settings({
+            'DROP_ITEM_PIPELINE_VALIDATIONS': validations}), 'empty_required_fields'))
+        self.assertTrue(drop_validation_enabled(Settings({
+            'DROP_ITEM_PIPELINE_ENABLED': True,
+            'DROP_ITEM_PIPELINE_VALIDATIONS': validations}), 'empty_required_fields'))
+        self.assertFalse(drop_validation_enabled(Settings({
+            'DROP_ITEM_PIPELINE_ENABLED': True,
+            'DROP_ITEM_PIPELINE_VALIDATIONS': 'not_match_regex'}), 'empty_required_fields'))
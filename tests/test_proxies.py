@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import tempfile
+import unittest
+
+import requests
+
+from ze.utils.proxies import ProxyPool, StandInProxyServer
+
+
+class ProxyPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = ProxyPool(None, proxies=['http://a:1', 'http://b:1'],
+                              quarantine_base=60, quarantine_max=600)
+
+    def test_success_updates_ewma(self):
+        self.pool.mark_success('http://a:1', 1.0)
+        self.pool.mark_success('http://a:1', 2.0)
+        score = self.pool.scores['http://a:1']
+        self.assertAlmostEqual(score.latency, 0.3 * 2.0 + 0.7 * 1.0)
+        self.assertGreater(score.success, 0.5)
+
+    def test_failure_quarantines_with_backoff(self):
+        self.pool.mark_failure('http://a:1')
+        first = self.pool.scores['http://a:1'].quarantined_until
+        self.pool.mark_failure('http://a:1')
+        second = self.pool.scores['http://a:1'].quarantined_until
+        self.assertGreater(second - first, 50)
+        self.assertEqual(self.pool.available(), ['http://b:1'])
+        self.assertEqual(self.pool.choose(), 'http://b:1')
+
+    def test_backoff_is_capped(self):
+        start = time.time()
+        for _ in range(20):
+            self.pool.mark_failure('http://a:1')
+        self.assertLessEqual(self.pool.scores['http://a:1'].quarantined_until,
+                             time.time() + 600)
+        self.assertGreaterEqual(self.pool.scores['http://a:1'].quarantined_until,
+                                start + 600)
+
+    def test_all_quarantined(self):
+        for proxy in list(self.pool.scores):
+            self.pool.mark_failure(proxy)
+        self.assertIsNone(self.pool.choose())
+
+    def test_success_lifts_quarantine(self):
+        self.pool.mark_failure('http://a:1')
+        self.pool.mark_success('http://a:1', 0.5)
+        self.assertIn('http://a:1', self.pool.available())
+
+    def test_save_and_load_scores(self):
+        path = os.path.join(tempfile.mkdtemp(), 'scores.json')
+        pool = ProxyPool(None, scores_path=path, proxies=['http://a:1'])
+        pool.mark_success('http://a:1', 0.25)
+        pool.save()
+        with open(path) as f:
+            self.assertEqual(json.load(f)['http://a:1']['latency'], 0.25)
+        
+        loaded = ProxyPool(None, scores_path=path, proxies=['http://a:1'])
+        self.assertEqual(loaded.scores['http://a:1'].latency, 0.25)
+
+
+class StandInProxyServerTest(unittest.TestCase):
+
+    def test_answers_with_status(self):
+        for status in (200, 503):
+            server = StandInProxyServer(status=status).start()
+            try:
+                response = requests.get('http://example.com/', timeout=5,
+                                        proxies={'http': server.url})
+                self.assertEqual(response.status_code, status)
+            finally:
+                server.stop()
+
+    def test_pool_scores_stand_in_proxies(self):
+        servers = [StandInProxyServer(status=s).start() for s in (200, 503)]
+        pool = ProxyPool(None, proxies=[s.url for s in servers])
+        try:
+            for server in servers:
+                response = requests.get('http://example.com/', timeout=5,
+                                        proxies={'http': server.url})
+                if response.status_code < 500:
+                    pool.mark_success(server.url, 0.1)
+                else:
+                    pool.mark_failure(server.url)
+        finally:
+            for server in servers:
+                server.stop()
+        self.assertEqual(pool.available(), [servers[0].url])
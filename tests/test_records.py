@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import io
+import sys
+import json
+import pickle
+import unittest
+from datetime import datetime, timezone
+
+import pytest
+from scrapy import Item, Field
+from scrapy.exporters import JsonLinesItemExporter
+
+# the items need the loader of scrapy 1.x and the packages of requirements.txt
+records = pytest.importorskip('ze.items.records')
+from ze.items import item_name
+
+
+class WideItem(Item):
+    item_name = 'Wide'
+    locals().update(('field%02d' % i, Field()) for i in range(99))
+
+
+def wide_item(filled=10):
+    item = WideItem()
+    for i in range(filled):
+        item['field%02d' % i] = 'value %d' % i
+    item['field98'] = datetime(2017, 8, 1, tzinfo=timezone.utc)
+    return item
+
+
+class RecordTest(unittest.TestCase):
+
+    def test_smaller_than_the_item_values(self):
+        item = wide_item()
+        record = records.to_record(item)
+        self.assertLess(sys.getsizeof(record), sys.getsizeof(item._values) / 2)
+        self.assertEqual(len(type(record).__slots__), 11)
+
+    def test_one_class_by_filled_fields(self):
+        self.assertIs(type(records.to_record(wide_item())), type(records.to_record(wide_item())))
+        self.assertIsNot(type(records.to_record(wide_item(3))),
+                         type(records.to_record(wide_item())))
+
+    def test_reads_as_the_item(self):
+        item = wide_item()
+        record = records.to_record(item)
+        self.assertEqual(dict(record), dict(item))
+        self.assertEqual(record['field01'], 'value 1')
+        self.assertEqual(record.field01, 'value 1')
+        self.assertIsNone(record.get('field50'))
+        self.assertNotIn('field50', record)
+        self.assertRaises(KeyError, lambda: record['field50'])
+        self.assertRaises(KeyError, lambda: record['missing'])
+        self.assertIs(record.fields, WideItem.fields)
+        self.assertRaises(AttributeError, setattr, record, 'field01', 'other')
+
+    def test_sinks_and_exporters(self):
+        item = wide_item()
+        record = records.to_record(item)
+        self.assertEqual(item_name(record), 'Wide')
+        self.assertEqual(json.loads(record.to_json()),
+                         json.loads(json.dumps(dict(item), default=str)))
+        self.assertEqual(dict(pickle.loads(pickle.dumps(record))), dict(item))
+
+        output = io.BytesIO()
+        exporter = JsonLinesItemExporter(output)
+        exporter.export_item(record)
+        exported = json.loads(output.getvalue().decode('utf-8'))
+        self.assertEqual(exported['field01'], 'value 1')
+        self.assertEqual(len(exported), 11)
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+from scrapy.http import Request
+from scrapy.settings import Settings
+
+from ze.utils.registry import ManifestSpiderLoader, SpiderRegistry, build_manifest
+
+
+SPIDER_MODULE = '''
+import scrapy
+
+
+class {cls}(scrapy.Spider):
+    name = '{name}'
+    allowed_domains = {domains!r}
+    items_refs = []
+'''
+
+
+class ManifestSpiderLoaderTest(unittest.TestCase):
+
+    package = 'ze_test_spiders'
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.dir, self.package))
+        open(os.path.join(self.dir, self.package, '__init__.py'), 'w').close()
+        self.add_spider('g1', 'G1Spider', 'g1', ['g1.globo.com'])
+        self.add_spider('globo', 'GloboSpider', 'globo', ['globo.com'])
+        sys.path.insert(0, self.dir)
+        self.manifest_path = os.path.join(self.dir, 'manifest.json')
+        self.settings = Settings({'SPIDER_MODULES': [self.package],
+                                  'SPIDER_MANIFEST_ENABLED': True,
+                                  'SPIDER_MANIFEST_FILE': self.manifest_path})
+
+    def tearDown(self):
+        sys.path.remove(self.dir)
+        for name in list(sys.modules):
+            if name.split('.')[0] == self.package:
+                del sys.modules[name]
+        shutil.rmtree(self.dir)
+
+    def add_spider(self, module, cls, name, domains):
+        with open(os.path.join(self.dir, self.package, module + '.py'), 'w') as f:
+            f.write(SPIDER_MODULE.format(cls=cls, name=name, domains=domains))
+
+    def write_manifest(self):
+        manifest = build_manifest(ManifestSpiderLoader(Settings({
+            'SPIDER_MODULES': [self.package], 'SPIDER_MANIFEST_ENABLED': False})))
+        with open(self.manifest_path, 'w') as f:
+            json.dump(manifest, f)
+        for name in list(sys.modules):
+            if name.startswith(self.package + '.'):
+                del sys.modules[name]
+        return manifest
+
+    def test_imports_only_loaded_spiders(self):
+        manifest = self.write_manifest()
+        self.assertEqual(manifest['g1']['module'], self.package + '.g1')
+        loader = ManifestSpiderLoader(self.settings)
+        self.assertEqual(sorted(loader.list()), ['g1', 'globo'])
+        self.assertEqual(sorted(loader.find_by_request(Request('http://g1.globo.com/a.html'))),
+                         ['g1', 'globo'])
+        self.assertEqual(loader.find_by_request(Request('http://oglobo.globo.com/a.html')),
+                         ['globo'])
+        self.assertNotIn(self.package + '.g1', sys.modules)
+        self.assertEqual(loader.load('g1').__name__, 'G1Spider')
+        self.assertIn(self.package + '.g1', sys.modules)
+        self.assertNotIn(self.package + '.globo', sys.modules)
+
+    def test_spiders_not_on_the_manifest(self):
+        self.write_manifest()
+        self.add_spider('folha', 'FolhaSpider', 'folha', ['folha.uol.com.br'])
+        loader = ManifestSpiderLoader(self.settings)
+        self.assertEqual(sorted(loader.list()), ['folha', 'g1', 'globo'])
+        self.assertEqual(loader.find_by_request(Request('http://folha.uol.com.br/a.html')),
+                         ['folha'])
+        self.assertEqual(loader.load('folha').__name__, 'FolhaSpider')
+        self.assertNotIn(self.package + '.g1', sys.modules)
+
+    def test_spider_renamed_on_a_module_of_the_manifest(self):
+        self.write_manifest()
+        self.add_spider('g1', 'G1Spider', 'g1noticias', ['g1.globo.com'])
+        loader = ManifestSpiderLoader(self.settings)
+        self.assertEqual(loader.load('g1noticias').__name__, 'G1Spider')
+        with self.assertRaises(KeyError):
+            loader.load('estadao')
+
+    def test_without_manifest(self):
+        loader = ManifestSpiderLoader(self.settings)
+        self.assertIsNone(loader.manifest)
+        self.assertEqual(sorted(loader.list()), ['g1', 'globo'])
+
+    def test_registry_spider_of_the_longest_domain(self):
+        self.write_manifest()
+        registry = SpiderRegistry.from_settings(self.settings)
+        self.assertEqual(registry.spider_name('http://g1.globo.com/a.html'), 'g1')
+        self.assertEqual(registry.spider_name('https://www.g1.globo.com/a.html'), 'g1')
+        self.assertEqual(registry.spider_name('http://oglobo.globo.com/a.html'), 'globo')
+        self.assertIsNone(registry.spider_name('http://folha.uol.com.br/a.html'))
+        self.assertNotIn(self.package + '.g1', sys.modules)
+
+
+class ProjectManifestTest(unittest.TestCase):
+
+    def test_manifest_up_to_date(self):
+        # the spiders need the packages of requirements.txt
+        try:
+            from ze.items import creativework  # noqa
+        except ImportError as e:
+            raise unittest.SkipTest(str(e))
+        from scrapy.spiderloader import SpiderLoader
+        settings = Settings()
+        settings.setmodule('ze.settings')
+        with open(settings.get('SPIDER_MANIFEST_FILE')) as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest, build_manifest(SpiderLoader.from_settings(settings)),
+                         'run "scrapy generate manifest"')
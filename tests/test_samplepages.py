@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+from scrapy.selector import Selector
+from scrapy.settings import Settings
+
+from ze.utils.samplepages import selector_element, sample_page
+
+
+class SelectorElementTest(unittest.TestCase):
+
+    def assertMatched(self, selector, value, on_head=False):
+        html, head = selector_element(selector, value)
+        self.assertEqual(head, on_head)
+        self.assertEqual(Selector(text=html).css(selector).extract(), [value])
+
+    def test_attributes_and_text(self):
+        self.assertMatched("meta[property='og:title']::attr(content)", 'São Paulo', True)
+        self.assertMatched('[itemprop=datePublished]::attr(datetime)', '2017-08-01')
+        self.assertMatched('time[datetime]::text', '1 de agosto')
+        self.assertMatched('#credito-materia::text', 'Redação & agências')
+        self.assertMatched('.content-head__title::text', 'Título')
+        self.assertMatched('.lazy::attr("data-lazy-src")', '/foto.jpg')
+
+    def test_descendants(self):
+        self.assertMatched('[itemprop=author] [itemprop=name]::attr(content)', 'Redação')
+        self.assertMatched('.materia-titulo h1::text', 'Título')
+
+    def test_inner_html(self):
+        html, _ = selector_element('[itemprop=articleBody]', '<p>Texto</p>')
+        self.assertEqual(html, '<div itemprop="articleBody"><p>Texto</p></div>')
+
+    def test_unsupported_selectors(self):
+        self.assertIsNone(selector_element('.texto p:last-child::text', 'Texto'))
+        self.assertIsNone(selector_element('.post-meta > a::text', 'Texto'))
+        self.assertIsNone(selector_element('img.foto', '<p>Texto</p>'))
+
+
+class SamplePageTest(unittest.TestCase):
+
+    items_refs = [{
+        'item': 'ze.items.creativework.ArticleItem',
+        'fields': {
+            'name': {'selectors': {'css': ['h1:first-child::text', 'h1.title::text']}},
+            'articleBody': {'selectors': {'css': ['.materia-conteudo']}},
+            'audio': {
+                'item': 'ze.items.creativework.AudioObjectItem',
+                'fields': {'url': {'selectors': {'css': ['.ouvir a::attr(href)']}}},
+            },
+        },
+    }]
+
+    def test_first_selector_that_can_be_built(self):
+        page = Selector(text=sample_page(self.items_refs, 'https://g1.globo.com/a.html'))
+        self.assertTrue(page.css('h1.title::text').extract_first().startswith('Enem 2017'))
+        self.assertGreater(len(page.css('.materia-conteudo p')), 20)
+        self.assertEqual(page.css('.ouvir a::attr(href)').extract(), ['Texto de url'])
+        self.assertEqual(page.css('meta::attr(charset)').extract(), ['utf-8'])
+
+
+class PagesCorpusTest(unittest.TestCase):
+
+    def test_page_of_each_spider(self):
+        # the spiders need the packages of requirements.txt
+        try:
+            from ze.items import creativework  # noqa
+        except ImportError as e:
+            raise unittest.SkipTest(str(e))
+        from ze.utils.extraction import spider_registry
+        settings = Settings()
+        settings.setmodule('ze.settings')
+        registry = spider_registry(settings)
+        pages_dir = settings.get('BENCHMARK_PAGES_DIR')
+        missing = [spider_name for spider_name in registry.spider_names
+                   if getattr(registry.spider(spider_name), 'allowed_domains', None)
+                   and not os.path.isfile(os.path.join(pages_dir, spider_name, '1.html'))]
+        self.assertEqual(missing, [])
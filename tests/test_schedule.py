@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import pytest
+
+# the daemon needs croniter and pytz of requirements.txt
+schedule = pytest.importorskip('ze.commands.schedule')
+import pytz
+
+
+def job(name):
+    return {'name': name, 'spiders': [], 'search_arg_keywords': []}
+
+
+class ScheduleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.command = schedule.Command()
+        self.command.timezone = pytz.timezone('America/Sao_Paulo')
+        self.command.running = set()
+        self.every_5 = ('*/5 * * * *', job('every 5'))
+        self.morning = ('0 8 * * *', job('morning'))
+        self.morning_news = ('0 8 * * 1-5', job('morning news'))
+        self.every_minute = ('* * * * *', job('every minute'))
+
+    def at(self, *args):
+        return self.command.timezone.localize(datetime(*args))
+
+    def test_due_on_the_same_minute_coalesced(self):
+        self.command.schedules = [self.every_5, self.morning, self.morning_news]
+        # tuesday
+        fire_time, due = self.command.next_due(self.at(2017, 8, 1, 7, 59, 30))
+        self.assertEqual(fire_time, self.at(2017, 8, 1, 8, 0))
+        self.assertEqual(due, [self.every_5, self.morning, self.morning_news])
+
+        fire_time, due = self.command.next_due(fire_time)
+        self.assertEqual(fire_time, self.at(2017, 8, 1, 8, 5))
+        self.assertEqual(due, [self.every_5])
+
+    def test_next_minute_after_the_fired_one(self):
+        self.command.schedules = [self.every_minute]
+        fire_time, due = self.command.next_due(self.at(2017, 8, 1, 8, 0))
+        self.assertEqual(fire_time, self.at(2017, 8, 1, 8, 1))
+
+        self.command.schedule_next = mock.Mock()
+        self.command.fire(fire_time, due)
+        self.command.schedule_next.assert_called_once_with(fire_time)
+
+    def test_schedules_on_the_timezone(self):
+        self.command.schedules = [self.morning]
+        fire_time, _ = self.command.next_due(datetime(2017, 8, 1, 10, 59, tzinfo=pytz.utc))
+        self.assertEqual(fire_time, datetime(2017, 8, 1, 11, 0, tzinfo=pytz.utc))
+        self.assertEqual((fire_time.hour, fire_time.minute), (8, 0))
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from parsel import Selector
+
+from ze.utils.selectors import SelectorMatcher
+
+
+HTML = '''<html><head><title>Title</title>
+<meta property="og:title" content="OG title"></head>
+<body><article class="news main" id="story">
+<h1 class="headline">Headline <b>bold</b></h1>
+<div class="author"><span>Ana</span></div>
+<p class="text">First</p><p>Second <a href="/a">link</a></p>
+<img src="/i.jpg" class="photo"></article>
+<div class="author">Bia</div></body></html>'''
+
+SELECTORS = ('h1.headline::text', 'h1.headline', '#story', 'p::text', '.author',
+             '.author span::text', 'article .text::text', 'img::attr(src)',
+             'img.photo::attr(src)', 'a::attr(href)', 'title::text', '*::text',
+             'meta[property="og:title"]::attr(content)', '.missing', 'article p, h1')
+
+
+class SelectorMatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.selector = Selector(text=HTML)
+        self.matcher = SelectorMatcher(self.selector.root)
+
+    def test_same_values_of_parsel(self):
+        for css in SELECTORS:
+            self.assertEqual(self.matcher.match(css), self.selector.css(css).extract(), css)
+
+    def test_runs_only_requested_selectors(self):
+        ran = []
+        run = self.matcher._run
+        self.matcher._run = lambda css: ran.append(css) or run(css)
+        self.matcher.match('h1.headline::text')
+        self.matcher.match('h1.headline::text')
+        self.assertEqual(ran, ['h1.headline::text'])
+
+    def test_index_built_once_for_simple_selectors(self):
+        self.matcher.match('article .text::text')
+        self.assertIsNone(self.matcher.elements)
+        self.matcher.match('p::text')
+        elements = self.matcher.elements
+        self.matcher.match('.author')
+        self.assertIs(self.matcher.elements, elements)
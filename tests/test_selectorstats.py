@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from ze.utils.selectorstats import SelectorStats
+
+
+class SelectorStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'selectors-stats.json')
+        self.selectors = ['.materia h1::text', 'h1::text', '.title::text']
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def stats(self, **kwargs):
+        kwargs.setdefault('adaptive', True)
+        kwargs.setdefault('min_samples', 4)
+        return SelectorStats(self.path, **kwargs)
+
+    def sample(self, stats, hits, times=1):
+        for _ in range(times):
+            stats.record_sample('g1', 'name', self.selectors, hits)
+
+    def test_record(self):
+        stats = self.stats()
+        stats.record('g1', 'name', 'h1::text', True)
+        stats.record('g1', 'name', 'h1::text', False)
+        stats.record('g1', 'name', 'h1::text', True)
+        self.assertEqual(stats.load()['g1']['name']['tries'], {'h1::text': [2, 1]})
+        self.assertAlmostEqual(stats.hit_rate('g1', 'name', 'h1::text'), 2 / 3.0)
+        self.assertIsNone(stats.hit_rate('g1', 'name', '.title::text'))
+
+    def test_sample_every(self):
+        stats = self.stats(sample_every=3)
+        self.assertEqual([stats.sample('g1', 'name') for _ in range(6)],
+                         [True, False, False, True, False, False])
+        self.assertTrue(stats.sample('g1', 'description'))
+
+    def test_order_keeps_spider_order_without_samples(self):
+        stats = self.stats()
+        # conditional rates alone don't reorder
+        for _ in range(10):
+            stats.record('g1', 'name', self.selectors[0], False)
+            stats.record('g1', 'name', self.selectors[1], True)
+        self.sample(stats, self.selectors[1:2], times=3)
+        self.assertEqual(stats.order('g1', 'name', self.selectors), self.selectors)
+        self.assertEqual(self.stats(adaptive=False).order('g1', 'name', self.selectors),
+                         self.selectors)
+
+    def test_order_never_before_a_selector_hit_together(self):
+        stats = self.stats()
+        specific, generic, title = self.selectors
+        # the generic selector hits more, but on the pages the specific one
+        # hits too, so it stays after it
+        self.sample(stats, [specific, generic], times=2)
+        self.sample(stats, [generic], times=6)
+        self.assertEqual(stats.order('g1', 'name', self.selectors), self.selectors)
+
+    def test_order_by_hits_of_selectors_never_hit_together(self):
+        stats = self.stats()
+        specific, generic, title = self.selectors
+        self.sample(stats, [specific], times=2)
+        self.sample(stats, [title], times=5)
+        self.sample(stats, [generic, title], times=1)
+        self.sample(stats, [], times=1)
+        # title goes before specific but not generic, they hit together
+        self.assertEqual(stats.order('g1', 'name', self.selectors), [specific, generic, title])
+
+        self.sample(stats, [generic], times=1)
+        self.assertEqual(stats.order('g1', 'name', self.selectors), [specific, generic, title])
+
+        stats = self.stats()
+        self.sample(stats, [specific], times=2)
+        self.sample(stats, [title], times=5)
+        self.sample(stats, [generic], times=3)
+        self.assertEqual(stats.order('g1', 'name', self.selectors), [title, generic, specific])
+
+    def test_order_ties_keep_spider_order(self):
+        stats = self.stats()
+        specific, generic, title = self.selectors
+        self.sample(stats, [title], times=2)
+        self.sample(stats, [generic], times=2)
+        self.assertEqual(stats.order('g1', 'name', self.selectors), [generic, title, specific])
+
+    def test_order_ignores_samples_of_other_selectors(self):
+        stats = self.stats()
+        self.sample(stats, self.selectors[2:], times=10)
+        changed = self.selectors + ['h2::text']
+        self.assertEqual(stats.order('g1', 'name', changed), changed)
+
+    def test_dead_selectors(self):
+        stats = self.stats()
+        for _ in range(4):
+            stats.record('g1', 'name', 'h1::text', False)
+            stats.record('g1', 'name', '.title::text', False)
+        stats.record('g1', 'name', '.title::text', True)
+        for _ in range(3):
+            stats.record('g1', 'description', '.lead::text', False)
+        self.assertEqual(list(stats.dead_selectors()), [('g1', 'name', 'h1::text', 4)])
+
+    def test_save_merges_counts_of_other_processes(self):
+        a, b = self.stats(), self.stats()
+        a.load()
+        b.load()
+        a.record('g1', 'name', 'h1::text', True)
+        self.sample(a, ['h1::text'])
+        b.record('g1', 'name', 'h1::text', False)
+        b.record('folha', 'name', 'h1::text', True)
+        self.sample(b, ['h1::text'])
+        a.save()
+        b.save()
+        # saved counts aren't added again
+        a.save()
+
+        with open(self.path) as f:
+            counts = json.load(f)
+        self.assertEqual(counts['g1']['name']['tries'], {'h1::text': [1, 1]})
+        self.assertEqual(counts['folha']['name']['tries'], {'h1::text': [1, 0]})
+        self.assertEqual(counts['g1']['name']['sampled'],
+                         {'selectors': self.selectors, 'patterns': {'h1::text': 2}})
+        self.assertEqual(b.load(), counts)
+        self.assertEqual(os.listdir(self.dir), ['selectors-stats.json'])
+
+    def test_invalid_file_ignored(self):
+        with open(self.path, 'w') as f:
+            f.write('{"g1":')
+        stats = self.stats()
+        self.assertEqual(stats.load(), {})
+        stats.record('g1', 'name', 'h1::text', True)
+        stats.save()
+        self.assertEqual(self.stats().load(), {'g1': {'name': {'tries': {'h1::text': [1, 0]}}}})
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+import pytest
+from scrapy.settings import Settings
+
+from ze.utils import shared_from_settings
+from ze.utils.selectorstats import SelectorStats
+
+
+class SharedFromSettingsTest(unittest.TestCase):
+
+    def test_one_instance_by_settings_values(self):
+        settings = Settings({'SELECTOR_STATS_FILE': '/tmp/ze-shared-a.json'})
+        a = shared_from_settings(SelectorStats, settings, 'SELECTOR_STATS_FILE')
+        self.assertIs(shared_from_settings(SelectorStats, settings.copy(), 'SELECTOR_STATS_FILE'), a)
+        
+        settings = Settings({'SELECTOR_STATS_FILE': '/tmp/ze-shared-b.json'})
+        b = shared_from_settings(SelectorStats, settings, 'SELECTOR_STATS_FILE')
+        self.assertIsNot(b, a)
+        self.assertEqual(b.path, '/tmp/ze-shared-b.json')
+
+
+class AllSpidersStateTest(unittest.TestCase):
+
+    def test_state_by_crawl(self):
+        # the spiders need the requirements.txt
+        spiders = pytest.importorskip('ze.spiders')
+        a, b = spiders.AllSpiders(), spiders.AllSpiders()
+        a.allowed_domains.append('g1.globo.com')
+        a.domains_items_refs['g1.globo.com'] = []
+        a.domains_download_slots['g1.globo.com'] = 'globo.com'
+        a.start_urls.append('http://g1.globo.com/')
+        self.assertEqual((b.allowed_domains, b.domains_items_refs,
+                          b.domains_download_slots, b.start_urls), ([], {}, {}, []))
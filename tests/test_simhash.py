@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import pytest
+from twisted.internet import defer
+from twisted.trial import unittest as trial
+from scrapy import Item, Field
+from scrapy.settings import Settings
+
+pytest.importorskip('numpy')
+from ze.exceptions import NearDuplicate
+from ze.utils.simhash import SimHasher, SimHashIndex, hamming_distance
+
+
+STORY = ('O presidente anunciou nesta segunda-feira um pacote de medidas para '
+         'estimular a economia, com cortes de impostos para a indústria e '
+         'crédito para pequenas empresas, segundo nota divulgada pelo governo')
+
+
+class SimHasherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.hasher = SimHasher(shingle_size=3)
+
+    def test_hamming_distance(self):
+        self.assertEqual(hamming_distance(0, 0), 0)
+        self.assertEqual(hamming_distance(0b1011, 0b0010), 2)
+        self.assertEqual(hamming_distance(0, (1 << 64) - 1), 64)
+
+    def test_stable_fingerprints(self):
+        fingerprint = self.hasher.fingerprint(STORY)
+        self.assertEqual(fingerprint, SimHasher(shingle_size=3).fingerprint(STORY.upper()))
+        self.assertLess(fingerprint, 1 << 64)
+        self.assertIsNone(self.hasher.fingerprint(' - '))
+
+    def test_near_duplicates_near(self):
+        fingerprint = self.hasher.fingerprint(STORY)
+        edited = self.hasher.fingerprint(STORY.replace('segunda-feira', 'terça-feira'))
+        other = self.hasher.fingerprint('Time vence o clássico no fim de semana e assume '
+                                        'a liderança do campeonato com dois gols no fim')
+        self.assertLess(hamming_distance(fingerprint, edited),
+                        hamming_distance(fingerprint, other))
+        self.assertGreater(hamming_distance(fingerprint, other), 10)
+
+    def test_shingle_size_bounds(self):
+        self.assertRaises(ValueError, SimHasher, 0)
+        self.assertRaises(ValueError, SimHasher, 10)
+
+
+class SimHashIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SimHashIndex(':memory:', max_distance=3)
+        self.index.open()
+
+    def tearDown(self):
+        self.index.close()
+
+    def test_bands_cover_the_bits(self):
+        self.assertEqual(self.index.bands, [(0, 16), (16, 16), (32, 16), (48, 16)])
+        self.assertEqual(SimHashIndex(':memory:', max_distance=4).bands,
+                         [(0, 12), (12, 12), (24, 12), (36, 12), (48, 16)])
+        fingerprint = 0x0123456789abcdef
+        self.assertEqual(self.index._bands_values(fingerprint),
+                         [(0, 0xcdef), (1, 0x89ab), (2, 0x4567), (3, 0x0123)])
+
+    def test_lookup_within_max_distance(self):
+        fingerprint = 0xf0f0f0f0f0f0f0f0
+        self.assertIsNone(self.index.lookup(fingerprint))
+        self.index.add('http://g1.globo.com/a', fingerprint)
+
+        # a bit changed on each band, no band shared
+        self.assertIsNone(self.index.lookup(fingerprint ^ 0x0001000100010001))
+        url, found, cluster, distance = self.index.lookup(fingerprint ^ 0b111)
+        self.assertEqual((url, found, distance), ('http://g1.globo.com/a', fingerprint, 3))
+        self.assertEqual(self.index.cluster_url(cluster), 'http://g1.globo.com/a')
+        self.assertIsNone(self.index.lookup(fingerprint ^ 0b1111))
+
+    def test_unsigned_fingerprints(self):
+        fingerprint = (1 << 64) - 2
+        self.index.add('http://g1.globo.com/a', fingerprint)
+        self.assertEqual(self.index.lookup(fingerprint)[1:], (fingerprint, 1, 0))
+
+    def test_nearest_of_the_cluster(self):
+        self.index.add('http://g1.globo.com/a', 0)
+        cluster = self.index.lookup(0b1)[2]
+        self.index.add('http://extra.globo.com/a', 0b11, cluster)
+        self.index.add('http://extra.globo.com/a', 0b11, cluster)
+        url, _, found, distance = self.index.lookup(0b111)
+        self.assertEqual((url, found, distance), ('http://extra.globo.com/a', cluster, 1))
+        self.assertEqual(self.index.cluster_url(found), 'http://g1.globo.com/a')
+
+
+class SharedSimHashIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'near-duplicates.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_adds_committed(self):
+        a, b = SimHashIndex(self.path), SimHashIndex(self.path)
+        a.open()
+        b.open()
+        try:
+            a.add('http://g1.globo.com/a', 0xff)
+            # not locked by a transaction of a
+            b.db.execute('BEGIN IMMEDIATE')
+            b.db.rollback()
+            self.assertIsNotNone(b.lookup(0xff))
+        except sqlite3.OperationalError as e:
+            self.fail(str(e))
+        finally:
+            a.close()
+            b.close()
+
+
+class Story(Item):
+    url = Field()
+    name = Field()
+    articleBody = Field()
+    simhash = Field()
+    nearDuplicateOf = Field()
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.values = {}
+
+    def inc_value(self, key, count=1):
+        self.values[key] = self.values.get(key, 0) + count
+
+
+class NearDuplicatesPipelineTest(trial.TestCase):
+
+    def setUp(self):
+        # the pipelines need the packages of requirements.txt
+        try:
+            from ze.pipelines import NearDuplicatesPipeline
+        except ImportError as e:
+            raise unittest.SkipTest(str(e))
+        settings = Settings()
+        settings.setmodule('ze.settings')
+        settings.setdict({'NEAR_DUPLICATES_ENABLED': True, 'NEAR_DUPLICATES_FILE': ':memory:',
+                          'NEAR_DUPLICATES_DROP': True})
+        self.stats = Stats()
+        self.pipeline = NearDuplicatesPipeline(settings, self.stats)
+        self.pipeline.open_spider(None)
+
+    def tearDown(self):
+        self.pipeline.close_spider(None)
+
+    @defer.inlineCallbacks
+    def test_default_fields_fingerprinted(self):
+        self.assertEqual(self.pipeline.fields, ['name', 'articleBody'])
+        first = yield self.pipeline.process_item(
+            Story(url='http://g1.globo.com/a', name='Ao vivo', articleBody=STORY), None)
+        self.assertNotIn('nearDuplicateOf', first)
+        # same generic headline, other story
+        other = yield self.pipeline.process_item(
+            Story(url='http://g1.globo.com/b', name='Ao vivo',
+                  articleBody='Time vence o clássico no fim de semana e assume a '
+                              'liderança do campeonato com dois gols no fim'), None)
+        self.assertNotIn('nearDuplicateOf', other)
+        self.assertNotEqual(other['simhash'], first['simhash'])
+
+        republished = Story(url='http://extra.globo.com/a', name='Ao vivo', articleBody=STORY)
+        yield self.assertFailure(self.pipeline.process_item(republished, None), NearDuplicate)
+        self.assertEqual(self.stats.values['near_duplicates/count'], 1)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from scrapy.http import Request, Response
+from scrapy.settings import Settings
+
+from ze import settings as ze_settings
+from ze.middlewares.downloader.throttle import AdaptiveConcurrencyMiddleware, DomainSlotState
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.values = {}
+
+    def inc_value(self, key, count=1):
+        self.values[key] = self.values.get(key, 0) + count
+
+    def set_value(self, key, value):
+        self.values[key] = value
+
+    def max_value(self, key, value):
+        self.values[key] = max(self.values.get(key, value), value)
+
+
+class Slot(object):
+
+    def __init__(self, concurrency, delay):
+        self.concurrency = concurrency
+        self.delay = delay
+        self.transferring = set()
+
+
+class Crawler(object):
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.stats = Stats()
+        self.engine = type('Engine', (), {})()
+        self.engine.downloader = type('Downloader', (), {'slots': {}})()
+
+
+class Spider(object):
+    name = 'g1'
+    allowed_domains = ['globo.com', 'g1.globo.com']
+
+
+class DomainSlotStateTest(unittest.TestCase):
+
+    def test_moving_averages(self):
+        state = DomainSlotState(4, 0, 1, 8, 0, 60)
+        state.observe(1.0, False, 0.5)
+        self.assertEqual((state.latency, state.error_rate, state.responses), (1.0, 0.0, 1))
+        state.observe(3.0, True, 0.5)
+        self.assertEqual((state.latency, state.error_rate, state.responses), (2.0, 0.5, 2))
+        state.observe(None, False, 0.5)
+        self.assertEqual((state.latency, state.error_rate, state.responses), (2.0, 0.25, 3))
+
+
+class AdaptiveConcurrencyMiddlewareTest(unittest.TestCase):
+
+    def setUp(self):
+        settings = Settings()
+        settings.setmodule(ze_settings)
+        settings.set('CONCURRENT_REQUESTS_PER_DOMAIN', 4)
+        settings.set('DOWNLOAD_DELAY', 0)
+        settings.set('ADAPTIVE_CONCURRENCY_WINDOW', 5)
+        self.crawler = Crawler(settings)
+        self.slots = self.crawler.engine.downloader.slots
+        for domain in ('g1.globo.com', 'globo.com', 'example.com'):
+            self.slots[domain] = Slot(4, 0)
+        self.mw = AdaptiveConcurrencyMiddleware(self.crawler)
+        self.spider = Spider()
+
+    def download(self, url='http://g1.globo.com/a.html', status=200, latency=0.5,
+                 headers=None):
+        request = Request(url, meta={'download_latency': latency})
+        self.mw.process_request(request, self.spider)
+        self.mw.process_response(request, Response(url, status=status, headers=headers),
+                                 self.spider)
+        return self.mw.domains[request.meta['download_slot']]
+
+    def test_slot_of_the_longest_allowed_domain(self):
+        self.download('http://g1.globo.com/a.html')
+        self.download('http://oglobo.globo.com/a.html')
+        self.download('http://example.com/a.html')
+        self.assertEqual(sorted(self.mw.domains), ['example.com', 'g1.globo.com', 'globo.com'])
+
+    def test_concurrency_increased_by_window(self):
+        for _ in range(4):
+            state = self.download()
+        self.assertEqual((state.concurrency, self.slots['g1.globo.com'].concurrency), (4, 4))
+        state = self.download()
+        self.assertEqual((state.concurrency, self.slots['g1.globo.com'].concurrency), (5, 5))
+        self.assertEqual(self.crawler.stats.values[
+            'adaptive_concurrency/g1.globo.com/max_concurrency'], 5)
+
+    def test_concurrency_decreased_by_latency(self):
+        for _ in range(5):
+            state = self.download(latency=5)
+        self.assertEqual(state.concurrency, 3)
+
+    def test_backoff(self):
+        state = self.download(status=503)
+        self.assertEqual((state.concurrency, state.delay), (2, 0.5))
+        state = self.download(status=429)
+        self.assertEqual((state.concurrency, state.delay), (1, 1.0))
+        self.assertEqual(self.slots['g1.globo.com'].delay, 1.0)
+        self.assertEqual(self.crawler.stats.values[
+            'adaptive_concurrency/g1.globo.com/backoff_count'], 2)
+
+    def test_backoff_retry_after(self):
+        state = self.download(status=503, headers={'Retry-After': '30'})
+        self.assertEqual((state.concurrency, state.delay), (2, 30.0))
+        # delay is bounded by the max delay
+        state = self.download(status=503, headers={'Retry-After': '120'})
+        self.assertEqual(state.delay, 60)
+        # dates aren't parsed
+        state = self.download('http://example.com/a.html', status=503,
+                              headers={'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+        self.assertEqual(state.delay, 0.5)
+
+    def test_errors_decrease_over_max_error_rate(self):
+        state = self.download(status=500)
+        # error rate 0.2 > 0.1
+        self.assertEqual((state.concurrency, state.delay), (3, 0.25))
+        state = self.download(status=502)
+        self.assertEqual((state.concurrency, state.delay), (2, 0.375))
+        self.assertEqual(self.slots['g1.globo.com'].concurrency, 2)
+        # the increase of the window waits the error rate under the max
+        for _ in range(3):
+            state = self.download()
+        self.assertGreater(state.error_rate, 0.1)
+        self.assertEqual(state.concurrency, 2)
+        for _ in range(5):
+            state = self.download()
+        self.assertLess(state.error_rate, 0.1)
+        self.assertEqual(state.concurrency, 3)
+
+    def test_exceptions_are_errors(self):
+        request = Request('http://g1.globo.com/a.html')
+        self.mw.process_request(request, self.spider)
+        self.mw.process_exception(request, IOError(), self.spider)
+        self.assertEqual(self.mw.domains['g1.globo.com'].concurrency, 3)
+
+    def test_spider_limits(self):
+        self.spider.download_slots = {'max_concurrency': 2, 'start_delay': 1.0}
+        state = self.download()
+        self.assertEqual((state.concurrency, state.delay), (2, 1.0))
+        for _ in range(4):
+            state = self.download()
+        self.assertEqual(state.concurrency, 2)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import unittest
+from collections import deque
+
+from twisted.internet import defer
+from twisted.trial import unittest as trial_unittest
+from scrapy.http import HtmlResponse
+from scrapy.settings import Settings
+
+from ze.extensions.stats import TimingStats
+from ze.utils.timing import Timings
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.values = {}
+
+    def set_value(self, key, value):
+        self.values[key] = value
+
+
+class Spider(object):
+    name = 'g1'
+
+
+class SyncPipeline(object):
+
+    def process_item(self, item, spider):
+        item['sync'] = True
+        return item
+
+
+class DeferredPipeline(object):
+
+    def __init__(self):
+        self.deferreds = []
+
+    def process_item(self, item, spider):
+        d = defer.Deferred()
+        self.deferreds.append((d, item))
+        return d
+
+
+class FailingPipeline(object):
+
+    def process_item(self, item, spider):
+        raise ValueError('invalid item')
+
+
+class TimingStatsTest(trial_unittest.TestCase):
+
+    def setUp(self):
+        self.stats = Stats()
+        self.ext = TimingStats(Settings({'TIMING_STATS_ENABLED': True}), self.stats)
+        self.deferred_pipeline = DeferredPipeline()
+        self.methods = {'process_item': deque([SyncPipeline().process_item,
+                                               self.deferred_pipeline.process_item,
+                                               FailingPipeline().process_item])}
+        itemproc = type('ItemPipelineManager', (), {'methods': self.methods})()
+        scraper = type('Scraper', (), {'itemproc': itemproc})()
+        engine = type('Engine', (), {'scraper': scraper})()
+        self.ext.crawler = type('Crawler', (), {'engine': engine})()
+        self.spider = Spider()
+
+    def count(self, stage):
+        histogram = self.ext.timings.histograms.get(('g1', stage))
+        return histogram.count if histogram else 0
+
+    def test_pipelines_timed(self):
+        self.ext.spider_opened(self.spider)
+        self.assertIs(self.spider.timings, self.ext.timings)
+        sync, deferred, failing = self.methods['process_item']
+
+        self.assertEqual(sync({}, self.spider), {'sync': True})
+        self.assertEqual(self.count('pipeline/SyncPipeline'), 1)
+
+        d = deferred({'name': 'Enem'}, self.spider)
+        self.assertIsInstance(d, defer.Deferred)
+        # timed only when the deferred fires
+        self.assertEqual(self.count('pipeline/DeferredPipeline'), 0)
+        pipeline_d, item = self.deferred_pipeline.deferreds[0]
+        pipeline_d.callback(item)
+        self.assertEqual(self.successResultOf(d), {'name': 'Enem'})
+        self.assertEqual(self.count('pipeline/DeferredPipeline'), 1)
+
+        d = deferred({}, self.spider)
+        self.deferred_pipeline.deferreds[1][0].errback(ValueError('dropped'))
+        self.failureResultOf(d, ValueError)
+        self.assertEqual(self.count('pipeline/DeferredPipeline'), 2)
+
+        self.assertRaises(ValueError, failing, {}, self.spider)
+        self.assertEqual(self.count('pipeline/FailingPipeline'), 1)
+
+    def test_methods_of_a_list_replaced_in_place(self):
+        methods = self.methods['process_item'] = list(self.methods['process_item'])
+        self.ext.spider_opened(self.spider)
+        self.assertIs(self.methods['process_item'], methods)
+        self.assertEqual([m.__name__ for m in methods], ['timed_process_item'] * 3)
+
+    def test_stats_set_on_close(self):
+        self.ext.timings.add('g1', 'selectors/name', 0.002)
+        self.ext.timings.add('g1', 'selectors/name', 0.004)
+        self.ext.spider_closed(self.spider)
+        self.assertEqual(self.stats.values['timing/g1/selectors/name/count'], 2)
+        self.assertAlmostEqual(self.stats.values['timing/g1/selectors/name/sum_ms'], 6)
+        self.assertIn('timing/g1/selectors/name/p99_ms', self.stats.values)
+
+
+class TimedItemLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        # the items need the packages of requirements.txt
+        try:
+            from ze.items import ItemLoader
+            from ze.items.creativework import ArticleItem
+        except ImportError as e:
+            raise unittest.SkipTest(str(e))
+        self.response = HtmlResponse('https://g1.globo.com/enem.html', encoding='utf-8',
+                                     body='<h1> Enem 2017 </h1>'.encode('utf-8'))
+        self.loader = lambda **context: ItemLoader(ArticleItem(), response=self.response,
+                                                   spider_name='g1', **context)
+
+    def test_stages_of_fields_timed(self):
+        timings = Timings()
+        loader = self.loader(timings=timings)
+        loader.add_css('name', 'h1::text')
+        loader.add_css('description', '.lead::text')
+        item = loader.load_item()
+        self.assertEqual(item['name'], 'Enem 2017')
+        self.assertEqual(sorted(stage for _, stage in timings.histograms), [
+            'input/description', 'input/name', 'output/name',
+            'selectors/description', 'selectors/name'])
+        self.assertEqual(timings.histograms[('g1', 'selectors/name')].count, 1)
+
+    def test_same_values_without_timings(self):
+        loader = self.loader()
+        loader.add_css('name', 'h1::text')
+        self.assertEqual(loader.load_item()['name'], 'Enem 2017')
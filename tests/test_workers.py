@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+import pytest
+from scrapy.settings import Settings
+
+# the workers run the processors of items, that need the requirements.txt
+workers = pytest.importorskip('ze.utils.workers')
+
+
+_initialized = False
+
+
+def mark_initialized():
+    global _initialized
+    _initialized = True
+
+
+def worker_state():
+    time.sleep(0.1)
+    return os.getpid(), _initialized, 'wsgiref.validate' in sys.modules
+
+
+class ProcessPoolTest(unittest.TestCase):
+
+    def test_every_worker_initialized_before_tasks(self):
+        if 'wsgiref.validate' in sys.modules:
+            self.skipTest('wsgiref.validate already imported by the tests process')
+
+        pool = workers.ProcessPool(2, warm_modules=['wsgiref'], initializer=mark_initialized)
+        pool.start()
+        try:
+            futures = [pool.executor.submit(worker_state) for _ in range(6)]
+            results = [f.result(timeout=30) for f in futures]
+        finally:
+            pool.executor.shutdown(True)
+
+        self.assertEqual(set((initialized, warmed) for _, initialized, warmed in results),
+                         set([(True, True)]))
+        self.assertLessEqual(len(set(pid for pid, _, _ in results)), 2)
+
+    def test_default_warm_modules_imported(self):
+        settings = Settings()
+        settings.setmodule('ze.settings')
+        pool = workers.ProcessPool.from_settings(settings)
+        self.assertEqual(pool.warm_modules, ['ze.items', 'ze.processors', 'ze.spiders'])
+        with mock.patch.object(workers.logger, 'warning') as warning:
+            workers.warm(pool.warm_modules)
+        self.assertFalse(warning.called, warning.call_args)
+        self.assertIn('ze.processors.html', sys.modules)
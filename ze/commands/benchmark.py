@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.http import HtmlResponse
+
+from ze.utils.extraction import spider_registry
+from ze.utils.samplepages import sample_page
+from ze.utils.timing import StageTimer
+
+
+class Command(ScrapyCommand):
+
+    requires_project = True
+    # headers of responses that don't describe the stored body
+    transfer_headers = ('content-encoding', 'content-length', 'transfer-encoding')
+
+    def syntax(self):
+        return '[run [spider ...] | record <spider> <url> ... | generate [spider ...]]'
+
+    def short_desc(self):
+        return 'Benchmark the extraction of items of the pages stored for spiders'
+
+    def long_desc(self):
+        return ('"record" stores pages of a spider on BENCHMARK_PAGES_DIR/<spider>, '
+                '"generate" stores a page built from the selectors of each spider. '
+                '"run" times load_item on the stored pages by stage (selectors, '
+                'ImproveHTML, ParseDate, AuthorParse, KeywordsParse) with items/sec, '
+                'then measures the peak memory on another pass, and writes the '
+                'results as JSON.')
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_option('-o', '--output', dest='output', default=None,
+                          help='JSON file of results (default: stdout)')
+        parser.add_option('-r', '--repeat', dest='repeat', type='int', default=3,
+                          help='times that each page is extracted')
+
+    def run(self, args, opts):
+        action = args.pop(0) if args and args[0] in ('run', 'record', 'generate') else 'run'
+        # processors run when the item is loaded, so they are timed
+        self.settings.set('DEFERRED_PROCESSORS_ENABLED', False)
+        self.pages_dir = self.settings.get('BENCHMARK_PAGES_DIR')
+        self.registry = spider_registry(self.settings)
+        
+        if action == 'record':
+            if len(args) < 2:
+                raise UsageError('Use "scrapy benchmark record <spider> <url> ..."')
+            return self.record(args[0], args[1:])
+        if action == 'generate':
+            return self.generate(args or sorted(self.registry.spider_names))
+        
+        results = self.benchmark(args or sorted(self.registry.spider_names), opts.repeat)
+        output = json.dumps(results, indent=2, sort_keys=True)
+        if opts.output:
+            with open(opts.output, 'w') as f:
+                f.write(output)
+        else:
+            print(output)
+
+    def record(self, spider_name, urls):
+        import requests
+        for url in urls:
+            page = requests.get(url, headers={'User-Agent': self.settings.get('USER_AGENT')},
+                                timeout=self.settings.getfloat('DOWNLOAD_TIMEOUT'))
+            page.raise_for_status()
+            # the encoding is found from the headers or the page meta, like on crawls,
+            # the body is already decoded of the transfer
+            headers = dict((k, v) for k, v in page.headers.items()
+                           if k.lower() not in self.transfer_headers)
+            path = self.store_page(spider_name, page.content, {
+                'url': page.url,
+                'headers': headers,
+                'recorded': datetime.utcnow().isoformat(),
+            })
+            print('Recorded %s on %s' % (url, path))
+
+    def generate(self, spider_names):
+        for spider_name in spider_names:
+            Spider = self.registry.spider(spider_name)
+            if not getattr(Spider, 'allowed_domains', None):
+                print('Skipped %s, it has no allowed_domains' % spider_name)
+                continue
+            url = 'https://%s/noticia/2017/08/01/enem-2017.html' % Spider.allowed_domains[0]
+            html = sample_page(self.registry.items_refs(spider_name), url)
+            path = self.store_page(spider_name, html.encode('utf-8'), {
+                'url': url,
+                'headers': {'Content-Type': 'text/html; charset=utf-8'},
+                'generated': 'selectors',
+            })
+            print('Generated %s' % path)
+
+    def store_page(self, spider_name, body, meta):
+        spider_dir = os.path.join(self.pages_dir, spider_name)
+        os.makedirs(spider_dir, exist_ok=True)
+        name = str(len([f for f in os.listdir(spider_dir) if f.endswith('.html')]) + 1)
+        with open(os.path.join(spider_dir, name + '.html'), 'wb') as f:
+            f.write(body)
+        with open(os.path.join(spider_dir, name + '.json'), 'w') as f:
+            json.dump(meta, f, indent=2, sort_keys=True)
+        return os.path.join(spider_dir, name + '.html')
+
+    def pages(self, spider_name):
+        spider_dir = os.path.join(self.pages_dir, spider_name)
+        if not os.path.isdir(spider_dir):
+            return []
+        
+        responses = []
+        for name in sorted(f[:-5] for f in os.listdir(spider_dir) if f.endswith('.html')):
+            with open(os.path.join(spider_dir, name + '.json')) as f:
+                meta = json.load(f)
+            with open(os.path.join(spider_dir, name + '.html'), 'rb') as f:
+                responses.append(HtmlResponse(meta['url'], body=f.read(),
+                                              headers=meta.get('headers')))
+        return responses
+
+    def stages(self):
+        from ze.items import ItemLoader
+        from ze.processors.html import ImproveHTML
+        from ze.processors.common import ParseDate
+        from ze.processors.schema import AuthorParse, KeywordsParse
+        return {
+            'selectors': (ItemLoader, '_get_cssvalues'),
+            'ImproveHTML': (ImproveHTML, '__call__'),
+            'ParseDate': (ParseDate, '__call__'),
+            'AuthorParse': (AuthorParse, '__call__'),
+            'KeywordsParse': (KeywordsParse, '__call__'),
+        }
+
+    def benchmark(self, spider_names, repeat):
+        results = {
+            'commit': self.commit(),
+            'python': platform.python_version(),
+            'date': datetime.utcnow().isoformat(),
+            'repeat': repeat,
+            'spiders': {},
+        }
+        
+        for spider_name in spider_names:
+            responses = self.pages(spider_name)
+            if not responses:
+                continue
+            
+            spider = self.registry.spider(spider_name)()
+            spider.settings = self.settings
+            items_refs = self.registry.items_refs(spider_name)
+            # warm the imports and caches before timing
+            for item_ref in items_refs:
+                spider.load_item(item_ref, responses[0])
+            
+            timer = StageTimer(); items = 0
+            with timer.instrument(self.stages()):
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    for response in responses:
+                        for item_ref in items_refs:
+                            spider.load_item(item_ref, response)
+                            items += 1
+                seconds = time.perf_counter() - start
+            
+            # tracemalloc slows down allocations, so not on the timed pass
+            tracemalloc.start()
+            for response in responses:
+                for item_ref in items_refs:
+                    spider.load_item(item_ref, response)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            
+            results['spiders'][spider_name] = {
+                'pages': len(responses),
+                'items': items,
+                'seconds': seconds,
+                'items_per_second': items / seconds if seconds else None,
+                'peak_memory': peak_memory,
+                'stages': dict((stage, {'seconds': timer.seconds[stage],
+                                        'calls': timer.calls[stage]})
+                               for stage in timer.seconds),
+            }
+        
+        spiders = results['spiders'].values()
+        items, seconds = sum(s['items'] for s in spiders), sum(s['seconds'] for s in spiders)
+        results['total'] = {
+            'items': items,
+            'seconds': seconds,
+            'items_per_second': items / seconds if seconds else None,
+            'peak_memory': max([s['peak_memory'] for s in spiders] or [0]),
+        }
+        return results
+
+    def commit(self):
+        try:
+            return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                           stderr=subprocess.DEVNULL).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from scrapy.commands import ScrapyCommand
+
+from ze.utils.proxies import ProxyPool, StandInProxyServer
+
+
+class Command(ScrapyCommand):
+
+    requires_project = True
+
+    def syntax(self):
+        return '[options]'
+
+    def short_desc(self):
+        return 'Check the proxies of PROXY_POOL_LIST and save their health scores'
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_option('--url', dest='url', default=None,
+                          help='URL requested through each proxy (default: PROXY_POOL_CHECK_URL)')
+        parser.add_option('-c', '--concurrency', dest='concurrency', type='int', default=None,
+                          help='number of proxies checked at same time')
+        parser.add_option('--timeout', dest='timeout', type='float', default=None,
+                          help='seconds to wait for each proxy')
+        parser.add_option('--stand-in', dest='stand_in', type='int', default=0,
+                          help='check N local stand-in proxies instead of the list, '
+                               'half of them answering 503')
+
+    def run(self, args, opts):
+        url = opts.url or self.settings.get('PROXY_POOL_CHECK_URL')
+        concurrency = opts.concurrency or self.settings.getint('PROXY_POOL_CHECK_CONCURRENCY')
+        timeout = opts.timeout or self.settings.getfloat('PROXY_POOL_CHECK_TIMEOUT')
+        ban_status = set(int(s) for s in self.settings.getlist('PROXY_POOL_BAN_STATUS'))
+
+        stand_in_servers = []
+        if opts.stand_in:
+            stand_in_servers = [StandInProxyServer(status=503 if i % 2 else 200).start()
+                                for i in range(opts.stand_in)]
+            pool = ProxyPool(None, proxies=[s.url for s in stand_in_servers])
+        else:
+            pool = ProxyPool.from_settings(self.settings)
+        proxies = list(pool.scores)
+
+        def check(proxy):
+            start = time.time()
+            try:
+                response = requests.get(url, proxies={'http': proxy, 'https': proxy},
+                                        timeout=timeout)
+                ok = response.status_code < 500 and response.status_code not in ban_status
+            except requests.RequestException:
+                ok = False
+            return proxy, ok, time.time() - start
+
+        working = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(check, proxy) for proxy in proxies]
+            for checked, future in enumerate(as_completed(futures), 1):
+                proxy, ok, latency = future.result()
+                if ok:
+                    working += 1
+                    pool.mark_success(proxy, latency)
+                else:
+                    pool.mark_failure(proxy)
+                sys.stdout.write('Checked proxies: %d/%d, working: %d\r'
+                                 % (checked, len(proxies), working))
+                sys.stdout.flush()
+
+        sys.stdout.write('\n')
+        for server in stand_in_servers:
+            server.stop()
+
+        if not opts.stand_in:
+            pool.save()
+            print('Scores saved on %s' % pool.scores_path)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+import json
+import zlib
+import shutil
+import tempfile
+import subprocess
+from pprint import pformat
+import logging; logger = logging.getLogger(__name__)
+
+from scrapy.commands.crawl import Command as CrawlCommand
+from scrapy.exceptions import UsageError
+from scrapy.utils.project import data_path
+
+from ze.utils import url_domain
+from ze.utils.registry import SpiderRegistry
+from ze.spiders import AllSpiders
+from ze.middlewares.spider.searchengines import GoogleSearchMiddleware
+
+
+# maxima and gauges of each worker, like memusage/max, that aren't summed
+MAXIMUM_STATS = re.compile(r'(^|[/_])max([/_]|$)|^memusage/|^startup/|^timing/.+/p\d+_ms$'
+                           r'|^adaptive_concurrency/.+/(concurrency|delay|latency)$'
+                           r'|^proxy_pool/available$')
+
+
+def merge_stats(shards_stats):
+    """Sum the numbers of the workers stats, except the maxima and gauges of
+    ``MAXIMUM_STATS`` that are the greatest one, start/finish times are the
+    first and the last one"""
+    stats = {}
+    for shard_stats in shards_stats:
+        for key, value in shard_stats.items():
+            if key not in stats:
+                stats[key] = value
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                stats[key] = max(stats[key], value) if MAXIMUM_STATS.search(key) \
+                             else stats[key] + value
+            elif key == 'start_time':
+                stats[key] = min(stats[key], value)
+            elif key == 'finish_time':
+                stats[key] = max(stats[key], value)
+    return stats
+
+
+class Command(CrawlCommand):
+    
+    def syntax(self):
+        return '[options] all'
+
+    def short_desc(self):
+        return 'Run spider all on worker processes with seeds sharded by domain'
+
+    def long_desc(self):
+        return ('Search the seeds once and start a "scrapy crawl all" worker '
+                'by shard (-a shards=N, default is one by CPU) with the seeds of '
+                'the domains of its shard, so each domain is crawled by only '
+                'one worker. Items of -o (jsonlines) and stats of workers are '
+                'merged when all of them end.')
+
+    def run(self, args, opts):
+        if len(args) != 1 or args[0] != AllSpiders.name:
+            raise UsageError('crawlsharded only runs the spider %s' % AllSpiders.name)
+        # the format is inferred from the extension, like jl of -o items.jl
+        exporters = self.settings.getwithbase('FEED_EXPORTERS')
+        if opts.output and exporters.get(opts.output_format) != exporters['jsonlines']:
+            raise UsageError('crawlsharded only merges jsonlines outputs')
+        
+        spargs = dict(opts.spargs)
+        shards = int(spargs.pop('shards', os.cpu_count() or 1))
+        
+        spider, seeds_meta = self.search(args[0], spargs)
+        domains_spiders = self.domains_spiders(spargs)
+        domains = sorted(domains_spiders, key=len, reverse=True)
+        
+        shards_seeds = [([], {}, set()) for _ in range(shards)]
+        without_spider = []
+        for url in spider.start_urls:
+            domain = next((d for d in domains if url_domain(url) == d \
+                           or url_domain(url).endswith('.' + d)), None)
+            if domain is None:
+                without_spider.append(url)
+                continue
+            start_urls, shard_seeds_meta, spiders = \
+                shards_seeds[zlib.crc32(domain.encode('utf-8')) % shards]
+            start_urls.append(url)
+            if url in seeds_meta:
+                shard_seeds_meta[url] = seeds_meta[url]
+            spiders.add(domains_spiders[domain])
+        if without_spider:
+            logger.warning('Ignoring %d seeds of domains without spider:\n%s',
+                           len(without_spider), pformat(without_spider))
+        
+        shards_dir = tempfile.mkdtemp(prefix='crawl-', dir=data_path('shards', createdir=True))
+        workers = []
+        for shard, (start_urls, shard_seeds_meta, spiders) in enumerate(shards_seeds):
+            if not start_urls:
+                continue
+            workers.append((shard, self.start_worker(shard, shards_dir, spargs, opts,
+                                                     start_urls, shard_seeds_meta, spiders)))
+        
+        logger.info('Crawling %d seeds on %d workers, logs on %s',
+                    len(spider.start_urls) - len(without_spider), len(workers), shards_dir)
+        failed = [shard for shard, worker in workers if worker.wait() != 0]
+        if failed:
+            logger.error('Workers of shards %s failed, see their logs on %s', failed, shards_dir)
+            self.exitcode = 1
+        
+        self.merge(shards_dir, [shard for shard, _ in workers], opts)
+        if not failed:
+            shutil.rmtree(shards_dir)
+
+    def search(self, spider_name, spargs):
+        """Search the seeds once, like the spider would when opened"""
+        crawler = self.crawler_process.create_crawler(spider_name)
+        spider = crawler.spidercls(**spargs)
+        GoogleSearchMiddleware(crawler).spider_opened(spider)
+        return spider, getattr(spider, 'seeds_meta', {})
+
+    def domains_spiders(self, spargs):
+        spider_names = spargs['spiders'].split(',') if 'spiders' in spargs else None
+        return SpiderRegistry.from_settings(self.settings, spider_names,
+                                            AllSpiders.spiders_ignored).domains
+
+    def start_worker(self, shard, shards_dir, spargs, opts, start_urls, seeds_meta, spiders):
+        path = lambda ext: os.path.join(shards_dir, 'shard-%d.%s' % (shard, ext))
+        with open(path('seeds.json'), 'w') as f:
+            json.dump({'start_urls': start_urls, 'seeds_meta': seeds_meta}, f, default=str)
+        
+        command = [sys.executable, '-m', 'scrapy.cmdline', 'crawl', AllSpiders.name,
+                   '-a', 'seeds_file=%s' % path('seeds.json'),
+                   '-a', 'spiders=%s' % ','.join(sorted(spiders)),
+                   '-s', 'STATS_DUMP_FILE=%s' % path('stats.json'),
+                   '--logfile', path('log')]
+        for name, value in spargs.items():
+            if name not in ('spiders', 'seeds_file'):
+                command += ['-a', '%s=%s' % (name, value)]
+        for setting in opts.set:
+            command += ['-s', setting]
+        if opts.output:
+            command += ['-o', path('jl'), '-t', 'jsonlines']
+        
+        return subprocess.Popen(command)
+
+    def merge(self, shards_dir, shards, opts):
+        path = lambda shard, ext: os.path.join(shards_dir, 'shard-%d.%s' % (shard, ext))
+        
+        shards_stats = []
+        for shard in shards:
+            if os.path.isfile(path(shard, 'stats.json')):
+                with open(path(shard, 'stats.json')) as f:
+                    shards_stats.append(json.load(f))
+        stats = merge_stats(shards_stats)
+        stats['shards_count'] = len(shards)
+        logger.info('Dumping merged Scrapy stats:\n%s', pformat(stats))
+        
+        if opts.output:
+            output = sys.stdout if opts.output == '-' else open(opts.output, 'a')
+            try:
+                for shard in shards:
+                    if os.path.isfile(path(shard, 'jl')):
+                        with open(path(shard, 'jl')) as f:
+                            shutil.copyfileobj(f, output)
+            finally:
+                if output is not sys.stdout:
+                    output.close()
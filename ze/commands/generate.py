@@ -4,8 +4,11 @@ import json
 import re
 from datetime import datetime
 from scrapy.commands import ScrapyCommand
+from scrapy.spiderloader import SpiderLoader
 from croniter import croniter
 
+from ze.utils.registry import build_manifest
+
 jobs = [{
     'schedules': (
         '0 8,12,17 * * MON,TUE,WED,THU,FRI',
@@ -179,9 +182,12 @@ class Command(ScrapyCommand):
 
     def short_desc(self):
         return """Generate an JSON line *.jl file to schedule periodic jobs 
-                  with bin/schedule_periodic_jobs.jh"""
+                  with bin/schedule_periodic_jobs.jh or the spiders manifest"""
         
     def run(self, args, opts):
+        if 'manifest' in args:
+            self.generate_manifest()
+        
         # FIXME add path from args
         if 'periodicjob' in args:
             jobs_file = open('./jobs.jl', mode='w+')
@@ -269,6 +275,13 @@ scrapy crawl all -a search='%s' -a query='%s' -a regex='%s' -a dateRestrict='%s'
         if 'crawllallshell' in args:
             jobs_script.close()
     
+    def generate_manifest(self):
+        path = self.settings.get('SPIDER_MANIFEST_FILE')
+        manifest = build_manifest(SpiderLoader.from_settings(self.settings))
+        with open(path, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+        print('Manifest of %d spiders generated on %s' % (len(manifest), path))
+    
     def generate_job_dict(self, spider_name, keyword, search_in_json=False):
         spider = {
             'name': spider_name,
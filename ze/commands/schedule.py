@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import json
+from datetime import datetime, timedelta
+import logging; logger = logging.getLogger(__name__)
+
+import pytz
+from croniter import croniter
+from twisted.internet import reactor
+from scrapy.commands import ScrapyCommand
+
+from ze.commands.generate import jobs, Command as GenerateCommand
+
+
+class Command(ScrapyCommand):
+
+    requires_project = True
+
+    def syntax(self):
+        return '[options]'
+
+    def short_desc(self):
+        return 'Run the crawls of the jobs table when their schedules are due'
+
+    def long_desc(self):
+        return ('Daemon that runs the crawls of the jobs of "scrapy generate" on '
+                'their cron schedules. All crawls due in the same minute run '
+                'together in this process, which keeps the spiders loaded and '
+                'the database clients connected between them.')
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_option('--timezone', dest='timezone', default=None,
+                          help='timezone of the schedules (default: SCHEDULE_TIMEZONE)')
+        parser.add_option('--dry-run', dest='dry_run', action='store_true',
+                          help='list the next fire times of the jobs and exit')
+
+    def run(self, args, opts):
+        self.timezone = pytz.timezone(opts.timezone or self.settings.get('SCHEDULE_TIMEZONE'))
+        self.running = set()
+        self.schedules = [(cron_notation, job) for job in jobs
+                          for cron_notation in job['schedules']]
+        
+        if opts.dry_run:
+            fire_time, due = self.next_due()
+            for _ in range(10):
+                print('%s\t%s' % (fire_time.isoformat(), ', '.join(c for c, _ in due)))
+                fire_time, due = self.next_due(fire_time)
+            return
+        
+        self.schedule_next()
+        self.crawler_process.start(stop_after_crawl=False)
+
+    def next_due(self, after=None):
+        """Return the next fire time and the schedules due on its minute,
+        cron notations are of ``timezone``"""
+        after = after.astimezone(self.timezone) if after else datetime.now(self.timezone)
+        fire_times = [(croniter(cron_notation, after).get_next(datetime), (cron_notation, job))
+                      for cron_notation, job in self.schedules]
+        fire_time = min(t for t, _ in fire_times)
+        minute = fire_time.replace(second=0, microsecond=0)
+        due = [s for t, s in fire_times if minute <= t < minute + timedelta(minutes=1)]
+        return fire_time, due
+
+    def schedule_next(self, after=None):
+        fire_time, due = self.next_due(after)
+        delay = max(0, (fire_time - datetime.now(self.timezone)).total_seconds())
+        logger.info('Next %d schedules on %s', len(due), fire_time.isoformat())
+        reactor.callLater(delay, self.fire, fire_time, due)
+
+    def fire(self, fire_time, due):
+        generate = GenerateCommand()
+        for cron_notation, job in due:
+            for spider_name in job['spiders']:
+                for keyword in job['search_arg_keywords']:
+                    crawl_key = (spider_name, keyword['name'])
+                    if crawl_key in self.running:
+                        logger.warning('Crawl of %s with %s is still running, skipped',
+                                       spider_name, keyword['name'])
+                        continue
+                    
+                    spider_args = generate.generate_job_dict(spider_name, keyword)['spider_args']
+                    spider_args['keywords'] = json.dumps(spider_args.pop('tags'),
+                                                         ensure_ascii=False)
+                    self.running.add(crawl_key)
+                    d = self.crawler_process.crawl(spider_name, **spider_args)
+                    d.addBoth(self._crawl_ended, crawl_key)
+        
+        logger.info('Running %d crawls', len(self.running))
+        # after the minute fired, not now, so the next minute isn't skipped
+        self.schedule_next(fire_time)
+
+    def _crawl_ended(self, result, crawl_key):
+        self.running.discard(crawl_key)
+        return result
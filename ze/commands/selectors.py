@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from scrapy.commands import ScrapyCommand
+
+from ze.utils.selectorstats import SelectorStats
+
+
+class Command(ScrapyCommand):
+
+    requires_project = True
+
+    def syntax(self):
+        return '[options] [spider ...]'
+
+    def short_desc(self):
+        return 'List dead selectors and the hit rate of spiders selectors'
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_option('-a', '--all', dest='all', action='store_true',
+                          help='list the hit rate of all selectors, not only the dead, by tries and '
+                               'on the sampled pages')
+        parser.add_option('--min-samples', dest='min_samples', type='int', default=None,
+                          help='tries of a selector without hits to be dead')
+
+    def run(self, args, opts):
+        selector_stats = SelectorStats.from_settings(self.settings)
+        if opts.min_samples is not None:
+            selector_stats.min_samples = opts.min_samples
+
+        if not opts.all:
+            for spider_name, field_name, selector, tries in selector_stats.dead_selectors():
+                if not args or spider_name in args:
+                    print('%s\t%s\t%s\t0/%d' % (spider_name, field_name, selector, tries))
+            return
+
+        for spider_name, fields in sorted(selector_stats.load().items()):
+            if args and spider_name not in args:
+                continue
+            for field_name, field in sorted(fields.items()):
+                sampled = field.get('sampled', {'selectors': [], 'patterns': {}})
+                samples = sum(sampled['patterns'].values())
+                for selector, (hits, misses) in field.get('tries', {}).items():
+                    # hits on the pages all the selectors were tried too
+                    sample_hits = sum(count for pattern, count in sampled['patterns'].items()
+                                      if selector in pattern.split('\n'))
+                    print('%s\t%s\t%s\t%d/%d\t%d/%d' % (spider_name, field_name, selector,
+                                                       hits, hits + misses, sample_hits, samples))
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+import logging; logger = logging.getLogger(__name__)
+
+from twisted.internet import defer, reactor
+from twisted.web import server, resource
+from scrapy.commands import ScrapyCommand
+
+from ze.utils.workers import ProcessPool
+from ze.utils.extraction import Fetcher, extract, spider_registry, warm_extractor
+
+
+class ExtractResource(resource.Resource):
+    """``GET /extract?url=`` or ``POST /extract`` with ``{"url", "html"}``
+
+    Pages are fetched on the reactor, only the parse runs on the workers.
+    """
+
+    isLeaf = True
+
+    def __init__(self, process_pool, fetcher, registry):
+        resource.Resource.__init__(self)
+        self.process_pool = process_pool
+        self.fetcher = fetcher
+        self.registry = registry
+
+    def render_GET(self, request):
+        url = request.args.get(b'url', [b''])[0].decode('utf-8')
+        return self.extract(request, url)
+
+    def render_POST(self, request):
+        try:
+            data = json.loads(request.content.read().decode('utf-8'))
+        except ValueError as e:
+            return self.write(request, 400, {'error': 'Invalid JSON: %s' % e})
+        return self.extract(request, data.get('url'), data.get('html'))
+
+    def extract(self, request, url, html=None):
+        if not url:
+            return self.write(request, 400, {'error': 'Missing url'})
+        if self.registry.spider_name(url) is None:
+            return self.write(request, 404, {'url': url,
+                                             'error': 'None spider has the domain of %s' % url})
+        
+        start = time.time()
+        if html is None:
+            d = self.fetcher.fetch(url)
+        else:
+            d = defer.succeed((url, html.encode('utf-8'),
+                               {b'Content-Type': [b'text/html; charset=utf-8']}))
+        d.addCallback(self.parse, start)
+        d.addCallback(lambda result: self.write(request, 200, result))
+        d.addErrback(self.failed, request, url)
+        d.addBoth(lambda body: self.finish(request, body))
+        return server.NOT_DONE_YET
+
+    def parse(self, page, start):
+        fetch = time.time() - start
+        d = self.process_pool.submit(extract, *page)
+        return d.addCallback(self.timed, fetch)
+
+    def timed(self, result, fetch):
+        result['timing']['fetch'] = fetch
+        return result
+
+    def failed(self, failure, request, url):
+        status = 404 if failure.check(LookupError) else 502
+        logger.warning('Failed to extract %s: %s', url, failure.getErrorMessage())
+        return self.write(request, status, {'url': url, 'error': failure.getErrorMessage()})
+
+    def write(self, request, status, data):
+        request.setResponseCode(status)
+        request.setHeader(b'Content-Type', b'application/json; charset=utf-8')
+        return json.dumps(data, default=str, ensure_ascii=False).encode('utf-8')
+
+    def finish(self, request, body):
+        if not request._disconnected:
+            request.write(body)
+            request.finish()
+
+
+class Command(ScrapyCommand):
+
+    requires_project = True
+
+    def syntax(self):
+        return '[options]'
+
+    def short_desc(self):
+        return 'Serve the extraction of items of URLs with the spiders of their domains'
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_option('-p', '--port', dest='port', type='int', default=None,
+                          help='port to listen (default: EXTRACTION_SERVICE_PORT)')
+        parser.add_option('-w', '--workers', dest='workers', type='int', default=None,
+                          help='worker processes (default: EXTRACTION_SERVICE_WORKERS)')
+
+    def run(self, args, opts):
+        workers = opts.workers or self.settings.getint('EXTRACTION_SERVICE_WORKERS')
+        port = opts.port or self.settings.getint('EXTRACTION_SERVICE_PORT')
+        
+        process_pool = ProcessPool(workers, self.settings.getint('EXTRACTION_SERVICE_QUEUE_SIZE'),
+                                   initializer=warm_extractor)
+        process_pool.start()
+        
+        root = resource.Resource()
+        extract_resource = ExtractResource(process_pool, Fetcher(self.settings),
+                                    spider_registry(self.settings))
+        root.putChild(b'extract', extract_resource)
+        reactor.listenTCP(port, server.Site(root))
+        logger.info('Extraction service listening on port %d with %d workers',
+                    port, process_pool.max_workers)
+        reactor.addSystemEventTrigger('before', 'shutdown', process_pool.stop)
+        reactor.run()
@@ -7,4 +7,8 @@ class EmptyFields(DropItem):
 
 class MissingSearchQueryKeywords(DropItem):
     """Drop item from the item don't have the none of keywords in the fields"""
+    pass
+
+class NearDuplicate(DropItem):
+    """Drop item with text near duplicated of an item already seen"""
     pass
\ No newline at end of file
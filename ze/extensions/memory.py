@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+import os
+import gc
+import time
+import tracemalloc
+from collections import namedtuple
+import logging; logger = logging.getLogger(__name__)
+
+from twisted.internet import task
+
+from scrapy.exceptions import NotConfigured
+from scrapy.extensions.memusage import MemoryUsage
+from scrapy.utils.project import data_path
+
+
+# crawler seen by MemoryUsage.__init__, with settings of the watchdog
+CrawlerSettings = namedtuple('CrawlerSettings', 'settings signals stats')
+
+
+class MemoryWatchdog(MemoryUsage):
+    """Memory usage extension that attribute the growth to crawl stages
+
+    Besides the limits of ``MemoryUsage``, the current RSS and the size of
+    the scheduler queue, of the downloads and responses in flight and of the
+    items in pipelines are sampled on ``memusage/`` stats. With tracemalloc,
+    when RSS cross each of ``MEMORY_WATCHDOG_DUMP_MB`` the memory allocated by
+    each stage since the engine start is found by the frames of the traces,
+    set on ``memusage/stage/`` stats and dumped on
+    ``MEMORY_WATCHDOG_DUMP_DIR``. Over ``MEMORY_WATCHDOG_PAUSE_MB`` the engine
+    is paused until RSS is under ``MEMORY_WATCHDOG_RESUME_MB``, the crawl is
+    stopped when nothing is left in flight to release memory.
+    
+    It runs the limits of ``MemoryUsage`` even without ``MEMUSAGE_ENABLED``,
+    and without ``MEMORY_WATCHDOG_ENABLED`` it works as ``MemoryUsage``.
+    """
+
+    # first frame of the traceback, from the allocation out, that match
+    stages = (
+        ('httpcache', ('scrapy/extensions/httpcache', 'scrapy/downloadermiddlewares/httpcache')),
+        ('scheduler', ('scrapy/core/scheduler', 'scrapy/squeues', 'queuelib', 'ze/frontier')),
+        ('item_loaders', ('scrapy/loader', 'ze/items', 'ze/processors', 'ze/utils/selectors',
+                          'ze/utils/head', 'parsel', 'lxml')),
+        ('sinks', ('ze/pipelines', 'pymongo', 'google/cloud')),
+        ('responses', ('scrapy/core/downloader', 'scrapy/http', 'twisted/web')),
+    )
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        # disabled, it works as MemoryUsage that it replace
+        self.enabled = settings.getbool('MEMORY_WATCHDOG_ENABLED')
+        if self.enabled and not settings.getbool('MEMUSAGE_ENABLED'):
+            # MemoryUsage is disabled by default on Scrapy
+            memusage_settings = settings.copy()
+            memusage_settings.set('MEMUSAGE_ENABLED', True)
+            try:
+                super(MemoryWatchdog, self).__init__(
+                    CrawlerSettings(memusage_settings, crawler.signals, crawler.stats))
+            except NotConfigured:
+                raise NotConfigured('Memory watchdog needs the resource module of unix')
+            self.crawler = crawler
+        else:
+            super(MemoryWatchdog, self).__init__(crawler)
+        
+        self.tracemalloc_frames = settings.getint('MEMORY_WATCHDOG_TRACEMALLOC_FRAMES')
+        self.dump_dir = settings.get('MEMORY_WATCHDOG_DUMP_DIR')
+        self.dump_thresholds = sorted(int(mb) * 1024 * 1024 for mb in
+                                      settings.getlist('MEMORY_WATCHDOG_DUMP_MB'))
+        self.pause_size = settings.getint('MEMORY_WATCHDOG_PAUSE_MB') * 1024 * 1024
+        self.resume_size = settings.getint('MEMORY_WATCHDOG_RESUME_MB') * 1024 * 1024 \
+                           or int(self.pause_size * 0.8)
+        self.baseline = None
+        self.paused = False
+
+    def get_virtual_size(self):
+        if not self.enabled:
+            return super(MemoryWatchdog, self).get_virtual_size()
+        
+        # current RSS, ru_maxrss of MemoryUsage is the peak of the process
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            return super(MemoryWatchdog, self).get_virtual_size()
+
+    def engine_started(self):
+        if not self.enabled:
+            return super(MemoryWatchdog, self).engine_started()
+        
+        if self.tracemalloc_frames and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+        if tracemalloc.is_tracing():
+            self.baseline = tracemalloc.take_snapshot()
+        
+        super(MemoryWatchdog, self).engine_started()
+        tsk = task.LoopingCall(self.sample)
+        self.tasks.append(tsk)
+        tsk.start(self.check_interval, now=False)
+
+    def engine_stopped(self):
+        super(MemoryWatchdog, self).engine_stopped()
+        if self.enabled and self.tracemalloc_frames and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _queues(self):
+        engine = self.crawler.engine
+        queues = {
+            'downloads': len(engine.downloader.active),
+            'responses_size': engine.scraper.slot.active_size,
+            'items': engine.scraper.slot.itemproc_size,
+        }
+        try:
+            queues['scheduler'] = len(engine.slot.scheduler)
+        except (AttributeError, TypeError):
+            pass
+        return queues
+
+    def stage(self, traceback):
+        for frame in traceback:
+            filename = frame.filename.replace(os.sep, '/')
+            for stage, paths in self.stages:
+                if any(path in filename for path in paths):
+                    return stage
+        return 'other'
+
+    def stages_size(self, statistics):
+        sizes = {}
+        for stat in statistics:
+            stage = self.stage(stat.traceback)
+            sizes[stage] = sizes.get(stage, 0) + getattr(stat, 'size_diff', stat.size)
+        return sizes
+
+    def sample(self):
+        stats = self.crawler.stats
+        size = self.get_virtual_size()
+        stats.set_value('memusage/current', size)
+        if self.crawler.engine.slot is not None:
+            for name, value in self._queues().items():
+                stats.set_value('memusage/queue/%s' % name, value)
+        
+        # snapshots are costly, only taken when a threshold is crossed
+        if self.baseline is not None and self.dump_thresholds \
+        and size > self.dump_thresholds[0]:
+            statistics = tracemalloc.take_snapshot().compare_to(self.baseline, 'traceback')
+            for stage, stage_size in self.stages_size(statistics).items():
+                stats.set_value('memusage/stage/%s' % stage, stage_size)
+            while self.dump_thresholds and size > self.dump_thresholds[0]:
+                self.dump(self.dump_thresholds.pop(0), size, statistics)
+        
+        if self.pause_size:
+            self._check_pause(size)
+
+    def dump(self, threshold, size, statistics, limit=50):
+        path = data_path(os.path.join(self.dump_dir, 'memory-%s-%dMB.txt'
+                                      % (time.strftime('%Y%m%dT%H%M%S'), threshold / 1024 / 1024)))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        with open(path, 'w') as f:
+            f.write('RSS: %dM, threshold: %dM\n\n' % (size / 1024 / 1024, threshold / 1024 / 1024))
+            f.write('Growth by stage since engine started:\n')
+            for stage, stage_size in sorted(self.stages_size(statistics).items(),
+                                            key=lambda s: -s[1]):
+                f.write('  %-14s %+.1fM\n' % (stage, stage_size / 1024 / 1024))
+            if self.crawler.engine.slot is not None:
+                f.write('\nQueues: %r\n' % self._queues())
+            f.write('\nTop %d allocations growth:\n' % limit)
+            for stat in statistics[:limit]:
+                f.write('\n%s, stage: %s\n' % (stat, self.stage(stat.traceback)))
+                f.write('\n'.join(stat.traceback.format(limit=self.tracemalloc_frames)) + '\n')
+        
+        self.crawler.stats.inc_value('memusage/dumps')
+        logger.warning('Memory usage reached %(memusage)dM, snapshot diff dumped on %(path)s',
+                       {'memusage': threshold / 1024 / 1024, 'path': path},
+                       extra={'crawler': self.crawler})
+
+    def _check_pause(self, size):
+        engine = self.crawler.engine
+        if not self.paused and size > self.pause_size:
+            gc.collect()
+            engine.pause()
+            self.paused = True
+            self.crawler.stats.inc_value('memusage/pauses')
+            logger.warning('Memory usage of %(memusage)dM is over %(pause)dM, engine paused',
+                           {'memusage': size / 1024 / 1024, 'pause': self.pause_size / 1024 / 1024},
+                           extra={'crawler': self.crawler})
+        elif self.paused:
+            if size < self.resume_size:
+                engine.unpause()
+                self.paused = False
+                logger.info('Memory usage of %(memusage)dM, engine unpaused',
+                            {'memusage': size / 1024 / 1024}, extra={'crawler': self.crawler})
+                return
+            
+            # requests in flight ended, memory that isn't released won't be
+            in_flight = engine.slot is not None and \
+                        (engine.downloader.active or not engine.scraper.slot.is_idle())
+            if not in_flight:
+                self._stop(size)
+
+    def _stop(self, size):
+        engine = self.crawler.engine
+        self.crawler.stats.set_value('memusage/pause_limit_reached', 1)
+        logger.error('Memory usage of %(memusage)dM is still over %(resume)dM with nothing '
+                     'in flight, closing spiders',
+                     {'memusage': size / 1024 / 1024, 'resume': self.resume_size / 1024 / 1024},
+                     extra={'crawler': self.crawler})
+        # closing spiders don't take new requests
+        engine.unpause()
+        self.paused = False
+        if engine.open_spiders:
+            for spider in engine.open_spiders:
+                engine.close_spider(spider, 'memusage_exceeded')
+        else:
+            self.crawler.stop()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import signal
+import logging; logger = logging.getLogger(__name__)
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.project import data_path
+
+from ..utils.profiler import StackSampler
+
+
+class SamplingProfiler(object):
+    """Sample the stacks of the crawl with ``ZE_PROFILE`` set
+
+    The sampler runs while spiders are open, the samples of each spider are
+    written when it is closed as collapsed stacks on ``PROFILE_DIR``, ready
+    to ``flamegraph.pl``. Samples are taken by CPU time, so the time the
+    reactor waits for the network isn't on them. Samples without a spider on
+    the stack, like the reactor and Twisted internals, go to the spider when
+    only one is open.
+    """
+
+    # shared by the crawlers of the process, there is one SIGPROF handler
+    sampler = None
+    open_spiders = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        ext = cls(crawler.settings, crawler.stats)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def __init__(self, settings, stats):
+        if not settings.getbool('ZE_PROFILE'):
+            raise NotConfigured('Profile is not enabled, check settings values')
+        if not hasattr(signal, 'setitimer'):
+            raise NotConfigured('Profile needs signal.setitimer, not available on this platform')
+
+        self.stats = stats
+        self.profile_dir = settings.get('PROFILE_DIR')
+        if SamplingProfiler.sampler is None:
+            SamplingProfiler.sampler = StackSampler(settings.getfloat('PROFILE_INTERVAL'))
+
+    def _default_key(self):
+        self.sampler.default_key = next(iter(self.open_spiders)) \
+                                   if len(self.open_spiders) == 1 else 'reactor'
+
+    def spider_opened(self, spider):
+        self.open_spiders.add(spider.name)
+        self._default_key()
+        self.sampler.start()
+        logger.info('Profiling %s with samples each %.3fs', spider.name, self.sampler.interval)
+
+    def spider_closed(self, spider):
+        self.open_spiders.discard(spider.name)
+        if not self.open_spiders:
+            self.sampler.stop()
+        
+        stacks = self.sampler.collapsed(spider.name)
+        self.sampler.pop(spider.name)
+        if not self.open_spiders:
+            stacks += self.sampler.collapsed('reactor')
+            self.sampler.pop('reactor')
+        self._default_key()
+        
+        path = data_path(os.path.join(self.profile_dir, '%s-%s.collapsed'
+                                      % (spider.name, time.strftime('%Y%m%dT%H%M%S'))))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write('\n'.join(stacks) + '\n')
+        
+        self.stats.set_value('profile/samples', sum(int(s.rpartition(' ')[2]) for s in stacks))
+        logger.info('Profile of %s written on %s, see it with flamegraph.pl %s > %s.svg',
+                    spider.name, path, path, spider.name)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timezone, timedelta
+from collections import Counter
+import logging; logger = logging.getLogger(__name__)
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from ..utils import url_domain, shared_from_settings
+from ..utils.priority import PublishingRates, parse_pubdate
+
+
+class PublishingRateEstimator(object):
+    """Learn the domains publishing rate used by seeds priority
+
+    Count the scraped items published inside the last
+    ``SEED_PRIORITY_RATES_WINDOW`` hours and merge the rate of each domain on
+    ``SEED_PRIORITY_RATES_FILE`` when the spider is closed, crawls of the same
+    process share the rates.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        ext = cls(crawler.settings, crawler.stats)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def __init__(self, settings, stats):
+        if not settings.getbool('SEED_PRIORITY_ENABLED'):
+            raise NotConfigured('Seed priority is not enabled, check settings values')
+
+        self.stats = stats
+        self.rates = shared_from_settings(PublishingRates, settings, 'SEED_PRIORITY_RATES_FILE')
+        self.window = settings.getfloat('SEED_PRIORITY_RATES_WINDOW', 24)
+        self.since = datetime.now(timezone.utc) - timedelta(hours=self.window)
+        self.published = Counter()
+
+    def item_scraped(self, item, spider):
+        date_published = parse_pubdate(item.get('datePublished'))
+        if date_published and date_published >= self.since and item.get('url'):
+            self.published[url_domain(item['url'])] += 1
+
+    def spider_closed(self, spider):
+        for domain, count in self.published.items():
+            self.rates.update(domain, count / self.window)
+            self.stats.set_value('seed_priority/publishing_rate/%s' % domain,
+                                 self.rates.get(domain))
+
+        if self.published:
+            self.rates.save()
+            logger.info('Publishing rates of %d domains saved on %s',
+                        len(self.published), self.rates.path)
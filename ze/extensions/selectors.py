@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import logging; logger = logging.getLogger(__name__)
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from ..utils import shared_from_settings
+from ..utils.selectorstats import SelectorStats
+
+
+class SelectorStatsExtension(object):
+    """Record the selectors hits and misses of spiders between runs
+
+    The store is set on ``spider.selector_stats`` when the spider is opened
+    and saved on ``SELECTOR_STATS_FILE`` when it is closed. Use
+    ``scrapy selectors`` to list the dead selectors. Crawls of the same process
+    share the store.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        ext = cls(crawler.settings)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def __init__(self, settings):
+        if not settings.getbool('SELECTOR_STATS_ENABLED'):
+            raise NotConfigured('Selector stats is not enabled, check settings values')
+
+        self.selector_stats = shared_from_settings(SelectorStats, settings, 'SELECTOR_STATS_FILE')
+
+    def spider_opened(self, spider):
+        spider.selector_stats = self.selector_stats
+
+    def spider_closed(self, spider):
+        self.selector_stats.save()
+        logger.info('Selector stats saved on %s', self.selector_stats.path)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+import logging; logger = logging.getLogger(__name__)
+
+from twisted.internet import defer
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from ..utils import import_times
+from ..utils.timing import Timings
+
+
+class StatsDump(object):
+    """Write the crawl stats as JSON on ``STATS_DUMP_FILE`` when it ends
+
+    Used by ``scrapy crawlsharded`` to merge the stats of its workers.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        ext = cls(crawler.settings, crawler.stats)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def __init__(self, settings, stats):
+        self.path = settings.get('STATS_DUMP_FILE')
+        if not self.path:
+            raise NotConfigured('Stats dump is not enabled, check settings values')
+        self.stats = stats
+
+    def spider_closed(self, spider, reason):
+        self.stats.set_value('finish_reason', reason)
+        with open(self.path, 'w') as f:
+            json.dump(self.stats.get_stats(), f, default=str, indent=1, sort_keys=True)
+        logger.info('Stats dumped on %s', self.path)
+
+
+class ImportTimesStats(object):
+    """Set the time of the imports deferred to components constructors
+    on ``startup/import_time/<module>`` stats"""
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        ext = cls(crawler.stats)
+        crawler.signals.connect(ext.set_import_times, signal=signals.spider_opened)
+        crawler.signals.connect(ext.set_import_times, signal=signals.spider_closed)
+        return ext
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def set_import_times(self, spider):
+        for module_name, seconds in import_times.items():
+            self.stats.set_value('startup/import_time/%s' % module_name, round(seconds, 4))
+
+
+class TimingStats(object):
+    """Latency histograms of selectors, processors and pipelines by spider
+
+    The loader of items times the selectors and the input and output
+    processors of each field when ``spider.timings`` is set, and the
+    ``process_item`` of each pipeline is wrapped when the spider is opened.
+    Count, sum and percentiles 50, 95 and 99 in milliseconds are set on
+    ``timing/<spider>/<stage>/`` stats when the spider is closed.
+    """
+
+    stats_base = 'timing/%s/%s/%s'
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        ext = cls(crawler.settings, crawler.stats)
+        ext.crawler = crawler
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def __init__(self, settings, stats):
+        if not settings.getbool('TIMING_STATS_ENABLED'):
+            raise NotConfigured('Timing stats is not enabled, check settings values')
+
+        self.stats = stats
+        self.timings = Timings()
+
+    def spider_opened(self, spider):
+        spider.timings = self.timings
+        # replaced in place, the item processor runs this list of methods (a
+        # deque on newer Scrapy, that can't be assigned by slice)
+        methods = self.crawler.engine.scraper.itemproc.methods['process_item']
+        timed_methods = [self.timed_process_item(m) for m in methods]
+        methods.clear()
+        methods.extend(timed_methods)
+
+    def timed_process_item(self, process_item):
+        stage = 'pipeline/%s' % type(process_item.__self__).__name__
+        
+        def timed_process_item(item, spider):
+            start = time.perf_counter()
+            def add(result):
+                self.timings.add(spider.name, stage, time.perf_counter() - start)
+                return result
+            
+            try:
+                result = process_item(item, spider)
+            except Exception:
+                add(None)
+                raise
+            # pipelines returning deferreds are timed until they fire
+            if isinstance(result, defer.Deferred):
+                return result.addBoth(add)
+            return add(result)
+        
+        return timed_process_item
+
+    def spider_closed(self, spider):
+        for (spider_name, stage), histogram in sorted(self.timings.histograms.items()):
+            for key, value in histogram.summary(scale=1000).items():
+                if value is not None:
+                    key = key if key == 'count' else '%s_ms' % key
+                    self.stats.set_value(self.stats_base % (spider_name, stage, key),
+                                         round(value, 3))
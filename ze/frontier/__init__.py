@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Frontier of requests shared by crawler nodes
+
+Requests are queued by partition (the domain of the URL) and each node leases
+whole partitions, so a domain is crawled by only one node at a time and the
+download slots stay polite. Leases expire unless the node renews them with
+heartbeats, then the partitions of a dead node are leased by the others. The
+dupefilter is shared too, so seeds pushed by every node are crawled once,
+until their fingerprints expire after ``seen_ttl``.
+
+Backends are blocking, ``FrontierScheduler`` calls them in batches on the
+thread pool of the reactor.
+"""
+from scrapy.utils.misc import load_object
+
+
+class Frontier(object):
+
+    def __init__(self, lease_ttl=60, max_partitions=16, seen_ttl=7 * 24 * 3600):
+        self.lease_ttl = lease_ttl
+        self.max_partitions = max_partitions
+        self.seen_ttl = seen_ttl
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.get('FRONTIER_URI'),
+                   lease_ttl=settings.getfloat('FRONTIER_LEASE_TTL'),
+                   max_partitions=settings.getint('FRONTIER_MAX_PARTITIONS'),
+                   seen_ttl=settings.getfloat('FRONTIER_SEEN_TTL'))
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def push(self, requests):
+        """Push the ``(fingerprint, partition, priority, data)`` requests
+        whose fingerprint wasn't seen and mark them as seen, a ``None``
+        fingerprint is never filtered. Return the indexes of the requests
+        filtered as duplicates."""
+        raise NotImplementedError
+
+    def lease(self, node, size):
+        """Renew the leases of node, lease free partitions up to
+        ``max_partitions`` and pop up to ``size`` requests of them"""
+        raise NotImplementedError
+
+    def heartbeat(self, node):
+        raise NotImplementedError
+
+    def release(self, node):
+        raise NotImplementedError
+
+    def has_pending(self):
+        raise NotImplementedError
+
+
+def load_frontier(settings):
+    return load_object(settings.get('FRONTIER_BACKEND')).from_settings(settings)
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+import math
+import time
+import struct
+import heapq
+import sqlite3
+import itertools
+import threading
+import logging; logger = logging.getLogger(__name__)
+
+from scrapy.utils.project import data_path
+
+from . import Frontier
+
+
+class MemoryFrontier(Frontier):
+    """In-process frontier, frontiers with the same ``uri`` share the queues
+
+    Stand-in of the shared backends for nodes of the same process and tests.
+    """
+
+    _stores = {}
+    _lock = threading.Lock()
+
+    def __init__(self, uri=None, **kwargs):
+        super(MemoryFrontier, self).__init__(**kwargs)
+        self.uri = uri
+        with self._lock:
+            self.store = self._stores.setdefault(uri, {
+                'queues': {}, 'seen': {}, 'leases': {}, 'counter': itertools.count(),
+                'purged': time.time()})
+
+    def push(self, requests):
+        with self._lock:
+            now = time.time()
+            seen = self.store['seen']
+            if now - self.store['purged'] >= self.seen_ttl:
+                for fingerprint, expires in list(seen.items()):
+                    if expires < now:
+                        del seen[fingerprint]
+                self.store['purged'] = now
+            
+            duplicates = []
+            for index, (fingerprint, partition, priority, data) in enumerate(requests):
+                if fingerprint is not None:
+                    if seen.get(fingerprint, 0) >= now:
+                        duplicates.append(index)
+                        continue
+                    seen[fingerprint] = now + self.seen_ttl
+                heapq.heappush(self.store['queues'].setdefault(partition, []),
+                               (-priority, next(self.store['counter']), data))
+            return duplicates
+
+    def _owned(self, node, now):
+        leases = self.store['leases']
+        for partition, (owner, expires) in list(leases.items()):
+            if expires < now:
+                del leases[partition]
+        return [p for p, (owner, _) in leases.items() if owner == node]
+
+    def lease(self, node, size):
+        with self._lock:
+            now = time.time()
+            queues, leases = self.store['queues'], self.store['leases']
+            owned = self._owned(node, now)
+            for partition in list(queues):
+                if len(owned) >= self.max_partitions:
+                    break
+                if partition not in leases and queues[partition]:
+                    owned.append(partition)
+            for partition in owned:
+                leases[partition] = (node, now + self.lease_ttl)
+            
+            batch = []
+            per_partition = int(math.ceil(size / float(len(owned)))) if owned else 0
+            for partition in owned:
+                queue = queues.get(partition, [])
+                for _ in range(min(per_partition, size - len(batch), len(queue))):
+                    batch.append(heapq.heappop(queue)[2])
+                if not queue:
+                    queues.pop(partition, None)
+                    del leases[partition]
+            return batch
+
+    def heartbeat(self, node):
+        with self._lock:
+            now = time.time()
+            for partition in self._owned(node, now):
+                self.store['leases'][partition] = (node, now + self.lease_ttl)
+
+    def release(self, node):
+        with self._lock:
+            for partition in self._owned(node, time.time()):
+                del self.store['leases'][partition]
+
+    def has_pending(self):
+        with self._lock:
+            return any(self.store['queues'].values())
+
+
+class SQLiteFrontier(Frontier):
+    """Frontier on a SQLite file, shared by the crawlers of one host
+
+    The connection is shared by the threads of the reactor pool, one call at
+    a time.
+    """
+
+    schema = '''
+        CREATE TABLE IF NOT EXISTS requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, partition TEXT NOT NULL,
+            priority INTEGER NOT NULL, data BLOB NOT NULL);
+        CREATE INDEX IF NOT EXISTS requests_partition
+            ON requests (partition, priority DESC, id);
+        CREATE TABLE IF NOT EXISTS seen (
+            fingerprint TEXT PRIMARY KEY, expires REAL NOT NULL);
+        CREATE INDEX IF NOT EXISTS seen_expires ON seen (expires);
+        CREATE TABLE IF NOT EXISTS leases (
+            partition TEXT PRIMARY KEY, node TEXT NOT NULL, expires REAL NOT NULL);
+    '''
+
+    def __init__(self, uri=None, **kwargs):
+        super(SQLiteFrontier, self).__init__(**kwargs)
+        path = (uri or 'frontier.db').replace('sqlite:///', '', 1)
+        self.path = data_path(path) if path != ':memory:' else path
+        self.db = None
+        self.lock = threading.Lock()
+
+    def open(self):
+        self.db = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                  check_same_thread=False)
+        self.db.executescript(self.schema)
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+    def push(self, requests):
+        with self.lock:
+            now = time.time()
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                self.db.execute('DELETE FROM seen WHERE expires < ?', (now,))
+                duplicates = []
+                for index, (fingerprint, partition, priority, data) in enumerate(requests):
+                    if fingerprint is not None and self.db.execute(
+                            'INSERT OR IGNORE INTO seen VALUES (?, ?)',
+                            (fingerprint, now + self.seen_ttl)).rowcount == 0:
+                        duplicates.append(index)
+                        continue
+                    self.db.execute('INSERT INTO requests (partition, priority, data) '
+                                    'VALUES (?, ?, ?)',
+                                    (partition, priority, sqlite3.Binary(data)))
+                self.db.execute('COMMIT')
+            except Exception:
+                self.db.execute('ROLLBACK')
+                raise
+            return duplicates
+
+    def _renew(self, node, now):
+        self.db.execute('DELETE FROM leases WHERE expires < ?', (now,))
+        self.db.execute('UPDATE leases SET expires = ? WHERE node = ?',
+                        (now + self.lease_ttl, node))
+        return [p for p, in self.db.execute('SELECT partition FROM leases WHERE node = ?',
+                                            (node,))]
+
+    def lease(self, node, size):
+        with self.lock:
+            return self._lease(node, size)
+
+    def _lease(self, node, size):
+        now = time.time()
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            owned = self._renew(node, now)
+            if len(owned) < self.max_partitions:
+                free = [p for p, in self.db.execute(
+                    'SELECT DISTINCT partition FROM requests WHERE partition NOT IN '
+                    '(SELECT partition FROM leases) LIMIT ?',
+                    (self.max_partitions - len(owned),))]
+                self.db.executemany('INSERT INTO leases VALUES (?, ?, ?)',
+                                    [(p, node, now + self.lease_ttl) for p in free])
+                owned += free
+            
+            batch = []
+            per_partition = int(math.ceil(size / float(len(owned)))) if owned else 0
+            for partition in owned:
+                rows = self.db.execute(
+                    'SELECT id, data FROM requests WHERE partition = ? '
+                    'ORDER BY priority DESC, id LIMIT ?',
+                    (partition, min(per_partition, size - len(batch)))).fetchall()
+                self.db.executemany('DELETE FROM requests WHERE id = ?',
+                                    [(id_,) for id_, _ in rows])
+                batch.extend(bytes(data) for _, data in rows)
+                if not self.db.execute('SELECT 1 FROM requests WHERE partition = ? LIMIT 1',
+                                       (partition,)).fetchone():
+                    self.db.execute('DELETE FROM leases WHERE partition = ?', (partition,))
+            self.db.execute('COMMIT')
+        except Exception:
+            self.db.execute('ROLLBACK')
+            raise
+        return batch
+
+    def heartbeat(self, node):
+        with self.lock:
+            self.db.execute('BEGIN IMMEDIATE')
+            self._renew(node, time.time())
+            self.db.execute('COMMIT')
+
+    def release(self, node):
+        with self.lock:
+            self.db.execute('DELETE FROM leases WHERE node = ?', (node,))
+
+    def has_pending(self):
+        with self.lock:
+            return self.db.execute('SELECT 1 FROM requests LIMIT 1').fetchone() is not None
+
+
+class RedisFrontier(Frontier):
+    """Frontier on Redis, shared by crawlers of any host
+
+    Each partition is a sorted set by priority and its lease a key with
+    expiration, that only the node that set it renews. Fingerprints are seen
+    on sets by period of ``seen_ttl`` that expire after the next period, so
+    they are remembered from ``seen_ttl`` to twice that.
+    """
+
+    def __init__(self, uri=None, prefix='ze:frontier', **kwargs):
+        super(RedisFrontier, self).__init__(**kwargs)
+        import redis
+        self.redis = redis.StrictRedis.from_url(uri or 'redis://127.0.0.1:6379/0')
+        self.prefix = prefix
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.get('FRONTIER_URI'),
+                   prefix=settings.get('FRONTIER_REDIS_PREFIX'),
+                   lease_ttl=settings.getfloat('FRONTIER_LEASE_TTL'),
+                   max_partitions=settings.getint('FRONTIER_MAX_PARTITIONS'),
+                   seen_ttl=settings.getfloat('FRONTIER_SEEN_TTL'))
+
+    def _key(self, *names):
+        return ':'.join((self.prefix,) + names)
+
+    def push(self, requests):
+        period = int(time.time() // self.seen_ttl)
+        current, previous = self._key('seen', str(period)), self._key('seen', str(period - 1))
+        fingerprints = [(i, r[0]) for i, r in enumerate(requests) if r[0] is not None]
+        duplicates = []
+        if fingerprints:
+            pipe = self.redis.pipeline()
+            for _, fingerprint in fingerprints:
+                pipe.sismember(previous, fingerprint)
+                pipe.sadd(current, fingerprint)
+            pipe.expire(current, max(1, int(2 * self.seen_ttl)))
+            results = pipe.execute()
+            duplicates = [index for n, (index, _) in enumerate(fingerprints)
+                          if results[n * 2] or results[n * 2 + 1] == 0]
+        
+        skipped = set(duplicates)
+        pushing = [r for index, r in enumerate(requests) if index not in skipped]
+        if pushing:
+            # members are prefixed by a sequence number, so equal requests
+            # that aren't filtered are queued each one, by push order
+            sequence = self.redis.incrby(self._key('sequence'), len(pushing)) - len(pushing)
+            pipe = self.redis.pipeline()
+            for n, (_, partition, priority, data) in enumerate(pushing):
+                member = struct.pack('>Q', sequence + n) + data
+                pipe.zadd(self._key('queue', partition), {member: -priority})
+                pipe.sadd(self._key('partitions'), partition)
+            pipe.execute()
+        return duplicates
+
+    def _owned(self, node):
+        owned = []
+        for partition in self.redis.smembers(self._key('node', node)):
+            partition = partition.decode('utf-8')
+            if self.redis.get(self._key('lease', partition)) == node.encode('utf-8'):
+                owned.append(partition)
+            else:
+                self.redis.srem(self._key('node', node), partition)
+        return owned
+
+    def _release(self, node, partition):
+        lease_key = self._key('lease', partition)
+        if self.redis.get(lease_key) == node.encode('utf-8'):
+            self.redis.delete(lease_key)
+        self.redis.srem(self._key('node', node), partition)
+
+    def lease(self, node, size):
+        self.heartbeat(node)
+        owned = self._owned(node)
+        if len(owned) < self.max_partitions:
+            for partition in self.redis.srandmember(self._key('partitions'),
+                                                    self.max_partitions * 2):
+                partition = partition.decode('utf-8')
+                if len(owned) >= self.max_partitions:
+                    break
+                if partition not in owned and self.redis.set(
+                        self._key('lease', partition), node, nx=True,
+                        px=int(self.lease_ttl * 1000)):
+                    self.redis.sadd(self._key('node', node), partition)
+                    owned.append(partition)
+        
+        batch = []
+        per_partition = int(math.ceil(size / float(len(owned)))) if owned else 0
+        for partition in owned:
+            count = min(per_partition, size - len(batch))
+            queue_key = self._key('queue', partition)
+            pipe = self.redis.pipeline()
+            pipe.zrange(queue_key, 0, count - 1)
+            pipe.zremrangebyrank(queue_key, 0, count - 1)
+            pipe.zcard(queue_key)
+            members, _, left = pipe.execute()
+            batch.extend(member[8:] for member in members)
+            if not left and self._remove_if_empty(partition):
+                self._release(node, partition)
+        return batch
+
+    def _remove_if_empty(self, partition):
+        """Remove the partition of the pending ones if its queue is empty, the
+        transaction fails when requests are pushed to the queue meanwhile"""
+        from redis.exceptions import WatchError
+        queue_key = self._key('queue', partition)
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(queue_key)
+                if pipe.zcard(queue_key):
+                    return False
+                pipe.multi()
+                pipe.srem(self._key('partitions'), partition)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    def heartbeat(self, node):
+        for partition in self._owned(node):
+            self.redis.pexpire(self._key('lease', partition), int(self.lease_ttl * 1000))
+
+    def release(self, node):
+        for partition in self._owned(node):
+            self._release(node, partition)
+
+    def has_pending(self):
+        return self.redis.scard(self._key('partitions')) > 0
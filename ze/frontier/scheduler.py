@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import pickle
+import socket
+import logging; logger = logging.getLogger(__name__)
+
+from twisted.internet import defer, task, threads
+from scrapy.core.scheduler import Scheduler
+from scrapy.utils.reqser import request_to_dict, request_from_dict
+from scrapy.utils.request import request_fingerprint
+
+from ze.utils import url_domain
+from . import load_frontier
+
+
+class FrontierScheduler(Scheduler):
+    """Scheduler that shares the requests of crawls by the frontier
+
+    Without ``FRONTIER_ENABLED`` it's the Scrapy scheduler. Requests that
+    can't be serialized stay on the local memory queue, filtered by the local
+    dupefilter.
+    
+    The frontier is never called on the reactor thread: requests are pushed
+    in batches and leased ahead, before the local queue is empty, by calls on
+    the thread pool.
+    """
+
+    stats_base = 'frontier/%s'
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler = super(FrontierScheduler, cls).from_crawler(crawler)
+        settings = crawler.settings
+        scheduler.crawler = crawler
+        scheduler.frontier = load_frontier(settings) \
+                             if settings.getbool('FRONTIER_ENABLED') else None
+        scheduler.node = settings.get('FRONTIER_NODE') or \
+                         '%s-%d' % (socket.gethostname(), os.getpid())
+        scheduler.batch_size = settings.getint('FRONTIER_BATCH_SIZE')
+        scheduler.lease_interval = settings.getfloat('FRONTIER_LEASE_INTERVAL')
+        return scheduler
+
+    def open(self, spider):
+        d = super(FrontierScheduler, self).open(spider)
+        if self.frontier:
+            self.frontier.open()
+            self.pushing = []
+            self.calls = 0
+            self.leasing = False
+            self.last_lease = 0
+            # until the first lease answers
+            self.frontier_pending = True
+            self.heartbeat = task.LoopingCall(self._heartbeat)
+            self.heartbeat.start(self.frontier.lease_ttl / 3.0, now=False)
+            self.sync = task.LoopingCall(self._sync)
+            self.sync.start(self.lease_interval)
+            logger.info('Frontier %s opened by node %s',
+                        type(self.frontier).__name__, self.node)
+        return d
+
+    def close(self, reason):
+        if not self.frontier:
+            return super(FrontierScheduler, self).close(reason)
+        
+        for loop in (self.heartbeat, self.sync):
+            if loop.running:
+                loop.stop()
+        d = self.flush()
+        d.addBoth(lambda _: self._call(self.frontier.release, self.node))
+        d.addErrback(self._failed, 'release')
+        d.addBoth(lambda _: self._call(self.frontier.close))
+        d.addBoth(lambda _: super(FrontierScheduler, self).close(reason))
+        return d
+
+    def _call(self, func, *args):
+        self.calls += 1
+        d = threads.deferToThread(func, *args)
+        
+        def called(result):
+            self.calls -= 1
+            return result
+        return d.addBoth(called)
+
+    def _failed(self, failure, action):
+        logger.error('Frontier failed to %s: %s', action, failure.getErrorMessage(),
+                     exc_info=(failure.type, failure.value, failure.getTracebackObject()))
+
+    def _heartbeat(self):
+        d = self._call(self.frontier.heartbeat, self.node)
+        return d.addErrback(self._failed, 'renew leases')
+
+    def _sync(self):
+        self.flush()
+        if len(self.mqs) < self.batch_size:
+            self.lease()
+
+    def enqueue_request(self, request):
+        if not self.frontier:
+            return super(FrontierScheduler, self).enqueue_request(request)
+        
+        try:
+            data = pickle.dumps(request_to_dict(request, self.spider), protocol=2)
+        except Exception as e:
+            if not request.dont_filter and self.df.request_seen(request):
+                self.df.log(request, self.spider)
+                return False
+            logger.debug('Request %s kept on local queue: %s', request, e)
+            self._mqpush(request)
+            self.stats.inc_value('scheduler/enqueued', spider=self.spider)
+            return True
+        
+        fingerprint = None if request.dont_filter else request_fingerprint(request)
+        self.pushing.append((request, (fingerprint, url_domain(request.url),
+                                       request.priority, data)))
+        if len(self.pushing) >= self.batch_size:
+            self.flush()
+        # duplicates are filtered when the batch is pushed
+        return True
+
+    def flush(self):
+        """Push the requests enqueued since the last flush"""
+        if not self.pushing:
+            return defer.succeed(None)
+        
+        pushing, self.pushing = self.pushing, []
+        d = self._call(self.frontier.push, [entry for _, entry in pushing])
+        d.addCallbacks(self._pushed, self._push_failed,
+                       callbackArgs=(pushing,), errbackArgs=(pushing,))
+        return d
+
+    def _pushed(self, duplicates, pushing):
+        for index in duplicates:
+            self.stats.inc_value(self.stats_base % 'duplicate_count', spider=self.spider)
+            self.df.log(pushing[index][0], self.spider)
+        pushed = len(pushing) - len(duplicates)
+        if pushed:
+            self.frontier_pending = True
+            self.stats.inc_value(self.stats_base % 'pushed_count', pushed, spider=self.spider)
+            self.stats.inc_value('scheduler/enqueued', pushed, spider=self.spider)
+
+    def _push_failed(self, failure, pushing):
+        # crawled by this node instead of lost
+        self._failed(failure, 'push %d requests' % len(pushing))
+        for request, _ in pushing:
+            self._mqpush(request)
+        self.stats.inc_value('scheduler/enqueued', len(pushing), spider=self.spider)
+
+    def lease(self):
+        """Lease the next batch, after pushing the requests enqueued"""
+        if self.leasing or time.time() - self.last_lease < self.lease_interval:
+            return
+        
+        self.leasing = True
+        self.last_lease = time.time()
+        d = self.flush()
+        d.addCallback(lambda _: self._call(self._lease))
+        d.addCallbacks(self._leased, self._failed, errbackArgs=('lease',))
+        d.addBoth(lambda _: setattr(self, 'leasing', False))
+
+    def _lease(self):
+        # on the thread pool
+        return self.frontier.lease(self.node, self.batch_size), self.frontier.has_pending()
+
+    def _leased(self, result):
+        batch, self.frontier_pending = result
+        for data in batch:
+            self._mqpush(request_from_dict(pickle.loads(data), self.spider))
+        self.stats.inc_value(self.stats_base % 'leased_count', len(batch),
+                             spider=self.spider)
+        # wake up the engine instead of waiting its heartbeat
+        slot = getattr(self.crawler.engine, 'slot', None)
+        if batch and slot is not None:
+            slot.nextcall.schedule()
+
+    def next_request(self):
+        if not self.frontier:
+            return super(FrontierScheduler, self).next_request()
+        
+        if len(self.mqs) < self.batch_size:
+            self.lease()
+        
+        request = self.mqs.pop()
+        if request:
+            self.stats.inc_value('scheduler/dequeued', spider=self.spider)
+        return request
+
+    def has_pending_requests(self):
+        if not self.frontier:
+            return super(FrontierScheduler, self).has_pending_requests()
+        # partitions leased by other nodes keep this one waiting, they are
+        # leased here when the other node dies and its leases expire
+        return len(self.mqs) > 0 or bool(self.pushing) or self.calls > 0 \
+               or self.frontier_pending
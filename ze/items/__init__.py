@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
+from collections import defaultdict
 from datetime import datetime, timezone
 
 from w3lib.html import remove_tags
 from scrapy import Item, Field
 from scrapy.loader import ItemLoader as ScrapyItemLoader
-from scrapy.loader.processors import Join, TakeFirst, MapCompose, Compose
+from scrapy.loader.common import wrap_loader_context
+from scrapy.loader.processors import Join, TakeFirst, MapCompose, Compose, Identity
+from scrapy.utils.misc import arg_to_iter, walk_modules
 
 from ..processors.common import *
 from ..processors.schema import AuthorParse, KeywordsParse
@@ -12,11 +15,49 @@ from ..processors.schema import AuthorParse, KeywordsParse
 
 class ItemLoader(ScrapyItemLoader):
 
+    # values of context only used while the item is loaded
+    deferred_context_ignored = ('response', 'selector', 'item', 'head_metadata',
+                                'selector_matcher', 'defer_processors', 'timings')
+
     def get_collected_values(self, field_name):
         return (self._values[field_name]
                 if field_name in self._values
                 else self._values.default_factory())
 
+    @property
+    def _deferred_values(self):
+        # raw values of ``deferred`` fields by call, shared with nested loaders
+        if self.parent is not None:
+            return self.parent._deferred_values
+        return self.__dict__.setdefault('_local_deferred_values', defaultdict(list))
+
+    def _is_deferred(self, field_name):
+        return bool(self.context.get('defer_processors')) and field_name in self.item.fields \
+               and self.item.fields[field_name].get('deferred')
+
+    def add_parsed_value(self, field_name, value):
+        """Add values already parsed, skipping the field input processor"""
+        value = arg_to_iter(value)
+        if value and self._is_deferred(field_name):
+            self._deferred_values[field_name].append((value, True))
+        self._values[field_name] += value
+
+    def _add_value(self, field_name, value):
+        # the input processor of ``deferred`` fields runs on
+        # DeferredProcessorsPipeline, the raw values are kept by call and
+        # collected meanwhile for the validations
+        if not self._is_deferred(field_name):
+            return super(ItemLoader, self)._add_value(field_name, value)
+        
+        value = arg_to_iter(value)
+        if value:
+            self._deferred_values[field_name].append((value, False))
+            self._values[field_name] += value
+
+    def _replace_value(self, field_name, value):
+        self._deferred_values.pop(field_name, None)
+        super(ItemLoader, self)._replace_value(field_name, value)
+
     def add_fallback_css(self, field_name, css, *processors, **kw):
         if not any(self.get_collected_values(field_name)):
             self.add_css(field_name, css, *processors, **kw)
@@ -25,6 +66,50 @@ class ItemLoader(ScrapyItemLoader):
         if not any(self.get_collected_values(field_name)):
             self.add_xpath(field_name, css, *processors, **kw)
 
+    def add_css(self, field_name, css, *processors, **kw):
+        timings = self.context.get('timings')
+        if timings is None:
+            return super(ItemLoader, self).add_css(field_name, css, *processors, **kw)
+        
+        with timings.time(self.context.get('spider_name'), 'selectors/%s' % field_name):
+            values = self._get_cssvalues(css, **kw)
+        self.add_value(field_name, values, *processors, **kw)
+
+    def _process_input_value(self, field_name, value):
+        timings = self.context.get('timings')
+        if timings is None:
+            return super(ItemLoader, self)._process_input_value(field_name, value)
+        
+        with timings.time(self.context.get('spider_name'), 'input/%s' % field_name):
+            return super(ItemLoader, self)._process_input_value(field_name, value)
+
+    def get_output_value(self, field_name):
+        timings = self.context.get('timings')
+        if timings is None:
+            return super(ItemLoader, self).get_output_value(field_name)
+        
+        with timings.time(self.context.get('spider_name'), 'output/%s' % field_name):
+            return super(ItemLoader, self).get_output_value(field_name)
+
+    def _get_cssvalues(self, csss, **kw):
+        # meta selectors of <head> are answered by head_metadata context and
+        # the others by selector_matcher, both built once by response
+        head_metadata = self.context.get('head_metadata')
+        selector_matcher = self.context.get('selector_matcher')
+        if head_metadata is None and selector_matcher is None:
+            return super(ItemLoader, self)._get_cssvalues(csss, **kw)
+        
+        values = []
+        for css in arg_to_iter(csss):
+            css_values = head_metadata.lookup(css) if head_metadata else None
+            if css_values is None and selector_matcher is not None:
+                css_values = selector_matcher.match(css)
+            if css_values is None:
+                css_values = super(ItemLoader, self)._get_cssvalues(css, **kw)
+            values.extend(css_values)
+        
+        return values
+
     def load_item(self):
         item = self.item
         
@@ -37,10 +122,67 @@ class ItemLoader(ScrapyItemLoader):
             elif not item.get(field_name) and default_value:
                 item[field_name] = default_value
         
+        self._defer_processors(item)
         item['dateCreated'] = datetime.now(timezone.utc)
         
         return item
 
+    def _defer_processors(self, item):
+        """Keep the raw values and the context of ``deferred`` fields on the
+        item for ``DeferredProcessorsPipeline``, that runs their input and
+        output processors after the validations
+        
+        Without ``defer_processors`` on context the processors ran while
+        loading, like any other field.
+        """
+        if not self._deferred_values:
+            return
+        
+        context = dict((k, v) for k, v in self.context.items() \
+                       if k not in self.deferred_context_ignored)
+        item._deferred = getattr(item, '_deferred', {})
+        for field_name, calls in self._deferred_values.items():
+            item._deferred[field_name] = (context, calls)
+
+
+def item_name(item):
+    """Name of the item class on sinks, ``item_name`` or the class name"""
+    item_class = item if isinstance(item, type) else type(item)
+    return getattr(item_class, 'item_name', None) or item_class.__name__
+
+
+def item_classes():
+    """Item classes of all modules of this package"""
+    walk_modules(__name__)
+    classes, pending = [], [BaseItem]
+    while pending:
+        item_class = pending.pop()
+        classes.append(item_class)
+        pending.extend(item_class.__subclasses__())
+    return classes
+
+
+def run_deferred_processor(item, field_name, calls, context):
+    """Run the processors of a ``deferred`` field like ``ItemLoader`` does:
+    the input processor by call of ``add_*`` and the output processor on all
+    values collected"""
+    field = item.fields[field_name]
+    input_processor = wrap_loader_context(field.get('input_processor', Identity()), context)
+    values = []
+    for value, parsed in calls:
+        value = value if parsed else input_processor(value)
+        if value:
+            values += arg_to_iter(value)
+    
+    output_processor = wrap_loader_context(field.get('output_processor', Identity()), context)
+    value = output_processor(values)
+    if value is not None:
+        item[field_name] = value
+    elif field.get('default'):
+        item[field_name] = field['default']
+    elif field_name in item:
+        del item[field_name]
+
 
 class BaseItem(Item):
     
@@ -1,6 +1,4 @@
 # -*- coding: utf-8 -*-
-
-import six
 from scrapy import Field
 from scrapy.loader.processors import TakeFirst, MapCompose
 from ..processors.html import ImproveHTML
@@ -9,26 +7,54 @@ from ..items import CreativeWorkItem
 
 class ArticleItem(CreativeWorkItem):
     
-    def __init__(self, *args, **kwargs):
-        self._values = {}
-        # TODO: Refactor this!
-        self.__class__.__name__ = 'Article'
-        if args or kwargs:  # avoid creating dict for most common case
-            for k, v in six.iteritems(dict(*args, **kwargs)):
-                self[k] = v
+    # name of collections, tables and topics on sinks
+    item_name = 'Article'
 
     articleBody = Field(
         default=None, 
         required=True,
         input_processor=MapCompose(ImproveHTML(),),
         output_processor=TakeFirst(), 
+        # processors run by DeferredProcessorsPipeline only on items that
+        # pass validations
+        deferred=True,
         schemas={
             'avro': {
                 'type': 'string', 
             }, 
         }
     )
+    # set by BodyStorePipeline, that move articleBody to the body store
+    articleBodyDigest = Field(
+        schemas={
+            'avro': {
+                'type': ('null', 'string'), 
+            }, 
+        }
+    )
+    articleBodyExcerpt = Field(
+        schemas={
+            'avro': {
+                'type': ('null', 'string'), 
+            }, 
+        }
+    )
     articleSection = Field()
+    # set by NearDuplicatesPipeline
+    nearDuplicateOf = Field(
+        schemas={
+            'avro': {
+                'type': ('null', 'string'), 
+            }, 
+        }
+    )
+    simhash = Field(
+        schemas={
+            'avro': {
+                'type': ('null', 'string'), 
+            }, 
+        }
+    )
     headline = Field(
         CreativeWorkItem.fields['headline'],
         # TODO: Change to True, this involve change item fields on spiders
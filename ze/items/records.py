@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import json
+from collections.abc import Mapping
+
+from scrapy.utils.misc import load_object
+
+from . import item_name
+
+
+class Record(Mapping):
+    """Immutable values of a loaded item on ``__slots__``
+
+    Built by ``CompactRecordPipeline`` after the pipelines that change the
+    items, so items buffered to sinks don't keep a dict each. Each set of
+    filled fields of an item class has its record class, with slots only for
+    them, like a tuple with the layout of the class. It reads as the item,
+    ``record['name']``, ``record.get('name')``, ``record.fields`` and
+    ``dict(record)``, plus ``record.name`` without the lookup of a dict.
+    """
+
+    __slots__ = ()
+    item_class = None
+    item_name = None
+    fields = {}
+
+    def __init__(self, values):
+        for field_name, value in values.items():
+            object.__setattr__(self, field_name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s record is immutable' % self.item_name)
+
+    def __delattr__(self, name):
+        raise AttributeError('%s record is immutable' % self.item_name)
+
+    def __getitem__(self, field_name):
+        if field_name not in self.fields:
+            raise KeyError(field_name)
+        try:
+            return getattr(self, field_name)
+        except AttributeError:
+            raise KeyError(field_name)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.to_dict())
+
+    def __reduce__(self):
+        # the record classes are built at runtime, rebuilt from the item class
+        item_class = self.item_class
+        return (_record, ('%s.%s' % (item_class.__module__, item_class.__qualname__),
+                          self.to_dict()))
+
+    def to_dict(self):
+        return dict((f, getattr(self, f)) for f in self)
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), default=_json_default, **kwargs)
+
+
+_record_classes = {}
+
+
+def record_class(item_class, field_names):
+    """Record class of ``item_class`` with a slot by field of ``field_names``,
+    built once by set of fields"""
+    key = (item_class, frozenset(field_names))
+    if key not in _record_classes:
+        _record_classes[key] = type('%sRecord' % item_class.__name__, (Record,), {
+            '__slots__': tuple(sorted(key[1])),
+            '__module__': __name__,
+            'item_class': item_class,
+            'item_name': item_name(item_class),
+            'fields': item_class.fields,
+        })
+    return _record_classes[key]
+
+
+def to_record(item):
+    if isinstance(item, Record):
+        return item
+    return record_class(type(item), item.keys())(item)
+
+
+def _record(item_class_path, values):
+    return record_class(load_object(item_class_path), values.keys())(values)
+
+
+def _json_default(value):
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import posixpath
+from urllib.parse import urlparse
+import logging; logger = logging.getLogger(__name__)
+
+from twisted.internet import defer
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured, IgnoreRequest
+from scrapy.utils.python import to_unicode
+
+from ze.utils import url_domain
+
+
+class EarlyAbortMiddleware(object):
+    """Cancel downloads of content that spiders can't parse
+
+    Requests to URLs with media extensions are ignored before download, the
+    ``download_maxsize`` of each request is set by domain, so the download
+    handler cancels bodies larger than the limit from ``Content-Length`` or
+    while streaming, and on Scrapy versions with the ``headers_received``
+    signal the transfer is stopped as soon as the headers show a content
+    type that isn't a page. Requests with ``dont_abort_download`` on meta and
+    spiders with ``early_abort = False`` are left alone.
+    """
+
+    stats_base = 'download_abort/%s'
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mw = cls(crawler.settings, crawler.stats)
+        headers_received = getattr(signals, 'headers_received', None)
+        if headers_received is not None:
+            crawler.signals.connect(mw.headers_received, signal=headers_received)
+        return mw
+
+    def __init__(self, settings, stats):
+        if not settings.getbool('EARLY_ABORT_ENABLED'):
+            raise NotConfigured('Early abort is not enabled, check settings values')
+
+        self.stats = stats
+        self.content_types = tuple(t.strip().lower() for t in
+                                   settings.getlist('EARLY_ABORT_CONTENT_TYPES'))
+        self.extensions = set('.%s' % e.strip().lower().lstrip('.') for e in
+                              settings.getlist('EARLY_ABORT_URL_EXTENSIONS'))
+        self.maxsize = settings.getint('DOWNLOAD_MAXSIZE')
+        self.domains_maxsize = settings.getdict('EARLY_ABORT_DOMAINS_MAXSIZE')
+
+    def _enabled(self, request, spider):
+        return getattr(spider, 'early_abort', True) \
+               and not request.meta.get('dont_abort_download')
+
+    def _abort(self, reason, request, spider, detail):
+        self.stats.inc_value(self.stats_base % 'count')
+        self.stats.inc_value(self.stats_base % ('reason_count/%s' % reason))
+        logger.debug('Download of %s aborted by %s: %s', request.url, reason, detail,
+                     extra={'spider': spider})
+
+    def _maxsize(self, request):
+        domain = url_domain(request.url)
+        while domain:
+            if domain in self.domains_maxsize:
+                return int(self.domains_maxsize[domain])
+            domain = domain.partition('.')[2]
+        return self.maxsize
+
+    def process_request(self, request, spider):
+        if not self._enabled(request, spider):
+            return
+
+        extension = posixpath.splitext(urlparse(request.url).path)[1].lower()
+        if extension in self.extensions:
+            self._abort('url_extension', request, spider, extension)
+            raise IgnoreRequest('URL with %s extension can\'t be parsed: %s'
+                                % (extension, request.url))
+
+        maxsize = self._maxsize(request)
+        if maxsize:
+            request.meta.setdefault('download_maxsize', maxsize)
+
+    def _content_type(self, headers):
+        content_type = headers.get('Content-Type')
+        if content_type:
+            return to_unicode(content_type, errors='replace').split(';')[0].strip().lower()
+
+    def headers_received(self, headers, body_length, request, spider):
+        if not self._enabled(request, spider):
+            return
+
+        content_type = self._content_type(headers)
+        if content_type and not content_type.startswith(self.content_types):
+            from scrapy.exceptions import StopDownload
+            self._abort('content_type', request, spider, content_type)
+            raise StopDownload(fail=True)
+
+    def process_response(self, request, response, spider):
+        if not self._enabled(request, spider):
+            return response
+
+        # Scrapy versions without headers_received signal, at least don't parse it
+        content_type = self._content_type(response.headers)
+        if content_type and not content_type.startswith(self.content_types):
+            self._abort('content_type', request, spider, content_type)
+            raise IgnoreRequest('Response with content type %s can\'t be parsed: %s'
+                                % (content_type, request.url))
+
+        return response
+
+    def process_exception(self, request, exception, spider):
+        # the download handler cancel the body larger than download_maxsize
+        if isinstance(exception, defer.CancelledError) \
+        and self._enabled(request, spider) and request.meta.get('download_maxsize'):
+            self._abort('max_size', request, spider, request.meta['download_maxsize'])
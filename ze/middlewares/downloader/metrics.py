@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import logging; logger = logging.getLogger(__name__)
+
+from twisted.internet import task
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.project import data_path
+
+from ze.utils import url_domain
+from ze.utils.timing import Histogram
+
+
+class DomainMetrics(object):
+
+    def __init__(self):
+        self.ttfb = Histogram()
+        self.latency = Histogram()
+        self.size = Histogram(minimum=1)
+        self.status = {}
+
+    def observe(self, ttfb, latency, size, status):
+        if ttfb is not None:
+            self.ttfb.add(ttfb)
+        self.latency.add(latency)
+        if size is not None:
+            self.size.add(size)
+        self.status[status] = self.status.get(status, 0) + 1
+
+
+class DomainMetricsMiddleware(object):
+    """Histograms of time to first byte, latency, body size and status of
+    the responses of each domain
+
+    The time to first byte is counted by the download handler from the start
+    of the download. The latency is counted from this middleware, so it also
+    has the wait on the queue of the download slot, where the concurrency
+    and delays of the domain hold requests.
+
+    They are exported each ``DOMAIN_METRICS_INTERVAL`` seconds and when the
+    spider is closed to a Prometheus textfile, to be collected by the
+    textfile collector of node exporter, and to a JSON snapshot with the
+    percentiles, both relative to the project data dir. ``%(spider)s`` on
+    their paths is replaced by the spider name.
+    """
+
+    seconds_buckets = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    bytes_buckets = (1024, 10240, 51200, 102400, 262144, 524288, 1048576, 
+                     2097152, 5242880, 10485760)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mw = cls(crawler.settings)
+        crawler.signals.connect(mw.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def __init__(self, settings):
+        if not settings.getbool('DOMAIN_METRICS_ENABLED'):
+            raise NotConfigured('Domain metrics is not enabled, check settings values')
+
+        self.interval = settings.getfloat('DOMAIN_METRICS_INTERVAL')
+        self.textfile = settings.get('DOMAIN_METRICS_TEXTFILE')
+        self.snapshot = settings.get('DOMAIN_METRICS_SNAPSHOT')
+        self.domains = {}
+        self.exporter = None
+
+    def _domain_metrics(self, request):
+        domain = url_domain(request.url)
+        if domain not in self.domains:
+            self.domains[domain] = DomainMetrics()
+        return self.domains[domain]
+
+    def process_request(self, request, spider):
+        request.meta['_domain_metrics'] = time.time()
+
+    def process_response(self, request, response, spider):
+        start = request.meta.pop('_domain_metrics', None)
+        if start is not None:
+            # download_latency is set by the download handler when headers arrive
+            self._domain_metrics(request).observe(request.meta.get('download_latency'),
+                                                  time.time() - start, len(response.body),
+                                                  str(response.status))
+        return response
+
+    def process_exception(self, request, exception, spider):
+        start = request.meta.pop('_domain_metrics', None)
+        if start is not None:
+            self._domain_metrics(request).observe(None, time.time() - start, None,
+                                                  type(exception).__name__)
+
+    def spider_opened(self, spider):
+        if self.interval:
+            self.exporter = task.LoopingCall(self.export, spider)
+            self.exporter.start(self.interval, now=False)
+
+    def spider_closed(self, spider):
+        if self.exporter is not None and self.exporter.running:
+            self.exporter.stop()
+        self.export(spider)
+
+    def _path(self, path, spider):
+        path = data_path(path % {'spider': spider.name})
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def _write(self, path, content):
+        # replaced at once, collectors never read a file half written
+        with open(path + '.tmp', 'w') as f:
+            f.write(content)
+        os.replace(path + '.tmp', path)
+
+    def export(self, spider):
+        try:
+            if self.textfile:
+                self._write(self._path(self.textfile, spider), self.prometheus(spider))
+            if self.snapshot:
+                self._write(self._path(self.snapshot, spider),
+                            json.dumps(self.json_snapshot(spider), indent=1, sort_keys=True))
+        except OSError as e:
+            logger.error('Domain metrics not exported: %s', e)
+
+    def _prometheus_histogram(self, name, labels, histogram, buckets):
+        lines = []
+        for le in buckets:
+            lines.append('%s_bucket{%s,le="%s"} %d'
+                         % (name, labels, le, histogram.cumulative(le)))
+        lines.append('%s_bucket{%s,le="+Inf"} %d' % (name, labels, histogram.count))
+        lines.append('%s_sum{%s} %s' % (name, labels, repr(histogram.sum)))
+        lines.append('%s_count{%s} %d' % (name, labels, histogram.count))
+        return lines
+
+    def prometheus(self, spider):
+        histograms = (
+            ('ze_download_ttfb_seconds', 'Time to first byte of responses', 
+             'ttfb', self.seconds_buckets),
+            ('ze_download_latency_seconds', 'Time to responses with the wait on download slots', 
+             'latency', self.seconds_buckets),
+            ('ze_download_size_bytes', 'Body size of responses', 
+             'size', self.bytes_buckets),
+        )
+        lines = []
+        for name, description, attr, buckets in histograms:
+            lines.append('# HELP %s %s' % (name, description))
+            lines.append('# TYPE %s histogram' % name)
+            for domain, metrics in sorted(self.domains.items()):
+                labels = 'spider="%s",domain="%s"' % (spider.name, domain)
+                lines.extend(self._prometheus_histogram(name, labels, 
+                                                        getattr(metrics, attr), buckets))
+        
+        lines.append('# HELP ze_download_responses_total Responses by status or exception')
+        lines.append('# TYPE ze_download_responses_total counter')
+        for domain, metrics in sorted(self.domains.items()):
+            for status, count in sorted(metrics.status.items()):
+                lines.append('ze_download_responses_total{spider="%s",domain="%s",status="%s"} %d'
+                             % (spider.name, domain, status, count))
+        return '\n'.join(lines) + '\n'
+
+    def json_snapshot(self, spider):
+        return {
+            'spider': spider.name,
+            'time': time.time(),
+            'domains': dict((domain, {
+                'ttfb_ms': metrics.ttfb.summary(scale=1000),
+                'latency_ms': metrics.latency.summary(scale=1000),
+                'size_bytes': metrics.size.summary(),
+                'status': metrics.status,
+            }) for domain, metrics in self.domains.items()),
+        }
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import time
+import logging; logger = logging.getLogger(__name__)
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from ze.utils import shared_from_settings
+from ze.utils.proxies import ProxyPool
+
+
+class ProxyPoolMiddleware(object):
+    """Route requests through the proxies of ``PROXY_POOL_LIST``
+
+    The proxy is chosen by its health score on every attempt, so retries of
+    a failed request go out through another proxy. Requests with a ``proxy``
+    set on meta by the spider are left alone. Crawls of the same process share
+    the pool and its scores.
+    """
+
+    stats_base = 'proxy_pool/%s'
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mw = cls(crawler.settings, crawler.stats)
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def __init__(self, settings, stats):
+        if not settings.getbool('PROXY_POOL_ENABLED'):
+            raise NotConfigured('Proxy pool is not enabled, check settings values')
+
+        self.stats = stats
+        self.pool = shared_from_settings(ProxyPool, settings, 'PROXY_POOL_LIST',
+                                         'PROXY_POOL_SCORES_FILE')
+        self.ban_status = set(int(s) for s in settings.getlist('PROXY_POOL_BAN_STATUS'))
+
+    def process_request(self, request, spider):
+        if 'proxy' in request.meta and '_proxy_pool' not in request.meta:
+            return
+
+        proxy = self.pool.choose()
+        if proxy is None:
+            self.stats.inc_value(self.stats_base % 'exhausted_count')
+            logger.warning('All proxies are quarantined, requesting %s without proxy',
+                           request.url)
+            request.meta.pop('proxy', None)
+            request.meta.pop('_proxy_pool', None)
+            return
+
+        request.meta['proxy'] = proxy
+        request.meta['_proxy_pool'] = time.time()
+        self.stats.inc_value(self.stats_base % 'requests_count')
+
+    def process_response(self, request, response, spider):
+        if '_proxy_pool' in request.meta:
+            proxy = request.meta['proxy']
+            if response.status in self.ban_status or response.status >= 500:
+                self.pool.mark_failure(proxy)
+                self.stats.inc_value(self.stats_base % 'failures_count')
+            else:
+                self.pool.mark_success(proxy, time.time() - request.meta['_proxy_pool'])
+                self.stats.inc_value(self.stats_base % 'successes_count')
+
+        return response
+
+    def process_exception(self, request, exception, spider):
+        if '_proxy_pool' in request.meta:
+            self.pool.mark_failure(request.meta['proxy'])
+            self.stats.inc_value(self.stats_base % 'failures_count')
+
+    def spider_closed(self, spider):
+        if self.pool.loaded:
+            self.stats.set_value(self.stats_base % 'available', len(self.pool.available()))
+            self.pool.save()
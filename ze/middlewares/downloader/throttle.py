@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+import logging; logger = logging.getLogger(__name__)
+
+from scrapy import signals
+from scrapy.core.downloader import Slot
+from scrapy.exceptions import NotConfigured
+
+from ze.utils import url_domain
+
+
+class DomainSlotState(object):
+
+    def __init__(self, concurrency, delay, min_concurrency, max_concurrency,
+                 min_delay, max_delay):
+        self.concurrency = concurrency
+        self.delay = delay
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.latency = None
+        self.error_rate = 0.0
+        self.responses = 0
+
+    def observe(self, latency, error, alpha):
+        if latency is not None:
+            self.latency = latency if self.latency is None \
+                           else alpha * latency + (1 - alpha) * self.latency
+        self.error_rate = alpha * float(error) + (1 - alpha) * self.error_rate
+        self.responses += 1
+
+
+class AdaptiveConcurrencyMiddleware(object):
+    """Tune the concurrency and delay of each domain download slot
+
+    Additive increase of the concurrency while the latency is under the
+    target and the domain don't fail, multiplicative decrease when the domain
+    answer with 429/503 or the error rate grows. Spiders can declare limits
+    to their domains with the ``download_slots`` attribute, e.g.::
+
+        download_slots = {'max_concurrency': 2, 'start_delay': 1.0}
+
+    Keys are ``start_concurrency``, ``min_concurrency``, ``max_concurrency``,
+    ``start_delay``, ``min_delay`` and ``max_delay``.
+    """
+
+    backoff_status = (429, 503)
+    stats_base = 'adaptive_concurrency/%s/%s'
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        mw = cls(crawler)
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_CONCURRENCY_ENABLED'):
+            raise NotConfigured('Adaptive concurrency is not enabled, check settings values')
+
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.defaults = {
+            'start_concurrency': settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN'),
+            'min_concurrency': settings.getint('ADAPTIVE_CONCURRENCY_MIN', 1),
+            'max_concurrency': settings.getint('ADAPTIVE_CONCURRENCY_MAX', 32),
+            'start_delay': settings.getfloat('DOWNLOAD_DELAY'),
+            'min_delay': settings.getfloat('DOWNLOAD_DELAY'),
+            'max_delay': settings.getfloat('ADAPTIVE_CONCURRENCY_MAX_DELAY', 60),
+        }
+        self.target_latency = settings.getfloat('ADAPTIVE_CONCURRENCY_TARGET_LATENCY', 2)
+        self.max_error_rate = settings.getfloat('ADAPTIVE_CONCURRENCY_MAX_ERROR_RATE', 0.1)
+        self.window = settings.getint('ADAPTIVE_CONCURRENCY_WINDOW', 10)
+        self.alpha = settings.getfloat('ADAPTIVE_CONCURRENCY_EWMA_ALPHA', 0.2)
+        self.debug = settings.getbool('ADAPTIVE_CONCURRENCY_DEBUG')
+        self.domains = {}
+
+    def process_request(self, request, spider):
+        domain, state = self._get_state(request, spider)
+        request.meta.setdefault('download_slot', domain)
+
+        slots = self.crawler.engine.downloader.slots
+        slot = slots.get(request.meta['download_slot'])
+        if slot is None:
+            slots[request.meta['download_slot']] = Slot(
+                state.concurrency, state.delay,
+                self.crawler.settings.getbool('RANDOMIZE_DOWNLOAD_DELAY'))
+
+    def process_response(self, request, response, spider):
+        retry_after = response.headers.get('Retry-After')
+        self._adjust(request, spider,
+                     error=response.status >= 500 or response.status == 429,
+                     backoff=response.status in self.backoff_status,
+                     retry_after=retry_after)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        self._adjust(request, spider, error=True, backoff=False)
+
+    def _get_state(self, request, spider):
+        domain = self._owning_domain(request.url, spider)
+        if domain not in self.domains:
+            limits = dict(self.defaults, **self._spider_limits(domain, spider))
+            self.domains[domain] = DomainSlotState(
+                min(max(limits['start_concurrency'], limits['min_concurrency']),
+                    limits['max_concurrency']),
+                max(limits['start_delay'], limits['min_delay']),
+                limits['min_concurrency'], limits['max_concurrency'],
+                limits['min_delay'], limits['max_delay'])
+
+        return domain, self.domains[domain]
+
+    def _owning_domain(self, url, spider):
+        hostname = url_domain(url)
+        for domain in sorted(getattr(spider, 'allowed_domains', []), key=len, reverse=True):
+            if hostname == domain or hostname.endswith('.%s' % domain):
+                return domain
+        return hostname
+
+    def _spider_limits(self, domain, spider):
+        domains_download_slots = getattr(spider, 'domains_download_slots', {})
+        if domain in domains_download_slots:
+            return domains_download_slots[domain]
+        return getattr(spider, 'download_slots', {})
+
+    def _adjust(self, request, spider, error, backoff, retry_after=None):
+        domain, state = self._get_state(request, spider)
+        state.observe(request.meta.get('download_latency'), error, self.alpha)
+        old_concurrency, old_delay = state.concurrency, state.delay
+        
+        slot = self.crawler.engine.downloader.slots.get(request.meta.get('download_slot'))
+        if slot is not None:
+            self.stats.max_value(self.stats_base % (domain, 'max_transferring'),
+                                 len(slot.transferring))
+
+        if backoff:
+            state.concurrency = max(state.min_concurrency, state.concurrency // 2)
+            state.delay = max(state.delay * 2, 0.5)
+            try:
+                state.delay = max(state.delay, float(retry_after))
+            except (TypeError, ValueError):
+                pass
+            self.stats.inc_value(self.stats_base % (domain, 'backoff_count'))
+        elif error and state.error_rate > self.max_error_rate:
+            state.concurrency = max(state.min_concurrency, state.concurrency - 1)
+            state.delay = max(state.delay * 1.5, 0.25)
+        elif state.responses % self.window == 0:
+            if state.latency is not None and state.latency > 2 * self.target_latency:
+                state.concurrency = max(state.min_concurrency, state.concurrency - 1)
+            elif state.latency is not None and state.latency <= self.target_latency \
+            and state.error_rate <= self.max_error_rate:
+                state.concurrency = min(state.max_concurrency, state.concurrency + 1)
+                state.delay = state.delay * 0.75
+
+        state.delay = min(max(state.delay, state.min_delay), state.max_delay)
+        if (state.concurrency, state.delay) == (old_concurrency, old_delay):
+            return
+
+        if slot is not None:
+            slot.concurrency = state.concurrency
+            slot.delay = state.delay
+
+        self.stats.set_value(self.stats_base % (domain, 'concurrency'), state.concurrency)
+        self.stats.set_value(self.stats_base % (domain, 'delay'), round(state.delay, 3))
+        self.stats.max_value(self.stats_base % (domain, 'max_concurrency'), state.concurrency)
+
+        if self.debug:
+            logger.info('domain: %s | concurrency: %d -> %d | delay: %.2f -> %.2f | '
+                        'latency: %s | error rate: %.2f', domain, old_concurrency,
+                        state.concurrency, old_delay, state.delay,
+                        state.latency, state.error_rate, extra={'spider': spider})
+
+    def spider_closed(self, spider):
+        for domain, state in self.domains.items():
+            self.stats.set_value(self.stats_base % (domain, 'concurrency'), state.concurrency)
+            self.stats.set_value(self.stats_base % (domain, 'delay'), round(state.delay, 3))
+            if state.latency is not None:
+                self.stats.set_value(self.stats_base % (domain, 'latency'), round(state.latency, 3))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import os
+import cProfile
+from hashlib import sha1
+import logging; logger = logging.getLogger(__name__)
+
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.project import data_path
+
+
+class ResponseProfileMiddleware(object):
+    """Profile with cProfile the callbacks of sampled responses
+
+    With ``ZE_PROFILE`` set, one of each ``PROFILE_RESPONSES_EVERY``
+    responses is profiled while the callback output is iterated, up to
+    ``PROFILE_RESPONSES``, and the stats are written on ``PROFILE_DIR`` to be
+    read by ``pstats``.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings, crawler.stats)
+
+    def __init__(self, settings, stats):
+        self.max_profiles = settings.getint('PROFILE_RESPONSES')
+        if not settings.getbool('ZE_PROFILE') or not self.max_profiles:
+            raise NotConfigured('Profile of responses is not enabled, check settings values')
+
+        self.stats = stats
+        self.every = max(settings.getint('PROFILE_RESPONSES_EVERY'), 1)
+        self.profile_dir = settings.get('PROFILE_DIR')
+        self.responses = 0
+        self.profiles = 0
+
+    def process_spider_output(self, response, result, spider):
+        self.responses += 1
+        if self.profiles >= self.max_profiles or self.responses % self.every:
+            return result
+        
+        self.profiles += 1
+        return self._profiled(response, result, spider)
+
+    def _profiled(self, response, result, spider):
+        profile = cProfile.Profile()
+        result = iter(result)
+        while True:
+            # the callbacks are generators, they run while the output is iterated
+            profile.enable()
+            try:
+                output = next(result)
+            except StopIteration:
+                break
+            finally:
+                profile.disable()
+            yield output
+        
+        path = data_path(os.path.join(self.profile_dir, '%s-%s.prof' % (
+            spider.name, sha1(response.url.encode('utf-8')).hexdigest()[:12])))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        profile.dump_stats(path)
+        self.stats.inc_value('profile/responses')
+        logger.info('Profile of %s written on %s', response.url, path)
@@ -12,7 +12,7 @@ from scrapy.exceptions import NotConfigured
 from scrapy import signals
 from scrapy.utils.project import data_path
 
-import GoogleScraper
+from ze.utils import import_module_timed
 
 
 class GoogleSearchMiddleware(object):
@@ -34,28 +34,34 @@ class GoogleSearchMiddleware(object):
             self.gcse_api_key = crawler.settings.get('SEARCH_MIDDLEWARE_GCSE_API_KEY')
             self.gcse_cx = crawler.settings.get('SEARCH_MIDDLEWARE_GCSE_CX')
             self.max_index = crawler.settings.get('SEARCH_MIDDLEWARE_GCSE_MAX_INDEX', 10)
+        if 'googler' in self.sources:
+            self.google_scraper = import_module_timed('GoogleScraper')
         crawler.signals.connect(self.spider_opened, signal=signals.spider_opened)
 
     def spider_opened(self, spider):
+        if hasattr(spider, 'seeds_file'):
+            logger.debug('Seeds of %s already searched on %s', spider.name, spider.seeds_file)
+            return
         if not hasattr(spider, 'search'):
             raise NotConfigured('Spider %s don\'t has search argument'%spider.name)
         if not hasattr(spider, 'query'):
             raise NotConfigured('Spider %s don\'t has query argument'%spider.name)
         
         search_items_ruls = []
+        spider.seeds_meta = {}
         
         if 'gcse_api' in self.sources:
             query_paraments = {
                 'key': self.gcse_api_key,
                 'cx': self.gcse_cx,
-                'fields': 'items(cacheId,link,snippet,title),queries(request)',
+                'fields': 'items(cacheId,link,snippet,title,pagemap/metatags),queries(request)',
                 'start': 1,
                 'filter': 0,
                 'q': spider.query,
                 'sort': 'date',
                 'dateRestrict': getattr(spider, 'dateRestrict', 'd1'),
             }
-            search_items_ruls += self.search_via_gcse_api(query_paraments)
+            search_items_ruls += self.search_via_gcse_api(query_paraments, spider.seeds_meta)
         if 'googler' in self.sources:
             query_paraments = {
                 'q': spider.query,
@@ -66,10 +72,13 @@ class GoogleSearchMiddleware(object):
             }
             search_items_ruls += self.search_via_googler(query_paraments)
         
+        for rank, url in enumerate(search_items_ruls):
+            spider.seeds_meta.setdefault(url, {}).setdefault('rank', rank)
+        
         logger.debug('search_items_urls: \n%s'%search_items_ruls)
         spider.start_urls = search_items_ruls
     
-    def search_via_gcse_api(self, query_paraments):
+    def search_via_gcse_api(self, query_paraments, seeds_meta=None):
         def get_urls(query_paraments, search_items=[], search_items_urls=[]):
             self.stats.inc_value(self.gcse_stats_base%'requests')
             
@@ -108,6 +117,13 @@ class GoogleSearchMiddleware(object):
         
         logger.debug('Making search with Google Custom Search API')
         unique_search_items, unique_urls = get_urls(query_paraments)
+        
+        for search_item in unique_search_items:
+            metatags = search_item.get('pagemap', {}).get('metatags', [{}])[0]
+            pub_date = metatags.get('article:published_time')
+            if pub_date and seeds_meta is not None:
+                seeds_meta.setdefault(search_item['link'], {})['pubDate'] = pub_date
+        
         return unique_urls
     
     def search_via_googler(self, query_paraments):
@@ -151,7 +167,7 @@ class GoogleSearchMiddleware(object):
         logger.debug('Making search with Googler lib with configuration')
         
         try:
-            google_search = GoogleScraper.scrape_with_config(config)
+            google_search = self.google_scraper.scrape_with_config(config)
             
             urls_without_fix = []
             urls = []
@@ -169,5 +185,5 @@ class GoogleSearchMiddleware(object):
                           'query "{}":\n{}').format(query_paraments['q'], urls))
             
             return urls
-        except GoogleScraper.GoogleSearchError as e:
+        except self.google_scraper.GoogleSearchError as e:
             logger.error(str(e))
@@ -4,25 +4,49 @@ from functools import reduce
 from collections import ChainMap
 import logging; logger = logging.getLogger(__name__)
 
+from twisted.internet import defer, threads
+from w3lib.html import remove_tags
 from scrapy.exceptions import NotConfigured
-from ..exceptions import EmptyFields, MissingSearchQueryKeywords
+from ..items import item_classes, run_deferred_processor
+from ..items.records import to_record
+from ..utils.bodystore import BodyStore
+from ..utils.projection import drop_validation_enabled
+from ..utils.simhash import SimHasher, SimHashIndex
+from ..utils.workers import ProcessPool, run_deferred_processors
+from ..exceptions import EmptyFields, MissingSearchQueryKeywords, NearDuplicate
 
 
 class BasePipeline(object):
 
+    # clients of databases and services shared by all crawls of the process
+    clients = {}
+
     @classmethod
     def from_crawler(cls, crawler):
         return cls(settings=crawler.settings, stats=crawler.stats)
+    
+    @staticmethod
+    def shared_client(key, factory, *args):
+        if key not in BasePipeline.clients:
+            BasePipeline.clients[key] = factory(*args)
+        return BasePipeline.clients[key]
         
-    def __init__(self, settings, stats): raise NotImplementError
+    def __init__(self, settings, stats): raise NotImplementedError
 
 
 class DropItemsPipeline(BasePipeline):
     
+    # DROP_ITEM_PIPELINE_VALIDATIONS names
+    validations = {
+        'not_match_regex': 'drop_items_that_not_match_regex',
+        'empty_required_fields': 'drop_items_with_empty_fields',
+    }
+    
     def __init__(self, settings, stats):
         if settings.getbool('DROP_ITEM_PIPELINE_ENABLED'):
             self.stats = stats
-            self.validation_methods = settings.get('DROP_ITEM_PIPELINE_VALIDATION_METHODS')
+            self.validation_methods = [self.validations[v.strip()] for v in 
+                                       settings.getlist('DROP_ITEM_PIPELINE_VALIDATIONS')]
         else:
             raise NotConfigured('Drop Item Pepeline is not enabled, check settings values')
     
@@ -47,12 +71,244 @@ class DropItemsPipeline(BasePipeline):
     def drop_items_that_not_match_regex(self, item, spider):
         # TODO add Validatable attr to item fields 
         if hasattr(spider, 'regex'):
-            if not re.search(spider.regex, item.get('articleBody', '')) \
+            # text view of raw articleBody, its html is improved only later
+            if not re.search(spider.regex, remove_tags(item.get('articleBody') or '')) \
             and not re.search(spider.regex, item.get('name', '')):
                 raise MissingSearchQueryKeywords('Item of url %s don\'t have search query keyword %s' % \
                                                 (item['url'], spider.search['query']))
 
 
+class DeferredProcessorsPipeline(BasePipeline):
+    """Run the processors of ``deferred`` fields, like ``ImproveHTML`` of
+    ``articleBody``, only for items that passed the validations
+    
+    With ``PROCESS_POOL_ENABLED`` they run on worker processes, which also
+    collect the images of html fields for ``ImagesPipeline``, while the
+    reactor keeps downloading.
+    """
+    
+    def __init__(self, settings, stats):
+        if settings.getbool('DEFERRED_PROCESSORS_ENABLED'):
+            self.stats = stats
+            self.process_pool = ProcessPool.from_settings(settings) \
+                                if settings.getbool('PROCESS_POOL_ENABLED') else None
+            self.media_items_fields = settings.getdict('MEDIA_ITEMS_FIELDS')
+            # required fields empty after the processors are dropped like
+            # DropItemsPipeline does with the validation enabled
+            self.drop_empty_required = drop_validation_enabled(settings, 'empty_required_fields')
+        else:
+            raise NotConfigured('Deferred Processors Pipeline is not enabled, check settings values')
+    
+    def open_spider(self, spider):
+        if self.process_pool:
+            self.process_pool.start()
+    
+    def close_spider(self, spider):
+        if self.process_pool:
+            return self.process_pool.stop()
+    
+    def process_item(self, item, spider):
+        deferred = getattr(item, '_deferred', None)
+        if not deferred:
+            return item
+        
+        if not self.process_pool:
+            for field_name, (context, calls) in deferred.items():
+                run_deferred_processor(item, field_name, calls, context)
+            return self._processed(item, deferred)
+        
+        item_class = type(item)
+        images_fields = (self.media_items_fields.get(item_class.__qualname__) or {}) \
+                        .get('images') or {}
+        media_fields = [f for f in deferred if images_fields.get(f) == 'html']
+        d = self.process_pool.submit(run_deferred_processors,
+                                     '%s.%s' % (item_class.__module__, item_class.__qualname__),
+                                     deferred, media_fields)
+        d.addCallback(self._update_item, item, deferred)
+        return d
+    
+    def _update_item(self, result, item, deferred):
+        values, media_urls = result
+        for field_name in deferred:
+            if field_name in values:
+                item[field_name] = values[field_name]
+            elif field_name in item:
+                del item[field_name]
+        item._media_urls = media_urls
+        
+        return self._processed(item, deferred)
+    
+    def _processed(self, item, deferred):
+        item._deferred = {}
+        for field_name in deferred:
+            self.stats.inc_value('deferred_processors/%s_count' % field_name)
+        
+        if not self.drop_empty_required:
+            return item
+        
+        empty_fields = [f for f in deferred if item.fields[f].get('required') \
+                        and not item.get(f)]
+        if empty_fields:
+            raise EmptyFields('Item with empty fields "%s" in url: %s' % (empty_fields, item['url']))
+        
+        return item
+
+
+class NearDuplicatesPipeline(BasePipeline):
+    """Find items with text near duplicated of items already seen, like
+    stories of agencies republished by portals
+    
+    The SimHash of the text of ``NEAR_DUPLICATES_FIELDS`` is set on
+    ``simhash`` and looked up on the index persisted between runs, the items
+    of a cluster get the url of its first item on ``nearDuplicateOf`` or are
+    dropped with ``NEAR_DUPLICATES_DROP``.
+    """
+    
+    stats_base = 'near_duplicates/%s'
+    
+    def __init__(self, settings, stats):
+        if not settings.getbool('NEAR_DUPLICATES_ENABLED'):
+            raise NotConfigured('Near duplicates is not enabled, check settings values')
+        
+        self.stats = stats
+        self.fields = [f.strip() for f in settings.getlist('NEAR_DUPLICATES_FIELDS')]
+        self.drop = settings.getbool('NEAR_DUPLICATES_DROP')
+        self.hasher = SimHasher(settings.getint('NEAR_DUPLICATES_SHINGLE_SIZE'))
+        self.index = SimHashIndex.from_settings(settings)
+    
+    def open_spider(self, spider):
+        self.index.open()
+    
+    def close_spider(self, spider):
+        self.index.close()
+    
+    def process_item(self, item, spider):
+        text = ' '.join(remove_tags(item.get(f) or '') for f in self.fields)
+        fingerprint = self.hasher.fingerprint(text)
+        if fingerprint is None:
+            return item
+        
+        item['simhash'] = '%016x' % fingerprint
+        d = threads.deferToThread(self.index.match, item['url'], fingerprint)
+        return d.addCallback(self._matched, item)
+    
+    def _matched(self, match, item):
+        if match is None:
+            return item
+        
+        cluster_url, distance = match
+        if cluster_url == item['url']:
+            return item
+        
+        self.stats.inc_value(self.stats_base % 'count')
+        self.stats.inc_value(self.stats_base % ('distance_count/%d' % distance))
+        if self.drop:
+            raise NearDuplicate('Item of url %s is near duplicated of %s' 
+                                % (item['url'], cluster_url))
+        item['nearDuplicateOf'] = cluster_url
+        
+        return item
+
+
+class BodyStorePipeline(BasePipeline):
+    """Move large fields, like ``articleBody``, to the content addressed
+    ``BodyStore``, items get ``<field>Digest`` and ``<field>Excerpt``
+    
+    Items keep the bodies when ``BODY_STORE_INLINE_SINKS`` isn't empty, so
+    those sinks don't read them back from the store, the others get the
+    digest as reference.
+    """
+    
+    stats_base = 'body_store/%s'
+    
+    def __init__(self, settings, stats):
+        if not settings.getbool('BODY_STORE_ENABLED'):
+            raise NotConfigured('Body store is not enabled, check settings values')
+        
+        self.stats = stats
+        self.store = BodyStore.from_settings(settings)
+        self.keep_bodies = bool(BodyStore.inline_sinks(settings))
+        self.check_item_classes(item_classes())
+        # digests being stored, the deferreds of the items waiting the put,
+        # the stored ones are found by the store
+        self.digests = {}
+    
+    def check_item_classes(self, classes):
+        undeclared = ['%s.%s' % (item_class.__name__, name)
+                      for item_class in classes
+                      for field_name in self.store.fields if field_name in item_class.fields
+                      for name in ('%sDigest' % field_name, '%sExcerpt' % field_name)
+                      if name not in item_class.fields]
+        if undeclared:
+            raise NotConfigured('Body store needs the fields %s, check BODY_STORE_FIELDS'
+                                % ', '.join(undeclared))
+    
+    def process_item(self, item, spider):
+        moves = []
+        for field_name in self.store.fields:
+            body = item.get(field_name)
+            if field_name not in item.fields or not body:
+                continue
+            
+            digest = self.store.digest(body)
+            waiting = self.digests.get(digest)
+            d = defer.Deferred()
+            d.addCallback(self._moved, item, field_name, digest, body)
+            moves.append(d)
+            if waiting:
+                # same body on the way, the digest is valid only if it's stored
+                self.stats.inc_value(self.stats_base % 'duplicated_count')
+                waiting.append(d)
+                continue
+            self.digests[digest] = [d]
+            put = self.store.put(digest, body)
+            put.addCallbacks(self._stored, self._failed, callbackArgs=(digest, body),
+                             errbackArgs=(item, field_name, digest))
+        
+        if not moves:
+            return item
+        return defer.gatherResults(moves).addCallback(lambda _: item)
+    
+    def _moved(self, stored, item, field_name, digest, body):
+        if not stored:
+            # the body goes inline to the sinks
+            return
+        item['%sDigest' % field_name] = digest
+        item['%sExcerpt' % field_name] = self.store.excerpt(body)
+        if not self.keep_bodies:
+            del item[field_name]
+    
+    def _stored(self, stored, digest, body):
+        if stored:
+            self.stats.inc_value(self.stats_base % 'stored_count')
+            self.stats.inc_value(self.stats_base % 'stored_bytes', len(body))
+        else:
+            self.stats.inc_value(self.stats_base % 'duplicated_count')
+        for d in self.digests.pop(digest):
+            d.callback(True)
+    
+    def _failed(self, failure, item, field_name, digest):
+        self.stats.inc_value(self.stats_base % 'errors_count')
+        logger.error('Failed store %s of %s: %s', field_name, item.get('url'), failure.value)
+        for d in self.digests.pop(digest):
+            d.callback(False)
+
+
+class CompactRecordPipeline(BasePipeline):
+    """Turn items into immutable records on ``__slots__``, see
+    ``ze.items.records.Record``
+    
+    Pipelines after it, like the sinks, can't change the items.
+    """
+    
+    def __init__(self, settings, stats):
+        if not settings.getbool('COMPACT_RECORDS_ENABLED'):
+            raise NotConfigured('Compact records is not enabled, check settings values')
+    
+    def process_item(self, item, spider):
+        return to_record(item)
+
+
 class ItemsSideValues(object):
     
     # FIXME: find a better place and how to add the tags of search to keywords
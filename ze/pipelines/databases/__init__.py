@@ -5,7 +5,9 @@ from pymongo import MongoClient, ASCENDING, DESCENDING
 
 from scrapy.exceptions import NotConfigured
 
+from ...items import item_name as get_item_name
 from ...pipelines import BasePipeline
+from ...utils.bodystore import BodyStore
 
 
 class MongoPipeline(BasePipeline):
@@ -19,6 +21,7 @@ class MongoPipeline(BasePipeline):
         if self.settings['enabled']:
             self.mongo_uri = settings.get('MONGO_URI'),
             self.client = None
+            self.body_store = BodyStore.for_sink(settings, 'mongodb')
             
             self.stats = stats
             self.stats.set_value('items/mongodb/insert_count', 0)
@@ -27,17 +30,16 @@ class MongoPipeline(BasePipeline):
             raise NotConfigured('MongoDB is not enabled, check settings values')
 
     def open_spider(self, spider):
-        self.client = MongoClient(self.mongo_uri)
+        # kept open for the next crawls of the process
+        self.client = self.shared_client(('mongodb', self.mongo_uri), MongoClient, self.mongo_uri)
         self.db = self.client.get_default_database()
         self.stats.set_value('items/mongodb/database_name', self.db.name)
 
-    def close_spider(self, spider):
-        self.client.close()
-
     def process_item(self, item, spider):
         try:
-            item_name = item.__class__.__name__
+            item_name = get_item_name(item)
             collection = self.db[item_name]
+            values = self.body_store.sink_values(item) if self.body_store else dict(item)
             
             if self.settings['merge_duplicates']:
                 # TODO: Remove/Refactor
@@ -46,19 +48,19 @@ class MongoPipeline(BasePipeline):
                     for doc in collection.find({'url': item['url']})\
                                          .sort([('dateCreated', ASCENDING)]):
                         item_finded = True
-                        for key in item.keys():
+                        for key in values.keys():
                             if not key in doc:
-                                doc[key] = item[key]
-                        doc['keywords'] = list(set(item.get('keywords', ())) | set(doc.get('keywords', ())))
+                                doc[key] = values[key]
+                        doc['keywords'] = list(set(values.get('keywords', ())) | set(doc.get('keywords', ())))
                         
                         collection.save(doc)
                         self.stats.inc_value('items/mongodb/merged_count')
                     
                     if not item_finded:
-                        collection.insert(dict(item))
+                        collection.insert(values)
                         self.stats.inc_value('items/mongodb/insert_count')
             else:
-                collection.insert(dict(item))
+                collection.insert(values)
                 self.stats.inc_value('items/mongodb/insert_count')
         except Exception as e:
             logger.error('Failed insert item to MongoDB: %s', e)
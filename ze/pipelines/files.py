@@ -2,7 +2,6 @@
 
 import logging; logger = logging.getLogger(__name__)
 
-from google.cloud import storage as GoogleCloudStorage
 from bs4 import BeautifulSoup
 from twisted.internet import defer, threads
 from twisted.internet.defer import Deferred, DeferredList
@@ -12,12 +11,15 @@ from scrapy.pipelines.files import FilesPipeline as ScrapyFilesPipeline
 from scrapy.pipelines.files import FSFilesStore, S3FilesStore
 from scrapy.utils.misc import arg_to_iter
 
+from ze.utils import import_module_timed
+
 
 class GSFilesStore(object):
 
     def __init__(self, uri):
         assert uri.startswith('gs://')
-        client = GoogleCloudStorage.Client()
+        self.storage = import_module_timed('google.cloud.storage')
+        client = self.storage.Client()
         bucket, self.prefix = uri[5:].split('/', 1)
         self.bucket = client.bucket(bucket)
 
@@ -32,7 +34,7 @@ class GSFilesStore(object):
         """Upload file to Google Cloud storage"""
         key_name = '%s%s' % (self.prefix, path)
         buf.seek(0)
-        blob = GoogleCloudStorage.Blob(key_name, self.bucket)
+        blob = self.storage.Blob(key_name, self.bucket)
         
         return threads.deferToThread(
                 blob.upload_from_string, data=buf.getvalue(),
@@ -101,7 +103,8 @@ class FilesPipeline(ScrapyFilesPipeline):
                 info.urls_fields.setdefault(file_url, 
                                             set()).add(file_field)
                 yield Request(file_url,
-                              meta={'file_field': file_field, 'info': info})
+                              meta={'file_field': file_field, 'info': info,
+                                    'dont_abort_download': True})
         else:
             logger.info('Don\'t have set files fields in MEDIA_ITEMS_FIELDS \
                         setting to %s class' %item.__class__.__name__)
\ No newline at end of file
@@ -4,12 +4,10 @@ import json
 import logging; logger = logging.getLogger(__name__)
 
 from scrapy.exceptions import NotConfigured
+from ze.items import item_name
 from ze.pipelines import BasePipeline
-from google.cloud import bigquery
-from google.cloud.bigquery.schema import SchemaField
-from google.cloud import datastore
-from google.cloud import pubsub
-from google.cloud.exceptions import BadRequest
+from ze.utils import import_module_timed
+from ze.utils.bodystore import BodyStore
 
 
 class GooglePubSubPipeline(BasePipeline):
@@ -23,15 +21,17 @@ class GooglePubSubPipeline(BasePipeline):
             self.stats.set_value('google/pubsub/published_count', 0)
             self.stats.set_value('google/pubsub/erros_count', 0)
             
-            self.client = pubsub.Client()
+            pubsub = import_module_timed('google.cloud.pubsub')
+            self.client = self.shared_client('google/pubsub', pubsub.Client)
             self.topics = {}
+            self.body_store = BodyStore.for_sink(settings, 'pubsub')
             logger.info('Google Cloud Pub/Sub client initiated with success')
         else:
             raise NotConfigured('Google Cloud is not enabled, check settings values')
 
     def process_item(self, item, spider):
         try:
-            topic_name = 'ze-the-scraper.%s' % item.__class__.__name__
+            topic_name = 'ze-the-scraper.%s' % item_name(item)
             topic = None
             
             if topic_name in self.topics:
@@ -44,7 +44,8 @@ class GooglePubSubPipeline(BasePipeline):
                 
                 topic = self.topics[topic_name]
             
-            topic.publish(json.dumps(dict(item)))
+            values = self.body_store.sink_values(item) if self.body_store else dict(item)
+            topic.publish(json.dumps(values))
             self.stats.inc_value('google/pubsub/published_count')
         except Exception as e:
             logger.error('Failed publish item to Google Cloud Pub/Sub: %s', e)
@@ -64,10 +65,14 @@ class GoogleBigQueryPipeline(BasePipeline):
             self.stats.set_value('google/bigquery/insert_count', 0)
             self.stats.set_value('google/bigquery/erros_count', 0)
             
-            self.client = bigquery.Client()
+            bigquery = import_module_timed('google.cloud.bigquery')
+            self.SchemaField = import_module_timed('google.cloud.bigquery.schema').SchemaField
+            self.BadRequest = import_module_timed('google.cloud.exceptions').BadRequest
+            self.client = self.shared_client('google/bigquery', bigquery.Client)
             self.dataset = self.client.dataset(settings.get('GOOGLE_CLOUD_BIGQUERY_DATASET'))
             self.tables = {}
             self.schemas = {}
+            self.body_store = BodyStore.for_sink(settings, 'bigquery')
             logger.info('Google Cloud BigQuery client initiated with success')
         else:
             raise NotConfigured('Google Cloud BigQuery is not enabled, check settings values')
@@ -75,7 +80,7 @@ class GoogleBigQueryPipeline(BasePipeline):
     def process_item(self, item, spider):
         # USE https://googlecloudplatform.github.io/google-cloud-python/latest/bigquery/table.html#google.cloud.bigquery.table.Table.row_from_mapping
         try:
-            table_name = item.__class__.__name__
+            table_name = item_name(item)
             table = self.tables.get(table_name)
             if not table:
                 table_schema = self.build_table_schema(item)
@@ -86,13 +91,14 @@ class GoogleBigQueryPipeline(BasePipeline):
                 
                 self.tables[table_name] = table
             
-            errors = table.insert_data([[item.get(c.name, None) for c in table.schema]])
+            values = self.body_store.sink_values(item) if self.body_store else item
+            errors = table.insert_data([[values.get(c.name, None) for c in table.schema]])
             
             self.stats.inc_value('google/bigquery/insert_count') if not errors else None
             self.stats.inc_value('google/bigquery/erros_count') if errors else None
             if errors: 
                 logger.error(errors)
-                raise BadRequest
+                raise self.BadRequest
         except Exception as e:
             logger.error('Failed publish item to Google Cloud BigQuery: %s', e)
             self.stats.inc_value('google/bigquery/erros_count')
@@ -109,7 +115,7 @@ class GoogleBigQueryPipeline(BasePipeline):
                 for sf in schema_fields_list:
                     schema_fields.append(_parse_schema_fields(sf))
             
-            return SchemaField(
+            return self.SchemaField(
                 schema_field['name'], 
                 schema_field['field_type'], 
                 schema_field.get('mode', 'NULLABLE'), 
@@ -137,7 +143,9 @@ class GoogleDatastorePipeline(BasePipeline):
         self.namespace = '__{0}__'.format(settings.get('ENVIROMENT', 'development')),
         
         if google_cloud_enabled and enabled:
-            self.client = datastore.Client()
+            self.datastore = import_module_timed('google.cloud.datastore')
+            self.client = self.shared_client('google/datastore', self.datastore.Client)
+            self.body_store = BodyStore.for_sink(settings, 'datastore')
             # self.batch = self.client.batch()
             
             self.stats = stats
@@ -150,12 +158,12 @@ class GoogleDatastorePipeline(BasePipeline):
     def process_item(self, item, spider):
         try:
             # TODO implement key namespace
-            key = self.client.key(item.__class__.__name__)
+            key = self.client.key(item_name(item))
             
             exclude_from_indexes = [k for k in item.fields \
                 if item.fields[k].get('indexed', True) is False]
             
-            entity = datastore.Entity(key, exclude_from_indexes)
+            entity = self.datastore.Entity(key, exclude_from_indexes)
             
             entity.update(self.seriealize(item))
             
@@ -168,6 +176,8 @@ class GoogleDatastorePipeline(BasePipeline):
         return item
     
     def seriealize(self, item):
+        # copy of values, the item can be an immutable record
+        values = self.body_store.sink_values(item) if self.body_store else dict(item)
         for k in item.fields.keys():
             schemas = item.fields[k].get('schemas', {})
             datastore_schema = schemas.get('datastore')
@@ -177,9 +187,9 @@ class GoogleDatastorePipeline(BasePipeline):
                         entity_values = []
                         for p, it in enumerate(item[k]):
                             e_key = self.client.key(''.join((k, str(p))))
-                            entity_value = datastore.Entity(e_key)
+                            entity_value = self.datastore.Entity(e_key)
                             entity_value.update(it)
                             entity_values.append(entity_value)
-                        item[k] = entity_values
+                        values[k] = entity_values
         
-        return item
\ No newline at end of file
+        return values
\ No newline at end of file
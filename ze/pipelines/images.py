@@ -33,9 +33,13 @@ class ImagesPipeline(ScrapyImagesPipeline, FilesPipeline):
                                                 (image_field, extract_format)))
                     
                     if extract_format == 'html':
-                        html = BeautifulSoup(item[image_field], 'html.parser')
-                        for img in html.findAll('img'):
-                            append_images_urls((img['src'].strip(), 
+                        # collected by the workers of DeferredProcessorsPipeline
+                        srcs = getattr(item, '_media_urls', {}).get(image_field)
+                        if srcs is None:
+                            html = BeautifulSoup(item[image_field], 'html.parser')
+                            srcs = [img['src'] for img in html.findAll('img')]
+                        for src in srcs:
+                            append_images_urls((src.strip(), 
                                                 (image_field, extract_format)))
             
             for image_url, image_field in images_urls:
@@ -43,7 +47,8 @@ class ImagesPipeline(ScrapyImagesPipeline, FilesPipeline):
                     info.urls_fields.setdefault(image_url, 
                                                 set()).add(image_field)
                     yield Request(image_url,
-                                  meta={'image_field': image_field, 'info': info})
+                                  meta={'image_field': image_field, 'info': info,
+                                        'dont_abort_download': True})
         else:
             logger.info('Don\'t have set images fields in MEDIA_ITEMS_FIELDS \
                         setting to %s class' %item.__class__.__name__)
@@ -4,7 +4,6 @@ from urllib.parse import urlparse
 import logging; logger = logging.getLogger(__name__)
 
 from datetime import datetime
-import dateparser
 
 __all__ = ('CleanString', 'FormatString', 'ValidURL', 'ParseDate')
 
@@ -42,6 +41,8 @@ class ParseDate(object):
         self.field = field
 
     def __call__(self, value, loader_context):
+        # dateparser takes long to import, only when the first date is parsed
+        import dateparser
         spider_name = loader_context.get('spider_name')
 
         if spider_name == 'r7':
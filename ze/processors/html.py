@@ -2,17 +2,18 @@
 from importlib import import_module
 import traceback
 import json
-import requests
 import logging; logger = logging.getLogger(__name__)
 
-from bs4 import BeautifulSoup, Comment
-
 
 class ImproveHTML(object):
 
     estadao_media_url = 'http://mdw-mm.estadao.com.br/middlewareAgile/rest/conteudo?tipo_midia={tipo}&idAgile={id}&produto=estadao'
 
     def __call__(self, value, loader_context):
+        # imported by the first page, not by the items definitions
+        import requests
+        from bs4 import BeautifulSoup, Comment
+        
         spider_name = loader_context.get('spider_name')
         improve_html_locations = loader_context.get('improve_html')
         html = BeautifulSoup(value, 'html.parser')
@@ -14,6 +14,11 @@ BOT_NAME = os.getenv('BOT_NAME', 'ze-the-scraper')
 SPIDER_MODULES = os.getenv('SPIDER_MODULES', 'ze.spiders')
 NEWSPIDER_MODULE = os.getenv('SPIDER_MODULES', 'ze.spiders')
 COMMANDS_MODULE = os.getenv('COMMANDS_MODULE', 'ze.commands')
+# Spiders are imported only when loaded, by the manifest of `scrapy generate manifest`
+SPIDER_LOADER_CLASS = os.getenv('SPIDER_LOADER_CLASS', 'ze.utils.registry.ManifestSpiderLoader')
+SPIDER_MANIFEST_ENABLED = os.getenv('SPIDER_MANIFEST_ENABLED', True)
+SPIDER_MANIFEST_FILE = os.getenv('SPIDER_MANIFEST_FILE', 
+    os.path.join(os.path.dirname(__file__), 'spiders', 'manifest.json'))
 ENVIROMENT = os.getenv('ENVIROMENT', 'development')
 
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
@@ -25,14 +30,43 @@ SPIDERS_AUTH = os.getenv('SPIDERS_AUTH', {'somespider': {'user': 'USER', 'pass':
 USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Ubuntu Chromium/56.0.2924.76 Chrome/56.0.2924.76 Safari/537.36'
 
 # Configure maximum concurrent requests performed by Scrapy
-CONCURRENT_REQUESTS = os.getenv('CONCURRENT_REQUESTS', 32)
+CONCURRENT_REQUESTS = int(os.getenv('CONCURRENT_REQUESTS', 32))
 
 # Configure a delay for requests for the same website
 # See http://scrapy.readthedocs.org/en/latest/topics/settings.html#download-delay
 # DOWNLOAD_DELAY=3
 # The download delay setting will honor only one of:
-CONCURRENT_REQUESTS_PER_DOMAIN = os.getenv('CONCURRENT_REQUESTS_PER_DOMAIN', 16)
-CONCURRENT_REQUESTS_PER_IP = os.getenv('CONCURRENT_REQUESTS_PER_IP', 16)
+CONCURRENT_REQUESTS_PER_DOMAIN = int(os.getenv('CONCURRENT_REQUESTS_PER_DOMAIN', 16))
+# Must be 0 to the adaptive concurrency control the slots of each domain
+CONCURRENT_REQUESTS_PER_IP = int(os.getenv('CONCURRENT_REQUESTS_PER_IP', 0))
+
+# Tune concurrency and delay of each domain from latency, errors and 429/503
+# responses. Spiders can set limits with the `download_slots` attribute
+ADAPTIVE_CONCURRENCY_ENABLED = os.getenv('ADAPTIVE_CONCURRENCY_ENABLED', True)
+ADAPTIVE_CONCURRENCY_MIN = int(os.getenv('ADAPTIVE_CONCURRENCY_MIN', 1))
+ADAPTIVE_CONCURRENCY_MAX = int(os.getenv('ADAPTIVE_CONCURRENCY_MAX', 32))
+ADAPTIVE_CONCURRENCY_MAX_DELAY = float(os.getenv('ADAPTIVE_CONCURRENCY_MAX_DELAY', 60))
+# Latency in seconds under which the concurrency of the domain is increased
+ADAPTIVE_CONCURRENCY_TARGET_LATENCY = float(os.getenv('ADAPTIVE_CONCURRENCY_TARGET_LATENCY', 2))
+ADAPTIVE_CONCURRENCY_MAX_ERROR_RATE = float(os.getenv('ADAPTIVE_CONCURRENCY_MAX_ERROR_RATE', 0.1))
+# Number of responses between each increase of concurrency
+ADAPTIVE_CONCURRENCY_WINDOW = int(os.getenv('ADAPTIVE_CONCURRENCY_WINDOW', 10))
+ADAPTIVE_CONCURRENCY_DEBUG = os.getenv('ADAPTIVE_CONCURRENCY_DEBUG', False)
+
+# Seeds requests priority from search rank, publication date and the
+# publishing rate of domain learned from past runs (articles per hour)
+SEED_PRIORITY_ENABLED = os.getenv('SEED_PRIORITY_ENABLED', True)
+SEED_PRIORITY_RANK_WEIGHT = os.getenv('SEED_PRIORITY_RANK_WEIGHT', 50)
+SEED_PRIORITY_FRESHNESS_WEIGHT = os.getenv('SEED_PRIORITY_FRESHNESS_WEIGHT', 100)
+# Hours to the freshness score of the publication date falls to half
+SEED_PRIORITY_FRESHNESS_HALF_LIFE = os.getenv('SEED_PRIORITY_FRESHNESS_HALF_LIFE', 6)
+SEED_PRIORITY_RATE_WEIGHT = os.getenv('SEED_PRIORITY_RATE_WEIGHT', 30)
+# Priority removed for each seed of the same domain, rotate between domains,
+# near to the difference of rank score between the first and second results
+SEED_PRIORITY_ROTATION_PENALTY = os.getenv('SEED_PRIORITY_ROTATION_PENALTY', 20)
+SEED_PRIORITY_RATES_FILE = os.getenv('SEED_PRIORITY_RATES_FILE', 'publishing-rates.json')
+SEED_PRIORITY_RATES_WINDOW = os.getenv('SEED_PRIORITY_RATES_WINDOW', 24)
+SEED_PRIORITY_RATES_ALPHA = os.getenv('SEED_PRIORITY_RATES_ALPHA', 0.3)
 
 # Enable or Disable cookies
 COOKIES_ENABLED = os.getenv('COOKIES_ENABLED', False)
@@ -43,9 +77,31 @@ TELNETCONSOLE_ENABLED = os.getenv('TELNETCONSOLE_ENABLED', False)
 # Enable or disable extensions
 EXTENSIONS={
     'ze.extensions.google.GoogleCloud': 10,
+    'ze.extensions.scheduling.PublishingRateEstimator': 100,
+    'ze.extensions.selectors.SelectorStatsExtension': 110,
+    'ze.extensions.stats.StatsDump': 120,
+    'ze.extensions.stats.ImportTimesStats': 130,
+    'ze.extensions.stats.TimingStats': 140,
+    # MemoryUsage is replaced by the watchdog, that extend it
+    'scrapy.extensions.memusage.MemoryUsage': None,
+    'ze.extensions.memory.MemoryWatchdog': 150,
+    'ze.extensions.profiler.SamplingProfiler': 160,
     'scrapy_jsonrpc.webservice.WebService': 500,
 }
 # ROTATING_PROXY_LIST = ze.utils.file.load_lines('./proxies-list.txt')
+# Proxy pool with health scores, check the list with `scrapy checkproxies`
+PROXY_POOL_ENABLED = os.getenv('PROXY_POOL_ENABLED', False)
+PROXY_POOL_LIST = os.getenv('PROXY_POOL_LIST', './proxies-list.txt')
+# Scores of proxies persisted between runs, relative to project data dir
+PROXY_POOL_SCORES_FILE = os.getenv('PROXY_POOL_SCORES_FILE', 'proxies-scores.json')
+PROXY_POOL_EWMA_ALPHA = os.getenv('PROXY_POOL_EWMA_ALPHA', 0.3)
+# Seconds of the first quarantine of a failed proxy, doubled on each failure
+PROXY_POOL_QUARANTINE_BASE = os.getenv('PROXY_POOL_QUARANTINE_BASE', 60)
+PROXY_POOL_QUARANTINE_MAX = os.getenv('PROXY_POOL_QUARANTINE_MAX', 3600)
+PROXY_POOL_BAN_STATUS = os.getenv('PROXY_POOL_BAN_STATUS', '403,407,429,503')
+PROXY_POOL_CHECK_URL = os.getenv('PROXY_POOL_CHECK_URL', 'http://g1.globo.com/')
+PROXY_POOL_CHECK_TIMEOUT = os.getenv('PROXY_POOL_CHECK_TIMEOUT', 5)
+PROXY_POOL_CHECK_CONCURRENCY = os.getenv('PROXY_POOL_CHECK_CONCURRENCY', 200)
 # Google Cloud Application
 GOOGLE_CLOUD_ENABLED = os.getenv('GOOGLE_CLOUD_ENABLED', False)
 # Google Cloud Application Credentions used for many pipelines
@@ -55,6 +111,8 @@ JSONRPC_PORT=6080
 
 SPIDER_MIDDLEWARES = {
     'ze.middlewares.spider.searchengines.GoogleSearchMiddleware': 40,
+    # Near to the spider to profile only its callbacks
+    'ze.middlewares.spider.profiler.ResponseProfileMiddleware': 990,
     'scrapy.spidermiddlewares.httperror.HttpErrorMiddleware': 50,
     # 'scrapy_deltafetch.DeltaFetch': 100,
     'scrapy.spidermiddlewares.offsite.OffsiteMiddleware': 500,
@@ -74,15 +132,141 @@ SEARCH_MIDDLEWARE_GCSE_MAX_INDEX = os.getenv('SEARCH_MIDDLEWARE_GCSE_MAX_INDEX',
 
 # Enable or disable downloader middlewares
 # See http://scrapy.readthedocs.org/en/latest/topics/downloader-middleware.html
-# DOWNLOADER_MIDDLEWARES = {
+DOWNLOADER_MIDDLEWARES = {
+    # Near to downloader to see the responses before retry and cache middlewares
+    'ze.middlewares.downloader.throttle.AdaptiveConcurrencyMiddleware': 950,
+    'ze.middlewares.downloader.proxies.ProxyPoolMiddleware': 740,
+    'ze.middlewares.downloader.earlyabort.EarlyAbortMiddleware': 960,
+    'ze.middlewares.downloader.metrics.DomainMetricsMiddleware': 970,
     # 'rotating_proxies.middlewares.RotatingProxyMiddleware': 610,
     # 'rotating_proxies.middlewares.BanDetectionMiddleware': 620,
-# }
+}
+
+# Histograms of TTFB, latency, size and status of responses by domain,
+# exported to a Prometheus textfile and a JSON snapshot, relative to data dir
+DOMAIN_METRICS_ENABLED = os.getenv('DOMAIN_METRICS_ENABLED', False)
+DOMAIN_METRICS_INTERVAL = float(os.getenv('DOMAIN_METRICS_INTERVAL', 60))
+DOMAIN_METRICS_TEXTFILE = os.getenv('DOMAIN_METRICS_TEXTFILE', 'metrics/ze_domains_%(spider)s.prom')
+DOMAIN_METRICS_SNAPSHOT = os.getenv('DOMAIN_METRICS_SNAPSHOT', 'metrics/domains_%(spider)s.json')
+
+# Answer <meta> and <title> selectors from a single scan of the page <head>
+HEAD_METADATA_ENABLED = os.getenv('HEAD_METADATA_ENABLED', True)
+
+# Fill item fields from schema.org JSON-LD articles before run the selectors
+JSON_LD_ENABLED = os.getenv('JSON_LD_ENABLED', True)
+# Fields filled from JSON-LD only when the selectors don't find them, the
+# articleBody of JSON-LD is plain text without the images of the page
+JSON_LD_FALLBACK_FIELDS = os.getenv('JSON_LD_FALLBACK_FIELDS', 'articleBody')
+
+# Match the selectors of spiders with a single traversal of each page
+SELECTOR_MATCHER_ENABLED = os.getenv('SELECTOR_MATCHER_ENABLED', True)
+
+# Extract only these fields (or `-a fields=url,name`), fields required and
+# url are always extracted
+FIELDS_PROJECTION = os.getenv('FIELDS_PROJECTION', None)
+# Fields needed by each sink by its enable setting, None needs all fields.
+# Without FIELDS_PROJECTION the enabled sinks and FEED_EXPORT_FIELDS of
+# `-o` exports set the fields extracted
+FIELDS_PROJECTION_SINKS = os.getenv('FIELDS_PROJECTION_SINKS', {
+    'MONGO_ENABLED': None,
+    'GOOGLE_CLOUD_BIGQUERY_ENABLED': None,
+    'GOOGLE_CLOUD_DATASTORE_ENABLED': None,
+    'GOOGLE_CLOUD_PUBSUB_ENABLED': None,
+})
+
+# Timezone of the cron schedules of `scrapy schedule` jobs
+SCHEDULE_TIMEZONE = os.getenv('SCHEDULE_TIMEZONE', 'America/Sao_Paulo')
+
+# `scrapy serve` extraction service, 0 workers is one by CPU
+EXTRACTION_SERVICE_PORT = int(os.getenv('EXTRACTION_SERVICE_PORT', 6900))
+EXTRACTION_SERVICE_WORKERS = int(os.getenv('EXTRACTION_SERVICE_WORKERS', 0))
+# Extractions waiting or running on workers, 0 is twice the workers
+EXTRACTION_SERVICE_QUEUE_SIZE = int(os.getenv('EXTRACTION_SERVICE_QUEUE_SIZE', 0))
+
+# Sample the stacks of crawls to flamegraph.pl collapsed files on PROFILE_DIR,
+# relative to data dir, and profile with cProfile PROFILE_RESPONSES responses.
+# Samples are taken each PROFILE_INTERVAL seconds of CPU time
+ZE_PROFILE = os.getenv('ZE_PROFILE', False)
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.01))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_RESPONSES = int(os.getenv('PROFILE_RESPONSES', 0))
+PROFILE_RESPONSES_EVERY = int(os.getenv('PROFILE_RESPONSES_EVERY', 100))
+
+# Memory usage by stage with tracemalloc, snapshot diffs dumped when RSS cross
+# each threshold and the engine paused over MEMORY_WATCHDOG_PAUSE_MB (0 never)
+MEMORY_WATCHDOG_ENABLED = os.getenv('MEMORY_WATCHDOG_ENABLED', False)
+# frames of allocations, more frames find the stage of more of them but cost more
+MEMORY_WATCHDOG_TRACEMALLOC_FRAMES = int(os.getenv('MEMORY_WATCHDOG_TRACEMALLOC_FRAMES', 1))
+MEMORY_WATCHDOG_DUMP_MB = os.getenv('MEMORY_WATCHDOG_DUMP_MB', '1024, 2048, 3072, 4096')
+MEMORY_WATCHDOG_DUMP_DIR = os.getenv('MEMORY_WATCHDOG_DUMP_DIR', 'memory')
+MEMORY_WATCHDOG_PAUSE_MB = int(os.getenv('MEMORY_WATCHDOG_PAUSE_MB', 0))
+# 0 is 80% of MEMORY_WATCHDOG_PAUSE_MB
+MEMORY_WATCHDOG_RESUME_MB = int(os.getenv('MEMORY_WATCHDOG_RESUME_MB', 0))
+
+# Latency histograms of selectors, processors and pipelines on timing/ stats
+TIMING_STATS_ENABLED = os.getenv('TIMING_STATS_ENABLED', False)
+
+# Pages of each spider timed by `scrapy benchmark`, stored by `scrapy benchmark
+# record` or `scrapy benchmark generate`
+BENCHMARK_PAGES_DIR = os.getenv('BENCHMARK_PAGES_DIR', 
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'benchmarks', 'pages'))
+
+# Write the stats of the crawl as JSON on this file, set to workers of crawlsharded
+STATS_DUMP_FILE = os.getenv('STATS_DUMP_FILE', None)
+
+# Frontier and dupefilter shared by crawler nodes, see ze/frontier
+SCHEDULER = os.getenv('SCHEDULER', 'ze.frontier.scheduler.FrontierScheduler')
+FRONTIER_ENABLED = os.getenv('FRONTIER_ENABLED', False)
+# ze.frontier.backends.MemoryFrontier, SQLiteFrontier or RedisFrontier
+FRONTIER_BACKEND = os.getenv('FRONTIER_BACKEND', 'ze.frontier.backends.SQLiteFrontier')
+# Ex: redis://127.0.0.1:6379/0 or sqlite:///frontier.db (data dir)
+FRONTIER_URI = os.getenv('FRONTIER_URI', None)
+FRONTIER_REDIS_PREFIX = os.getenv('FRONTIER_REDIS_PREFIX', 'ze:frontier')
+# Name of the node on leases, default is hostname-pid
+FRONTIER_NODE = os.getenv('FRONTIER_NODE', None)
+# Domains leased by node and seconds to renew the leases before they expire
+FRONTIER_MAX_PARTITIONS = os.getenv('FRONTIER_MAX_PARTITIONS', 16)
+FRONTIER_LEASE_TTL = os.getenv('FRONTIER_LEASE_TTL', 60)
+# Requests pushed and leased at once and seconds between pushes and leases
+FRONTIER_BATCH_SIZE = os.getenv('FRONTIER_BATCH_SIZE', 32)
+FRONTIER_LEASE_INTERVAL = os.getenv('FRONTIER_LEASE_INTERVAL', 1)
+# Seconds that fingerprints of requests are seen, then they can be crawled again
+FRONTIER_SEEN_TTL = os.getenv('FRONTIER_SEEN_TTL', 7 * 24 * 3600)
+
+# Hits and misses of spiders selectors kept between runs, see `scrapy selectors`
+SELECTOR_STATS_ENABLED = os.getenv('SELECTOR_STATS_ENABLED', True)
+SELECTOR_STATS_FILE = os.getenv('SELECTOR_STATS_FILE', 'selectors-stats.json')
+# Try first the selectors with more hits on the sampled pages, after MIN_SAMPLES
+# pages, and only before the selectors they never hit together with
+SELECTOR_STATS_ADAPTIVE = os.getenv('SELECTOR_STATS_ADAPTIVE', False)
+SELECTOR_STATS_MIN_SAMPLES = os.getenv('SELECTOR_STATS_MIN_SAMPLES', 20)
+# One of SAMPLE_EVERY pages of a field has all the selectors tried
+SELECTOR_STATS_SAMPLE_EVERY = os.getenv('SELECTOR_STATS_SAMPLE_EVERY', 20)
+
+# Abort downloads of content that can't be parsed by spiders
+EARLY_ABORT_ENABLED = os.getenv('EARLY_ABORT_ENABLED', True)
+# Content types accepted, any other abort the download, spiders of APIs get JSON
+EARLY_ABORT_CONTENT_TYPES = os.getenv('EARLY_ABORT_CONTENT_TYPES',
+    'text/html,application/xhtml+xml,text/plain,application/json')
+# Ignore requests to URLs with these extensions before download
+EARLY_ABORT_URL_EXTENSIONS = os.getenv('EARLY_ABORT_URL_EXTENSIONS',
+    'pdf,doc,docx,xls,xlsx,ppt,pptx,zip,rar,gz,jpg,jpeg,png,gif,webp,svg,'
+    'mp3,mp4,m4a,m4v,avi,mov,wmv,flv,webm,ogg,wav,m3u8,swf,exe')
+# Max body size of responses in bytes, to all domains and by domain
+DOWNLOAD_MAXSIZE = int(os.getenv('DOWNLOAD_MAXSIZE', 10 * 1024 * 1024))
+EARLY_ABORT_DOMAINS_MAXSIZE = os.getenv('EARLY_ABORT_DOMAINS_MAXSIZE', {
+    # 'folha.uol.com.br': 4 * 1024 * 1024,
+})
 
 ITEM_PIPELINES={
     'ze.pipelines.ItemsSideValues': 0,
     'ze.pipelines.DropItemsPipeline': 10,
+    'ze.pipelines.DeferredProcessorsPipeline': 15,
     # 'ze.pipelines.images.ImagesPipeline': 20,
+    'ze.pipelines.NearDuplicatesPipeline': 110,
+    'ze.pipelines.BodyStorePipeline': 120,
+    # after the pipelines that change the items
+    'ze.pipelines.CompactRecordPipeline': 150,
     'ze.pipelines.databases.MongoPipeline': 200,
     'ze.pipelines.google.cloud.GooglePubSubPipeline': 300,
     'ze.pipelines.google.cloud.GoogleDatastorePipeline': 400,
@@ -90,6 +274,39 @@ ITEM_PIPELINES={
 }
 DROP_ITEM_PIPELINE_ENABLED = os.getenv('DROP_ITEM_PIPELINE_ENABLED', False)
 DROP_ITEM_PIPELINE_VALIDATIONS = os.getenv('DROP_ITEM_PIPELINE_VALIDATIONS', 'not_match_regex, empty_required_fields')
+# Run costly processors, like ImproveHTML of articleBody, after DropItemsPipeline
+DEFERRED_PROCESSORS_ENABLED = os.getenv('DEFERRED_PROCESSORS_ENABLED', True)
+# Run the deferred processors on worker processes, 0 workers is one by CPU
+PROCESS_POOL_ENABLED = os.getenv('PROCESS_POOL_ENABLED', False)
+PROCESS_POOL_MAX_WORKERS = int(os.getenv('PROCESS_POOL_MAX_WORKERS', 0))
+# Items waiting or running on workers, 0 is twice the workers
+PROCESS_POOL_QUEUE_SIZE = int(os.getenv('PROCESS_POOL_QUEUE_SIZE', 0))
+# Imported by the workers when the pool starts, packages with all modules
+PROCESS_POOL_WARM_MODULES = os.getenv('PROCESS_POOL_WARM_MODULES', 
+    'ze.items,ze.processors,ze.spiders')
+# SimHash of the text of items looked up on an index of SQLite, relative to
+# data dir, near duplicates get nearDuplicateOf or are dropped
+NEAR_DUPLICATES_ENABLED = os.getenv('NEAR_DUPLICATES_ENABLED', False)
+NEAR_DUPLICATES_FILE = os.getenv('NEAR_DUPLICATES_FILE', 'near-duplicates.db')
+NEAR_DUPLICATES_FIELDS = os.getenv('NEAR_DUPLICATES_FIELDS', 'name,articleBody')
+NEAR_DUPLICATES_SHINGLE_SIZE = int(os.getenv('NEAR_DUPLICATES_SHINGLE_SIZE', 3))
+# Bits of difference between SimHashes of near duplicates
+NEAR_DUPLICATES_MAX_DISTANCE = int(os.getenv('NEAR_DUPLICATES_MAX_DISTANCE', 3))
+NEAR_DUPLICATES_DROP = os.getenv('NEAR_DUPLICATES_DROP', False)
+
+# Content addressed store of gzipped bodies, items keep <field>Digest and
+# <field>Excerpt, URI is a dir relative to data dir or gs://bucket/prefix/
+BODY_STORE_ENABLED = os.getenv('BODY_STORE_ENABLED', False)
+BODY_STORE_URI = os.getenv('BODY_STORE_URI', 'bodies')
+BODY_STORE_FIELDS = os.getenv('BODY_STORE_FIELDS', 'articleBody')
+BODY_STORE_EXCERPT_LENGTH = int(os.getenv('BODY_STORE_EXCERPT_LENGTH', 280))
+# Sinks with the bodies inline, the others keep the digest: mongodb, pubsub,
+# bigquery and datastore. Items keep the bodies in memory for them
+BODY_STORE_INLINE_SINKS = os.getenv('BODY_STORE_INLINE_SINKS', '')
+
+# Immutable records with slots only for the filled fields to the sinks, less
+# memory by buffered item
+COMPACT_RECORDS_ENABLED = os.getenv('COMPACT_RECORDS_ENABLED', True)
 # MongoDB pipeline configuration
 MONGO_ENABLED = os.getenv('MONGO_ENABLED', False)
 MONGO_URI = os.getenv('MONGO_URI', 'mongodb://127.0.0.1:27017/ze-the-scraper')
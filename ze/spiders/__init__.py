@@ -1,12 +1,18 @@
 # -*- coding: utf-8 -*-
+import json
 from urllib.parse import urlparse
 
 import scrapy
-from scrapy.spiderloader import SpiderLoader
-from scrapy.http import Request
+from scrapy.http import Request, HtmlResponse
 
 import ze
 from ze import utils
+from ze.utils.head import HeadMetadata
+from ze.utils.jsonld import find_article, article_values
+from ze.utils.priority import SeedPriority
+from ze.utils.registry import SpiderRegistry
+from ze.utils.projection import fields_projection, drop_validation_enabled
+from ze.utils.selectors import SelectorMatcher
 
 
 class ZeSpider(scrapy.Spider):
@@ -14,11 +20,32 @@ class ZeSpider(scrapy.Spider):
     allowed_domains = []
 
     def start_requests(self):
+        if hasattr(self, 'seeds_file'):
+            self.load_seeds_file()
         if hasattr(self, 'url'):
-            self.start_urls.append(self.url)
+            # a new list, start_urls of the class are shared by its crawls
+            self.start_urls = list(self.start_urls) + [self.url]
         
-        for url in self.start_urls:
-            yield Request(url, dont_filter=False)
+        # start_urls can be set by search middleware when the spider is opened
+        for request in self.seed_requests(self.start_urls):
+            yield request
+
+    def load_seeds_file(self):
+        """Seeds searched before by ``scrapy crawlsharded``"""
+        with open(self.seeds_file) as f:
+            seeds = json.load(f)
+        self.start_urls = seeds['start_urls']
+        self.seeds_meta = seeds['seeds_meta']
+
+    def seed_requests(self, urls):
+        if self.settings.getbool('SEED_PRIORITY_ENABLED'):
+            seed_priority = SeedPriority.from_settings(self.settings)
+            seeds = seed_priority.prioritize(urls, getattr(self, 'seeds_meta', {}))
+        else:
+            seeds = [(url, 0) for url in urls]
+        
+        for url, priority in seeds:
+            yield Request(url, priority=priority, dont_filter=False)
 
     def parse(self, response):
         # TODO: fix this
@@ -26,32 +53,130 @@ class ZeSpider(scrapy.Spider):
             yield self.load_item(item_ref, response)
 
     def load_item(self, item_def, response):
-        def parse_item_ref(item_def, response, spider_name):
+        def parse_item_ref(item_def, response, spider_name, json_ld_values=None):
             ItemClass = utils.import_class(item_def.get('item'))
             item_load = ze.items.ItemLoader(item=ItemClass(), 
                                             response=response, 
-                                            spider_name=spider_name)
+                                            spider_name=spider_name,
+                                            head_metadata=head_metadata,
+                                            selector_matcher=selector_matcher,
+                                            defer_processors=defer_processors,
+                                            timings=timings)
+            values, parsed_values = json_ld_values or ({}, {})
+            fields = set(ItemClass.fields)
+            if projection is not None and item_def is root_item_def:
+                # required fields are extracted too when items without them are dropped
+                fields &= projection | set(f for f, m in ItemClass.fields.items() \
+                                           if m.get('required') and validate_required)
+            values = {k: v for k, v in values.items() if k in fields}
+            parsed_values = {k: v for k, v in parsed_values.items() if k in fields}
+            json_ld_fields = set()
             
             for field_name, properties in item_def['fields'].items():
+                if field_name not in fields:
+                    continue
                 if not 'item' in properties:
                     # TODO: This will word with 2 fields with some context?
                     item_load.context.update(properties.get('contexts', {}))
-                    for i, selector in enumerate(properties['selectors']['css']):
-                        if i == 0: item_load.add_css(field_name, selector) 
-                        else: item_load.add_fallback_css(field_name, selector)
+                    if field_name in values and field_name not in json_ld_fallback_fields:
+                        item_load.add_value(field_name, values.pop(field_name))
+                    if field_name in parsed_values:
+                        item_load.add_parsed_value(field_name, parsed_values.pop(field_name))
+                    if any(item_load.get_collected_values(field_name)):
+                        json_ld_fields.add(field_name)
+                        continue
+                    
+                    selectors = properties['selectors']['css']
+                    if selector_stats:
+                        selectors = selector_stats.order(spider_name, field_name, selectors)
+                    
+                    # the first selector that match wins
+                    for selector in selectors:
+                        item_load.add_css(field_name, selector)
+                        hit = any(item_load.get_collected_values(field_name))
+                        if selector_stats:
+                            selector_stats.record(spider_name, field_name, selector, hit)
+                        if hit:
+                            break
+                    
+                    if selector_stats and selector_stats.sample(spider_name, field_name):
+                        # all the selectors, the hits of the later ones count
+                        # on the pages the first ones hit too
+                        spider_selectors = properties['selectors']['css']
+                        hits = [s for s in spider_selectors
+                                if any(item_load.selector.css(s).extract())]
+                        selector_stats.record_sample(spider_name, field_name,
+                                                     spider_selectors, hits)
                 else:
                     field_item_load = parse_item_ref(properties, response, spider_name)
                     item_load.add_value(field_name, field_item_load.load_item())
             
+            # fields of JSON-LD that aren't in the spider fields or fallbacks
+            for field_name, value in values.items():
+                if not any(item_load.get_collected_values(field_name)):
+                    item_load.add_value(field_name, value)
+            for field_name, value in parsed_values.items():
+                item_load.add_parsed_value(field_name, value)
+            
+            if json_ld_values:
+                self._json_ld_stats(spider_name, item_def, json_ld_fields,
+                                    json_ld_fallback_fields)
+            
             return item_load
         
-        spider_name = self.name if not hasattr(item_def, 'spider') \
-                                else item_def['spider']['name']
-        item = parse_item_ref(item_def, response, spider_name)
+        spider_name = item_def.get('spider_name', self.name)
+        root_item_def = item_def
+        projection = self.fields_projection
+        validate_required = drop_validation_enabled(self.settings, 'empty_required_fields')
+        selector_stats = getattr(self, 'selector_stats', None)
+        timings = getattr(self, 'timings', None)
+        defer_processors = self.settings.getbool('DEFERRED_PROCESSORS_ENABLED')
+        head_metadata = HeadMetadata.from_response(response) \
+                        if self.settings.getbool('HEAD_METADATA_ENABLED') else None
+        selector_matcher = None
+        if self.settings.getbool('SELECTOR_MATCHER_ENABLED') \
+        and isinstance(response, HtmlResponse):
+            selector_matcher = SelectorMatcher.from_response(response)
+        json_ld_values = None
+        json_ld_fallback_fields = self.settings.getlist('JSON_LD_FALLBACK_FIELDS')
+        if self.settings.getbool('JSON_LD_ENABLED') and hasattr(response, 'xpath'):
+            article = find_article(
+                response.xpath('//script[@type="application/ld+json"]/text()').extract())
+            json_ld_values = article_values(article) if article else None
+        
+        item = parse_item_ref(item_def, response, spider_name, json_ld_values)
         item.add_value('url', response.url)
         
         return item.load_item()
 
+    @property
+    def fields_projection(self):
+        if not hasattr(self, '_fields_projection'):
+            self._fields_projection = fields_projection(self.settings,
+                                                        getattr(self, 'fields', None))
+            if self._fields_projection is not None:
+                self._fields_projection |= set(['url'])
+                if hasattr(self, 'regex') \
+                and drop_validation_enabled(self.settings, 'not_match_regex'):
+                    self._fields_projection |= set(['name', 'articleBody'])
+                self.logger.info('Extracting only the fields %s',
+                                 ', '.join(sorted(self._fields_projection)))
+        return self._fields_projection
+
+    def _json_ld_stats(self, spider_name, item_def, json_ld_fields, fallback_fields):
+        crawler = getattr(self, 'crawler', None)
+        if crawler is None:
+            return
+        
+        stats_base = 'spider/%s/json_ld/%%s' % spider_name
+        crawler.stats.inc_value(stats_base % 'items_count')
+        for field_name in json_ld_fields:
+            crawler.stats.inc_value(stats_base % ('fields/%s' % field_name))
+        # JSON-LD was enough when none selector run, besides the fallback fields
+        if json_ld_fields >= set(f for f, p in item_def['fields'].items() \
+                                 if 'item' not in p and f not in fallback_fields):
+            crawler.stats.inc_value(stats_base % 'complete_count')
+
     def search(self, match):
         raise NotImplementedError
 
@@ -60,41 +185,37 @@ class ZeSpider(scrapy.Spider):
 class AllSpiders(ZeSpider):
 
     name = 'all'
-    allowed_domains = []
-    domains_items_refs = {}
-    start_urls = []
     spiders_ignored = [name, 'atardeimpresso', 'correiobrazilienseimpresso', 
         'correiopopularimpreso', 'estadaoimpresso', 'estadodeminasimpresso',
         'ogloboimpresso', ]
     
+    def __init__(self, *args, **kwargs):
+        # by crawl, `scrapy schedule` runs many crawls of the spider together
+        self.allowed_domains = []
+        self.domains_items_refs = {}
+        self.domains_download_slots = {}
+        self.start_urls = []
+        super(AllSpiders, self).__init__(*args, **kwargs)
+    
     def _prepare_domains_items_refs(self):
-        spider_loader = SpiderLoader.from_settings(self.settings)
-        
-        if hasattr(self, 'spiders'):
-            spider_names = getattr(self, 'spiders').split(',')
-        else:
-            spider_names = [spider_name for spider_name in spider_loader.list() \
-                            if spider_name not in self.spiders_ignored]
-        
-        for spider_name in spider_names:
-            Spider = spider_loader.load(spider_name)
-            
-            for domain in Spider.allowed_domains:
-                for i, item_ref in enumerate(Spider.items_refs):
-                    item_ref['spider_name'] = spider_name
-                    Spider.items_refs[i] = item_ref
-                
-                self.domains_items_refs[domain] = Spider.items_refs
-            
-            self.allowed_domains += Spider.allowed_domains
+        spider_names = getattr(self, 'spiders').split(',') \
+                       if hasattr(self, 'spiders') else None
+        registry = SpiderRegistry.from_settings(self.settings, spider_names,
+                                                self.spiders_ignored)
         
+        # items refs are loaded by parse, when the domain has the first response
+        self.registry = registry
+        self.domains_download_slots.update(registry.download_slots)
+        self.allowed_domains += list(registry.domains)
         self.allowed_domains.sort(key=len,reverse=True)
     
     def start_requests(self):
         self._prepare_domains_items_refs()
+        if hasattr(self, 'seeds_file'):
+            self.load_seeds_file()
         
-        for url in self.start_urls:
-            yield Request(url, dont_filter=False)
+        for request in self.seed_requests(self.start_urls):
+            yield request
     
     def parse(self, response):
         try:
@@ -110,7 +231,11 @@ class AllSpiders(ZeSpider):
             self.logger.error(error)
         
         if domains_allowed:
-            for item_ref in self.domains_items_refs[domains_allowed[0]]:
+            domain = domains_allowed[0]
+            if domain not in self.domains_items_refs:
+                self.domains_items_refs[domain] = \
+                    self.registry.items_refs(self.registry.domains[domain])
+            for item_ref in self.domains_items_refs[domain]:
                 yield self.load_item(item_ref, response)
         else:
             self.crawler.stats.inc_value('spider/all/url_without_parse_count')
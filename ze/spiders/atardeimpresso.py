@@ -12,6 +12,8 @@ from ..items.creativework import NewsArticleItem
 class ATardeImpressoSpider(Spider):
 
     name = 'atardeimpresso'
+    # The editions are downloaded as PDF
+    early_abort = False
     start_urls = ['http://edicaodigital.atarde.uol.com.br/index.xhtml']
     search_url = """http://digital.mflip.com.br/flip/jornal/skins/king/jsp/pesquisa.jsp?idForm={idForm}&acervo=true&linkedicao=pub/editoraatarde/"""
     export_pdf_url = """http://digital.mflip.com.br/flip/jornal/skins/king/jsp/exportar.jsp?idForm={idForm}&idEdicao={idEdicao}&ajaxContent=true"""
@@ -18,6 +18,8 @@ from ..items.creativework import NewsArticleItem
 class CorreioBrazilienseImpresso(ZeSpider):
 
     name = 'correiobrazilienseimpresso'
+    # The search and pages come from JSON APIs
+    early_abort = False
     print_url='http://www.cbdigital.com.br/flip/1/1627/127882/original_prez-1400-*.jpg'
     login_url = 'http://www.cbdigital.com.br/apps,1,120/flip-auth'
 
@@ -11,6 +11,8 @@ from ..items.creativework import NewsArticleItem
 class CorreioPopularImpressoSpider(Spider):
     
     name = 'correiopopularimpreso'
+    # The editions are downloaded as PDF
+    early_abort = False
     start_urls = ['http://correiopopular.html5v3.fivepress.com.br/index.php?id=/login.php']
     
     def start_requests(self):
@@ -17,6 +17,8 @@ from ..items.creativework import NewsArticleItem
 class EstadaoImpressoSpider(ZeSpider):
 
     name = 'estadaoimpresso'
+    # The search and pages come from JSON APIs
+    early_abort = False
     search_url = 'http://services.pressreader.com/se2skyservices/search/GetArticles/'
     pre_image_url = 'http://services.pressreader.com/se2skyservices/print/GetImageByRegion/'
 
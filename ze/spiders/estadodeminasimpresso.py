@@ -16,6 +16,8 @@ from ..items.creativework import NewsArticleItem
 class EstadodeMinasImpressoSpider(ZeSpider):
 
     name = 'estadodeminasimpresso'
+    # The search and pages come from JSON APIs
+    early_abort = False
     search_url='http://digital.em.com.br/apps,1,4/flip-search'
     search_params = {
         'i': 'null',
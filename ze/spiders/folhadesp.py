@@ -6,6 +6,7 @@ class FolhaDeSaoPauloSpider(ZeSpider):
 
     name = 'folhadesp'
     allowed_domains = ['folha.uol.com.br']
+    download_slots = {'start_concurrency': 8, 'max_concurrency': 32}
     items_refs = [{
         "item": "ze.items.creativework.ArticleItem",
         "fields": { 
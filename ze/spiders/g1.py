@@ -8,6 +8,7 @@ class G1Spider(ZeSpider):
 
     name = 'g1'
     allowed_domains = ['g1.globo.com']
+    download_slots = {'start_concurrency': 8, 'max_concurrency': 32}
     items_refs = [{
         "item": "ze.items.creativework.ArticleItem",
         "fields": { 
@@ -6,6 +6,8 @@ class GovernoDestritoFederalSpider(ZeSpider):
 
     name = 'govdf'
     allowed_domains = ['df.gov.br']
+    # State portals are slow and fragile, keep few requests in parallel
+    download_slots = {'max_concurrency': 2, 'start_delay': 1.0}
     items_refs = [{
         "item": "ze.items.creativework.ArticleItem",
         "fields": {
@@ -17,6 +17,8 @@ from ..items.creativework import NewsArticleItem
 class JCOnlineImpressoSpider(ZeSpider):
     
     name = 'jconlineimpresso'
+    # The search and pages come from JSON APIs
+    early_abort = False
     search_url = 'http://jconlinedigital.ne10.uol.com.br/bibliotecas/php/Busca.class.php'
     search_params = {
         'action':'listarResultados',
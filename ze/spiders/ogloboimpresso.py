@@ -18,6 +18,8 @@ from ..items.creativework import NewsArticleItem
 class OGloboImpressoSpider(ZeSpider):
     
     name = 'ogloboimpresso'
+    # The search and pages come from JSON APIs
+    early_abort = False
     search_url = 'http://oglobodigital.oglobo.globo.com/epaper/services/AdvancedSearch_v2.ashx'
     pre_download_url= 'http://oglobodigital.oglobo.globo.com/epaper/services/OnlinePrintHandler.ashx'
     search_params = {
@@ -1,6 +1,8 @@
 import sys
+import time
 import importlib
 import difflib
+from urllib.parse import urlparse
 from pprint import pprint
 
 def import_class(class_full_path):
@@ -11,3 +13,31 @@ def import_class(class_full_path):
 def diff_str(str1='', str2=''):
     splitlines = lambda s: s.splitlines(keepends=True)
     return list(difflib.Differ().compare(splitlines(str1), splitlines(str2)))
+
+def url_domain(url):
+    hostname = urlparse(url).hostname or ''
+    return hostname[4:] if hostname.startswith('www.') else hostname
+
+# seconds of the first import of modules loaded by import_module_timed
+import_times = {}
+
+def import_module_timed(module_name):
+    """Import a heavy module only when a component needs it, timing it"""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    start = time.time()
+    module = importlib.import_module(module_name)
+    import_times[module_name] = time.time() - start
+    return module
+
+# instances of shared_from_settings by class and settings values
+shared_instances = {}
+
+def shared_from_settings(cls, settings, *names):
+    """``cls.from_settings`` shared by the crawls of the process with the same
+    values of settings ``names``, like the path of a state file, so crawls
+    running together update and save the same state"""
+    key = (cls,) + tuple(settings.get(name) for name in names)
+    if key not in shared_instances:
+        shared_instances[key] = cls.from_settings(settings)
+    return shared_instances[key]
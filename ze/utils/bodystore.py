@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import gzip
+import hashlib
+import tempfile
+from io import BytesIO
+
+from w3lib.html import remove_tags
+from twisted.internet import threads
+
+from scrapy.utils.project import data_path
+
+
+class FSBodyBackend(object):
+
+    def __init__(self, basedir):
+        self.basedir = data_path(basedir)
+
+    def _path(self, path):
+        return os.path.join(self.basedir, path)
+
+    def exists(self, path):
+        return os.path.exists(self._path(path))
+
+    def write(self, path, data):
+        path = self._path(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # written by name, bodies are never read half written, and a temp file
+        # by writer, processes of a sharded crawl can write the same body
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def read(self, path):
+        with open(self._path(path), 'rb') as f:
+            return f.read()
+
+
+class GSBodyBackend(object):
+
+    def __init__(self, uri):
+        from ze.pipelines.files import GSFilesStore
+        self.store = GSFilesStore(uri)
+
+    def exists(self, path):
+        return self.store.bucket.get_blob('%s%s' % (self.store.prefix, path)) is not None
+
+    def write(self, path, data):
+        blob = self.store.storage.Blob('%s%s' % (self.store.prefix, path), self.store.bucket)
+        blob.upload_from_string(data, content_type='application/gzip')
+
+    def read(self, path):
+        return self.store.bucket.get_blob('%s%s' % (self.store.prefix, path)).download_as_string()
+
+
+class BodyStore(object):
+    """Content addressed store of large fields, like ``articleBody``
+
+    Bodies are gzipped and keyed by their sha256, so identical bodies of
+    stories syndicated on many portals are stored once. Items carry
+    ``<field>Digest`` and a text ``<field>Excerpt`` instead of the field.
+    ``BODY_STORE_URI`` is a dir relative to the project data dir or a
+    ``gs://bucket/prefix/`` of Google Cloud Storage.
+    
+    Stores of sinks have ``inline_bodies`` when the sink is on
+    ``BODY_STORE_INLINE_SINKS``, the items keep the bodies for them.
+    """
+
+    backends = {
+        '': FSBodyBackend,
+        'file': FSBodyBackend,
+        'gs': GSBodyBackend,
+    }
+
+    def __init__(self, uri, fields=('articleBody',), excerpt_length=280, inline_bodies=False):
+        scheme = uri.split('://', 1)[0] if '://' in uri else ''
+        self.backend = self.backends[scheme](uri[7:] if scheme == 'file' else uri)
+        self.fields = fields
+        self.excerpt_length = excerpt_length
+        self.inline_bodies = inline_bodies
+
+    @classmethod
+    def from_settings(cls, settings, inline_bodies=False):
+        return cls(settings.get('BODY_STORE_URI'), 
+                   tuple(f.strip() for f in settings.getlist('BODY_STORE_FIELDS')),
+                   settings.getint('BODY_STORE_EXCERPT_LENGTH'),
+                   inline_bodies)
+
+    @staticmethod
+    def inline_sinks(settings):
+        return [s.strip() for s in settings.getlist('BODY_STORE_INLINE_SINKS')]
+
+    @classmethod
+    def for_sink(cls, settings, sink_name):
+        """Store of the items of ``sink_name``, if enabled"""
+        if settings.getbool('BODY_STORE_ENABLED'):
+            return cls.from_settings(settings, sink_name in cls.inline_sinks(settings))
+
+    @staticmethod
+    def digest(body):
+        return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def path(digest):
+        return '%s/%s/%s.html.gz' % (digest[:2], digest[2:4], digest)
+
+    def excerpt(self, body):
+        text = re.sub(r'\s+', ' ', remove_tags(body)).strip()
+        if len(text) <= self.excerpt_length:
+            return text
+        return text[:self.excerpt_length].rsplit(' ', 1)[0] + '…'
+
+    @staticmethod
+    def compress(body):
+        # mtime=0, same body same bytes
+        data = BytesIO()
+        with gzip.GzipFile(fileobj=data, mode='wb', mtime=0) as f:
+            f.write(body.encode('utf-8'))
+        return data.getvalue()
+
+    def _put(self, digest, body):
+        path = self.path(digest)
+        if self.backend.exists(path):
+            return False
+        self.backend.write(path, self.compress(body))
+        return True
+
+    def put(self, digest, body):
+        """Deferred of ``True`` when stored and ``False`` when already there"""
+        return threads.deferToThread(self._put, digest, body)
+
+    def get(self, digest):
+        return gzip.decompress(self.backend.read(self.path(digest))).decode('utf-8')
+
+    def sink_values(self, item):
+        """Values of ``item`` to a sink, the bodies on their fields with
+        ``inline_bodies``, otherwise their digests and excerpts"""
+        values = dict(item)
+        for field_name in self.fields:
+            if '%sDigest' % field_name not in values:
+                continue
+            if self.inline_bodies and field_name in values:
+                values.pop('%sDigest' % field_name)
+                values.pop('%sExcerpt' % field_name, None)
+            else:
+                values.pop(field_name, None)
+        return values
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import time
+import logging; logger = logging.getLogger(__name__)
+
+from twisted.internet import reactor
+from twisted.web.client import (Agent, BrowserLikeRedirectAgent, ContentDecoderAgent,
+                                GzipDecoder, readBody)
+from twisted.web.http_headers import Headers
+from scrapy.http import HtmlResponse
+from scrapy.utils.project import get_project_settings
+
+from .registry import SpiderRegistry
+
+
+def spider_registry(settings):
+    from ze.spiders import AllSpiders
+    return SpiderRegistry.from_settings(settings, ignored=AllSpiders.spiders_ignored)
+
+
+class Fetcher(object):
+    """Download pages on the reactor, any number at same time
+
+    Pages are answered as ``(url, body, headers)``, ``url`` after the
+    redirects and ``headers`` raw, so the encoding is found like Scrapy does.
+    """
+
+    def __init__(self, settings, reactor=reactor):
+        self.reactor = reactor
+        self.timeout = settings.getfloat('DOWNLOAD_TIMEOUT')
+        self.headers = Headers({b'User-Agent': [settings.get('USER_AGENT').encode('utf-8')]})
+        self.agent = ContentDecoderAgent(
+            BrowserLikeRedirectAgent(Agent(reactor, connectTimeout=self.timeout)),
+            [(b'gzip', GzipDecoder)])
+
+    def fetch(self, url):
+        d = self.agent.request(b'GET', url.encode('utf-8'), self.headers)
+        timeout = self.reactor.callLater(self.timeout, d.cancel)
+        d.addCallback(self._read)
+        d.addBoth(self._done, timeout)
+        return d
+
+    def _read(self, response):
+        d = readBody(response)
+        d.addCallback(self._page, response)
+        return d
+
+    def _page(self, body, response):
+        if response.code >= 400:
+            raise IOError('%d %s' % (response.code, response.phrase.decode('latin-1')))
+        return (response.request.absoluteURI.decode('utf-8'), body,
+                dict(response.headers.getAllRawHeaders()))
+
+    def _done(self, result, timeout):
+        if timeout.active():
+            timeout.cancel()
+        return result
+
+
+class Extractor(object):
+    """Extract the items of a page with the spider of its domain"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.registry = spider_registry(settings)
+        self.spiders = {}
+        for spider_name in self.registry.spider_names:
+            self.spiders[spider_name] = self.registry.spider(spider_name)()
+            self.spiders[spider_name].settings = settings
+
+    @classmethod
+    def from_project(cls):
+        settings = get_project_settings()
+        # items are answered right away, without the pipelines
+        settings.set('DEFERRED_PROCESSORS_ENABLED', False)
+        return cls(settings)
+
+    def extract(self, url, body, headers=None):
+        spider_name = self.registry.spider_name(url)
+        if spider_name is None:
+            raise LookupError('None spider has the domain of %s' % url)
+        
+        start = time.time()
+        # encoding of the headers, the meta tags or the body, like on crawls
+        response = HtmlResponse(url, body=body, headers=headers)
+        spider = self.spiders[spider_name]
+        items = [dict(spider.load_item(item_ref, response))
+                 for item_ref in self.registry.items_refs(spider_name)]
+        
+        return {
+            'url': url,
+            'spider': spider_name,
+            'items': items,
+            'timing': {'parse': time.time() - start},
+        }
+
+
+_extractor = None
+
+
+def warm_extractor():
+    global _extractor
+    if _extractor is None:
+        _extractor = Extractor.from_project()
+    return len(_extractor.spiders)
+
+
+def extract(url, body, headers=None):
+    """Run on the workers of ``scrapy serve``, pages are fetched before"""
+    warm_extractor()
+    return _extractor.extract(url, body, headers)
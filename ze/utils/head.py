@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import re
+from html.parser import HTMLParser
+
+
+class HeadEnd(Exception):
+    pass
+
+
+class HeadParser(HTMLParser):
+    """Incremental parser of the ``<head>`` that stops where the body starts
+
+    Tags inside a ``<noscript>`` of the head, like the ``<img>`` of tracking
+    pixels, don't start the body.
+    """
+
+    head_tags = ('html', 'head', 'meta', 'link', 'title', 'script', 'style',
+                 'base', 'noscript', 'template')
+
+    def __init__(self):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.elements = {}
+        self.title = []
+        self._data = None
+        self._noscript = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'noscript':
+            self._noscript += 1
+        elif tag not in self.head_tags and not self._noscript:
+            raise HeadEnd()
+
+        attrs = dict((name, value if value is not None else '') for name, value in attrs)
+        if tag in ('meta', 'link'):
+            for name, value in attrs.items():
+                self.elements.setdefault((tag, name, value), []).append(attrs)
+        elif tag == 'title':
+            self._data = []
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            raise HeadEnd()
+
+        if tag == 'noscript' and self._noscript:
+            self._noscript -= 1
+        elif tag == 'title' and self._data is not None:
+            self.title.append(''.join(self._data))
+            self._data = None
+
+    def handle_data(self, data):
+        if self._data is not None:
+            self._data.append(data)
+
+
+class HeadMetadata(object):
+    """Meta, link and title entries of the ``<head>`` of a page
+
+    Answer selectors like ``meta[property='og:title']::attr(content)`` and
+    ``title::text`` with a dict lookup, ``None`` means the selector must run
+    on the whole document.
+    """
+
+    attr_selector_re = re.compile(
+        r'^\s*(meta|link)\[\s*([\w:.-]+)\s*=\s*([\'"]?)([^\'"\]]*)\3\s*\]'
+        r'\s*::attr\(\s*([\w:.-]+)\s*\)\s*$')
+    title_selector_re = re.compile(r'^\s*title\s*::text\s*$')
+
+    def __init__(self, elements, title):
+        self.elements = elements
+        self.title = title
+
+    @classmethod
+    def from_text(cls, text, chunk_size=4096):
+        parser = HeadParser()
+        try:
+            for i in range(0, len(text), chunk_size):
+                parser.feed(text[i:i + chunk_size])
+        except HeadEnd:
+            pass
+
+        return cls(parser.elements, parser.title)
+
+    @classmethod
+    def from_response(cls, response):
+        if not hasattr(response, 'text'):
+            return None
+        return cls.from_text(response.text)
+
+    def lookup(self, css):
+        match = self.attr_selector_re.match(css)
+        if match:
+            tag, name, _, value, attr = match.groups()
+            values = [a[attr] for a in self.elements.get((tag, name, value), ())
+                      if attr in a]
+            return values or None
+
+        if self.title and self.title_selector_re.match(css):
+            return list(self.title)
+
+        return None
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import json
+from html import escape
+import logging; logger = logging.getLogger(__name__)
+
+from .priority import parse_pubdate
+
+
+ARTICLE_TYPES = ('Article', 'NewsArticle', 'AnalysisNewsArticle',
+                 'OpinionNewsArticle', 'ReportageNewsArticle',
+                 'ReviewNewsArticle', 'BackgroundNewsArticle', 'BlogPosting',
+                 'LiveBlogPosting', 'Report', 'ScholarlyArticle')
+
+
+def json_ld_objects(blocks):
+    """Yield the objects of ``application/ld+json`` blocks, @graph included"""
+    def walk(data):
+        if isinstance(data, list):
+            for d in data:
+                yield from walk(d)
+        elif isinstance(data, dict):
+            yield data
+            if '@graph' in data:
+                yield from walk(data['@graph'])
+
+    for block in blocks:
+        try:
+            data = json.loads(block, strict=False)
+        except ValueError as e:
+            logger.debug('Invalid JSON-LD block ignored: %s', e)
+            continue
+        yield from walk(data)
+
+
+def find_article(blocks):
+    for data in json_ld_objects(blocks):
+        types = data.get('@type')
+        types = [types] if isinstance(types, str) else types if isinstance(types, list) else ()
+        if any(t in ARTICLE_TYPES for t in types):
+            return data
+
+
+def _names(value):
+    for v in value if isinstance(value, list) else [value]:
+        if isinstance(v, dict):
+            v = v.get('name')
+        if isinstance(v, str) and v.strip():
+            yield v.strip()
+
+
+def _urls(value):
+    for v in value if isinstance(value, list) else [value]:
+        if isinstance(v, dict):
+            v = v.get('url') or v.get('@id')
+        if isinstance(v, str) and v.strip():
+            yield v.strip()
+
+
+def article_values(article):
+    """Map a schema.org article object to item fields
+
+    Return ``(values, parsed_values)``, the first must run the field input
+    processors and the second are already parsed, like dates.
+    """
+    values = {}; parsed_values = {}
+
+    for name in (article.get('headline'), article.get('name')):
+        if isinstance(name, str) and name.strip():
+            values['name'] = name
+            break
+
+    description = article.get('description')
+    if isinstance(description, str) and description.strip():
+        values['description'] = description
+
+    images = list(_urls(article.get('image')))
+    if images:
+        values['image'] = images
+
+    authors = list(_names(article.get('author')))
+    if authors:
+        values['author'] = authors
+
+    keywords = article.get('keywords')
+    if isinstance(keywords, list):
+        keywords = ','.join(k for k in keywords if isinstance(k, str))
+    if isinstance(keywords, str) and keywords.strip():
+        values['keywords'] = keywords
+
+    body = article.get('articleBody')
+    if isinstance(body, str) and body.strip():
+        values['articleBody'] = ''.join('<p>%s</p>' % escape(p.strip())
+                                        for p in body.splitlines() if p.strip())
+
+    for field in ('datePublished', 'dateModified'):
+        date = parse_pubdate(article.get(field)) \
+               if isinstance(article.get(field), str) else None
+        if date:
+            parsed_values[field] = date
+
+    return values, parsed_values
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import json
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from collections import OrderedDict
+import logging; logger = logging.getLogger(__name__)
+
+from scrapy.utils.project import data_path
+
+from . import url_domain, shared_from_settings
+
+
+def parse_pubdate(value):
+    """Parse RFC 822 (RSS ``pubDate``) or ISO 8601 dates to an aware datetime"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+    value = value.strip()
+    try:
+        date = parsedate_to_datetime(value)
+        # "-0000" zone gives a naive datetime
+        return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError, IndexError):
+        pass
+
+    # 2017-06-01T10:20:30.000-03:00 -> 2017-06-01T10:20:30-0300
+    value = re.sub(r'\.\d+', '', value.replace('Z', '+0000'))
+    value = re.sub(r'([+-]\d{2}):(\d{2})$', r'\1\2', value)
+    for date_format in ('%Y-%m-%dT%H:%M:%S%z', '%Y-%m-%dT%H:%M%z',
+                        '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            date = datetime.strptime(value, date_format)
+            return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+
+    return None
+
+
+class PublishingRates(object):
+    """Articles per hour published by each domain, learned from past runs"""
+
+    def __init__(self, path, alpha=0.3):
+        self.path = path
+        self.alpha = alpha
+        self.rates = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(data_path(settings.get('SEED_PRIORITY_RATES_FILE')),
+                   settings.getfloat('SEED_PRIORITY_RATES_ALPHA', 0.3))
+
+    def load(self):
+        if self.rates is None:
+            self.rates = {}
+            if os.path.isfile(self.path):
+                try:
+                    with open(self.path) as f:
+                        self.rates = json.load(f)
+                except ValueError as e:
+                    logger.warning('Ignoring invalid publishing rates file %s: %s',
+                                   self.path, e)
+        return self.rates
+
+    def get(self, domain, default=0.0):
+        return self.load().get(domain, default)
+
+    def update(self, domain, rate):
+        rates = self.load()
+        if domain in rates:
+            rates[domain] = self.alpha * rate + (1 - self.alpha) * rates[domain]
+        else:
+            rates[domain] = rate
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump(self.load(), f, indent=2, sort_keys=True)
+
+
+class SeedPriority(object):
+    """Compute requests priority from seeds metadata
+
+    The priority is the sum of the search rank, the freshness of the
+    publication date and the domain publishing rate scores, up to 180 with
+    the default weights. Seeds of the same domain lose ``rotation_penalty``
+    by their position, so the scheduler rotates between domains instead of
+    draining the largest one first.
+    """
+
+    def __init__(self, rates, rank_weight=50, freshness_weight=100,
+                 freshness_half_life=6, rate_weight=30, rotation_penalty=20):
+        self.rates = rates
+        self.rank_weight = rank_weight
+        self.freshness_weight = freshness_weight
+        self.freshness_half_life = freshness_half_life
+        self.rate_weight = rate_weight
+        self.rotation_penalty = rotation_penalty
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(shared_from_settings(PublishingRates, settings, 'SEED_PRIORITY_RATES_FILE'),
+                   settings.getint('SEED_PRIORITY_RANK_WEIGHT', 50),
+                   settings.getint('SEED_PRIORITY_FRESHNESS_WEIGHT', 100),
+                   settings.getfloat('SEED_PRIORITY_FRESHNESS_HALF_LIFE', 6),
+                   settings.getint('SEED_PRIORITY_RATE_WEIGHT', 30),
+                   settings.getint('SEED_PRIORITY_ROTATION_PENALTY', 20))
+
+    def score(self, url, meta, now=None):
+        score = 0.0
+
+        rank = meta.get('rank')
+        if rank is not None:
+            score += self.rank_weight / (1.0 + rank)
+
+        pub_date = parse_pubdate(meta.get('pubDate'))
+        if pub_date:
+            now = now or datetime.now(timezone.utc)
+            age_hours = max((now - pub_date).total_seconds() / 3600.0, 0)
+            score += self.freshness_weight * 0.5 ** (age_hours / self.freshness_half_life)
+
+        rate = self.rates.get(url_domain(url))
+        score += self.rate_weight * rate / (rate + 1.0)
+
+        return score
+
+    def prioritize(self, urls, seeds_meta=None):
+        """Return ``(url, priority)`` tuples interleaved by domain"""
+        seeds_meta = seeds_meta or {}
+        now = datetime.now(timezone.utc)
+
+        domains = OrderedDict()
+        scored = sorted(((self.score(u, seeds_meta.get(u, {}), now), u) for u in urls),
+                        key=lambda s: s[0], reverse=True)
+        for score, url in scored:
+            domains.setdefault(url_domain(url), []).append((url, score))
+
+        seeds = []
+        for position in range(max(map(len, domains.values()), default=0)):
+            for domain_seeds in domains.values():
+                if position < len(domain_seeds):
+                    url, score = domain_seeds[position]
+                    priority = int(round(score)) - position * self.rotation_penalty
+                    seeds.append((url, priority))
+
+        return seeds
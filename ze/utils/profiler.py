@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import os
+import signal
+
+from scrapy import Spider
+
+
+class StackSampler(object):
+    """Statistical profiler sampling the stack of the main thread on SIGPROF
+
+    The timer counts the CPU time of the process, time waiting on I/O isn't
+    sampled, and the handler runs on the main thread, where the reactor runs,
+    so each sample costs a walk of the stack. Stacks are aggregated collapsed,
+    ``frame;frame;... count``, by the spider found on the frames, or
+    ``default_key`` without one.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.default_key = None
+        self.running = False
+
+    def start(self):
+        if self.running:
+            return
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        self.running = True
+
+    def stop(self):
+        if not self.running:
+            return
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+        self.running = False
+
+    def _frame_spider(self, frame):
+        code = frame.f_code
+        if 'spider' in code.co_varnames:
+            spider = frame.f_locals.get('spider')
+        elif code.co_argcount and code.co_varnames[0] == 'self':
+            spider = frame.f_locals.get('self')
+        else:
+            return None
+        return spider.name if isinstance(spider, Spider) else None
+
+    def _sample(self, signum, frame):
+        names = []; key = None
+        while frame is not None:
+            code = frame.f_code
+            names.append('%s:%s:%d' % (os.path.basename(code.co_filename), code.co_name,
+                                       code.co_firstlineno))
+            if key is None:
+                key = self._frame_spider(frame)
+            frame = frame.f_back
+        
+        stacks = self.stacks.setdefault(key or self.default_key, {})
+        stack = ';'.join(reversed(names))
+        stacks[stack] = stacks.get(stack, 0) + 1
+        self.samples += 1
+
+    def collapsed(self, key):
+        """Lines of the collapsed stacks of ``key``, input of flamegraph.pl"""
+        return ['%s %d' % (stack, count) for stack, count in
+                sorted(self.stacks.get(key, {}).items())]
+
+    def pop(self, key):
+        return self.stacks.pop(key, {})
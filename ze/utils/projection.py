@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+
+def _fields(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    return set(f.strip() for f in value if f.strip())
+
+
+def drop_validation_enabled(settings, validation):
+    """If ``DropItemsPipeline`` runs ``validation`` of
+    ``DROP_ITEM_PIPELINE_VALIDATIONS``, so its fields must be extracted"""
+    return settings.getbool('DROP_ITEM_PIPELINE_ENABLED') \
+           and validation in [v.strip() for v in
+                              settings.getlist('DROP_ITEM_PIPELINE_VALIDATIONS')]
+
+
+def fields_projection(settings, fields=None):
+    """Return the fields that the job emits or ``None`` when it needs all
+
+    ``fields`` (spider argument) or ``FIELDS_PROJECTION`` set the fields of
+    the job, otherwise it's the union of the fields that the enabled sinks of
+    ``FIELDS_PROJECTION_SINKS`` and the feed export (``FEED_EXPORT_FIELDS``)
+    need, where a sink without fields needs all of them.
+    """
+    projection = _fields(fields or settings.get('FIELDS_PROJECTION'))
+    if projection:
+        return projection
+
+    projection = set()
+    sinks = dict(settings.getdict('FIELDS_PROJECTION_SINKS'))
+    if settings.get('FEED_URI'):
+        sinks['FEED_URI'] = settings.get('FEED_EXPORT_FIELDS')
+    for enabled_setting, sink_fields in sinks.items():
+        if enabled_setting != 'FEED_URI' and not settings.getbool(enabled_setting):
+            continue
+        sink_fields = _fields(sink_fields)
+        if not sink_fields:
+            return None
+        projection |= sink_fields
+
+    return projection or None
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import random
+import bisect
+import threading
+from socketserver import ThreadingMixIn
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import logging; logger = logging.getLogger(__name__)
+
+from scrapy.utils.project import data_path
+
+from .file import load_lines
+
+
+class ProxyScore(object):
+
+    __slots__ = ('latency', 'success', 'failures', 'quarantined_until')
+
+    def __init__(self, latency=None, success=0.5, failures=0, quarantined_until=0):
+        self.latency = latency
+        self.success = success
+        self.failures = failures
+        self.quarantined_until = quarantined_until
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class ProxyPool(object):
+    """Pool of proxies with EWMA latency and success scores
+
+    The proxies list is read only when the first proxy is requested. Proxies
+    are picked by weighted sampling on ``success / latency``, and the ones
+    that fail are quarantined with exponential backoff.
+    """
+
+    def __init__(self, list_path, scores_path=None, alpha=0.3,
+                 default_latency=5.0, quarantine_base=60, quarantine_max=3600,
+                 proxies=None):
+        self.list_path = list_path
+        self.proxies = proxies
+        self.scores_path = scores_path
+        self.alpha = alpha
+        self.default_latency = default_latency
+        self.quarantine_base = quarantine_base
+        self.quarantine_max = quarantine_max
+        self._scores = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        scores_file = settings.get('PROXY_POOL_SCORES_FILE')
+        return cls(settings.get('PROXY_POOL_LIST'),
+                   data_path(scores_file) if scores_file else None,
+                   settings.getfloat('PROXY_POOL_EWMA_ALPHA', 0.3),
+                   settings.getfloat('PROXY_POOL_CHECK_TIMEOUT', 5),
+                   settings.getfloat('PROXY_POOL_QUARANTINE_BASE', 60),
+                   settings.getfloat('PROXY_POOL_QUARANTINE_MAX', 3600))
+
+    @property
+    def scores(self):
+        if self._scores is None:
+            saved = {}
+            if self.scores_path and os.path.isfile(self.scores_path):
+                try:
+                    with open(self.scores_path) as f:
+                        saved = json.load(f)
+                except ValueError as e:
+                    logger.warning('Ignoring invalid proxies scores file %s: %s',
+                                   self.scores_path, e)
+
+            self._scores = {}
+            proxies = self.proxies if self.proxies is not None \
+                      else load_lines(self.list_path)
+            for proxy in proxies:
+                self._scores[proxy] = ProxyScore(**saved.get(proxy, {}))
+            logger.info('Proxy pool loaded with %d proxies', len(self._scores))
+
+        return self._scores
+
+    @property
+    def loaded(self):
+        return self._scores is not None
+
+    def __len__(self):
+        return len(self.scores)
+
+    def available(self, now=None):
+        now = now or time.time()
+        return [p for p, s in self.scores.items() if s.quarantined_until <= now]
+
+    def weight(self, proxy):
+        score = self.scores[proxy]
+        latency = score.latency if score.latency is not None else self.default_latency
+        return score.success / max(latency, 0.05)
+
+    def choose(self):
+        proxies = self.available()
+        if not proxies:
+            return None
+
+        cumulative_weights = []; total = 0.0
+        for proxy in proxies:
+            total += self.weight(proxy)
+            cumulative_weights.append(total)
+
+        if not total:
+            return random.choice(proxies)
+
+        index = bisect.bisect(cumulative_weights, random.random() * total)
+        return proxies[min(index, len(proxies) - 1)]
+
+    def mark_success(self, proxy, latency):
+        with self._lock:
+            score = self.scores.setdefault(proxy, ProxyScore())
+            score.latency = latency if score.latency is None \
+                            else self.alpha * latency + (1 - self.alpha) * score.latency
+            score.success = self.alpha + (1 - self.alpha) * score.success
+            score.failures = 0
+            score.quarantined_until = 0
+
+    def mark_failure(self, proxy):
+        with self._lock:
+            score = self.scores.setdefault(proxy, ProxyScore())
+            score.success = (1 - self.alpha) * score.success
+            score.failures += 1
+            backoff = min(self.quarantine_base * 2 ** (score.failures - 1),
+                          self.quarantine_max)
+            score.quarantined_until = time.time() + backoff
+
+    def save(self):
+        if not self.scores_path or not self.loaded:
+            return
+
+        with open(self.scores_path, 'w') as f:
+            json.dump({p: s.to_dict() for p, s in self._scores.items()}, f)
+
+
+class StandInProxyHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        body = b'ok'
+        self.send_response(self.server.status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInProxyServer(ThreadingMixIn, HTTPServer):
+    """Local HTTP server answering any request, used as a proxy stand-in
+
+    Check the proxies tooling without network access, e.g.::
+
+        server = StandInProxyServer(status=503).start()
+        proxy = server.url  # http://127.0.0.1:<port>
+    """
+
+    daemon_threads = True
+
+    def __init__(self, status=200, delay=0, host='127.0.0.1', port=0):
+        HTTPServer.__init__(self, (host, port), StandInProxyHandler)
+        self.status = status
+        self.delay = delay
+
+    @property
+    def url(self):
+        return 'http://%s:%d' % self.server_address
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import pkgutil
+import hashlib
+from importlib import import_module
+import logging; logger = logging.getLogger(__name__)
+
+from scrapy.spiderloader import SpiderLoader
+from scrapy.utils.spider import iter_spider_classes
+from scrapy.utils.url import url_is_from_any_domain
+
+from . import url_domain
+
+
+def plan_hash(Spider):
+    items_refs = [dict((k, v) for k, v in item_ref.items() if k != 'spider_name')
+                  for item_ref in getattr(Spider, 'items_refs', ())]
+    plan = json.dumps(items_refs, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(plan).hexdigest()
+
+
+def build_manifest(spider_loader):
+    """Name, module, domains and plan hash of each spider of the project"""
+    manifest = {}
+    for spider_name in sorted(spider_loader.list()):
+        Spider = spider_loader.load(spider_name)
+        manifest[spider_name] = {
+            'module': Spider.__module__,
+            'class': Spider.__name__,
+            'allowed_domains': list(getattr(Spider, 'allowed_domains', ())),
+            'download_slots': getattr(Spider, 'download_slots', None),
+            'plan_hash': plan_hash(Spider),
+        }
+    return manifest
+
+
+def load_manifest(path):
+    if not path or not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class ManifestSpiderLoader(SpiderLoader):
+    """Spider loader that imports the module of a spider only when loaded
+
+    Names and domains come from ``SPIDER_MANIFEST_FILE``, generated by
+    ``scrapy generate manifest``. Without it, spiders are loaded like Scrapy
+    does, all of them at start.
+
+    Spiders of modules added after the manifest was generated are listed
+    too, only these modules are imported. A name that isn't found is looked
+    up on all the modules.
+    """
+
+    def __init__(self, settings):
+        self.manifest = load_manifest(settings.get('SPIDER_MANIFEST_FILE')) \
+                        if settings.getbool('SPIDER_MANIFEST_ENABLED') else None
+        if self.manifest is None:
+            return super(ManifestSpiderLoader, self).__init__(settings)
+        
+        self.spider_modules = settings.getlist('SPIDER_MODULES')
+        self.warn_only = settings.getbool('SPIDER_LOADER_WARN_ONLY')
+        self._spiders = {}
+        self._unlisted = None
+
+    def module_names(self):
+        """Names of the modules of ``SPIDER_MODULES``, only packages are imported"""
+        for name in self.spider_modules:
+            package = import_module(name)
+            yield name
+            for _, module_name, _ in pkgutil.walk_packages(getattr(package, '__path__', []),
+                                                           name + '.'):
+                yield module_name
+
+    def scan(self, module_names):
+        spiders = {}
+        for module_name in module_names:
+            for Spider in iter_spider_classes(import_module(module_name)):
+                spiders[Spider.name] = Spider
+        self._spiders.update(spiders)
+        return spiders
+
+    def unlisted_spiders(self):
+        """Spiders of the modules that aren't on the manifest"""
+        if self._unlisted is None:
+            modules = set(entry['module'] for entry in self.manifest.values())
+            self._unlisted = self.scan(n for n in self.module_names() if n not in modules)
+            if self._unlisted:
+                logger.warning('Spiders %s are not on the manifest, run "scrapy generate '
+                               'manifest"', ', '.join(sorted(self._unlisted)))
+        return self._unlisted
+
+    def load(self, spider_name):
+        if self.manifest is None or spider_name in self._spiders:
+            return super(ManifestSpiderLoader, self).load(spider_name)
+        if spider_name not in self.manifest:
+            if spider_name not in self.unlisted_spiders():
+                # renamed or added on a module of the manifest
+                self.scan(self.module_names())
+            return super(ManifestSpiderLoader, self).load(spider_name)
+        
+        entry = self.manifest[spider_name]
+        Spider = getattr(import_module(entry['module']), entry['class'])
+        if plan_hash(Spider) != entry['plan_hash']:
+            logger.warning('Spider %s changed since the manifest was generated, '
+                           'run "scrapy generate manifest"', spider_name)
+        self._spiders[spider_name] = Spider
+        return Spider
+
+    def find_by_request(self, request):
+        if self.manifest is None:
+            return super(ManifestSpiderLoader, self).find_by_request(request)
+        return [name for name, entry in self.manifest.items()
+                if url_is_from_any_domain(request.url, entry['allowed_domains'])] + \
+               [name for name, Spider in self.unlisted_spiders().items()
+                if Spider.handles_request(request)]
+
+    def list(self):
+        if self.manifest is None:
+            return super(ManifestSpiderLoader, self).list()
+        return list(self.manifest) + list(self.unlisted_spiders())
+
+
+class SpiderRegistry(object):
+    """Spiders of the project indexed by their allowed domains
+
+    With the manifest of ``ManifestSpiderLoader`` the spiders are only
+    imported when their items refs are first used.
+    """
+
+    def __init__(self, spider_loader, spider_names=None, ignored=()):
+        self.spider_loader = spider_loader
+        self.domains = {}
+        self.download_slots = {}
+        
+        manifest = getattr(spider_loader, 'manifest', None)
+        if spider_names is None:
+            spider_names = [n for n in spider_loader.list() if n not in ignored]
+        self.spider_names = spider_names
+        for spider_name in spider_names:
+            if manifest and spider_name in manifest:
+                domains = manifest[spider_name]['allowed_domains']
+                download_slots = manifest[spider_name].get('download_slots')
+            else:
+                Spider = spider_loader.load(spider_name)
+                domains = getattr(Spider, 'allowed_domains', ())
+                download_slots = getattr(Spider, 'download_slots', None)
+            
+            for domain in domains:
+                self.domains[domain] = spider_name
+                if download_slots:
+                    self.download_slots[domain] = download_slots
+
+    @classmethod
+    def from_settings(cls, settings, spider_names=None, ignored=()):
+        loader_cls = ManifestSpiderLoader if settings.getbool('SPIDER_MANIFEST_ENABLED') \
+                     else SpiderLoader
+        return cls(loader_cls.from_settings(settings), spider_names, ignored)
+
+    def spider(self, spider_name):
+        return self.spider_loader.load(spider_name)
+
+    def spider_name(self, url):
+        """Name of the spider of the longest allowed domain of url"""
+        hostname = url_domain(url)
+        while hostname:
+            if hostname in self.domains:
+                return self.domains[hostname]
+            hostname = hostname.partition('.')[2]
+
+    def items_refs(self, spider_name):
+        Spider = self.spider(spider_name)
+        for item_ref in Spider.items_refs:
+            item_ref['spider_name'] = spider_name
+        return Spider.items_refs
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import re
+from xml.sax.saxutils import escape, quoteattr
+
+from scrapy.selector import Selector
+
+
+# values of the sample pages by field, the others get a short text
+SAMPLE_VALUES = {
+    'name': 'Enem 2017: inscrições terminam nesta sexta-feira; veja como se inscrever',
+    'headline': 'Enem 2017: inscrições terminam nesta sexta-feira',
+    'alternativeHeadline': 'Estudantes têm até as 23h59 para garantir a vaga',
+    'description': 'Estudantes têm até as 23h59 desta sexta-feira para se inscrever no '
+                   'Exame Nacional do Ensino Médio, que terá provas em dois domingos.',
+    'author': 'Redação, com informações do Inep',
+    'datePublished': '2017-08-01T10:30:00-03:00',
+    'dateModified': '2017-08-01T14:05:00-03:00',
+    'dateCreated': '2017-08-01T10:30:00-03:00',
+    'keywords': 'enem, educação, vestibular, ensino médio',
+    'articleSection': 'Educação',
+}
+
+PARAGRAPH = ('<p>O Ministério da Educação informou que {n} mil candidatos já concluíram a '
+             'inscrição no <a href="/enem">Enem</a>. A taxa é de R$ 82 e pode ser paga até '
+             'a próxima quarta-feira em agências bancárias, casas lotéricas e pelos '
+             'Correios. Quem tem isenção não paga a taxa, mas precisa confirmar a '
+             'inscrição na página do participante.</p>')
+
+ARTICLE_BODY = '\n'.join(
+    [PARAGRAPH.format(n=n) for n in range(1, 9)] +
+    ['<figure><img src="/fotos/enem.jpg" alt="Estudantes"><figcaption>Estudantes fazem a '
+     'prova do Enem (Foto: Divulgação)</figcaption></figure>'] +
+    [PARAGRAPH.format(n=n) for n in range(9, 17)] +
+    ['<blockquote>"O prazo não será prorrogado", disse o ministro.</blockquote>'] +
+    [PARAGRAPH.format(n=n) for n in range(17, 25)])
+
+VOID_TAGS = set(['meta', 'link', 'img', 'br', 'hr', 'input', 'source'])
+HEAD_TAGS = set(['meta', 'link', 'title'])
+
+compound_re = re.compile(r'([a-zA-Z][\w-]*)?((?:[.#][\w-]+|\[[^\]]+\])*)$')
+part_re = re.compile(r'([.#])([\w-]+)|\[\s*([\w:-]+)\s*(?:[~|^$*]?=\s*(\'[^\']*\'|"[^"]*"|[^\]]*?))?\s*\]')
+pseudo_re = re.compile(r'::(text|attr\(\s*["\']?([\w:-]+)["\']?\s*\))\s*$')
+
+
+def selector_element(selector, value):
+    """HTML of the elements matched by ``selector``, with ``value`` on their
+    text, the attribute of ``::attr()`` or as inner HTML, and if they go on
+    the ``<head>``. None when the selector isn't only of tags, ids, classes
+    and attributes on descendants."""
+    pseudo = pseudo_re.search(selector)
+    path = selector[:pseudo.start()] if pseudo else selector
+    compounds = path.split()
+    if not compounds:
+        return None
+
+    elements = []
+    for compound in compounds:
+        match = compound_re.match(compound)
+        if not match:
+            return None
+        tag, attrs, classes = match.group(1) or 'div', [], []
+        for kind, name, attr, attr_value in part_re.findall(match.group(2)):
+            if kind == '#':
+                attrs.append(('id', name))
+            elif kind == '.':
+                classes.append(name)
+            else:
+                attrs.append((attr, attr_value.strip('\'"') if attr_value else attr))
+        if classes:
+            attrs.append(('class', ' '.join(classes)))
+        elements.append((tag.lower(), attrs))
+
+    inner = ''
+    if pseudo and pseudo.group(2):
+        elements[-1][1].append((pseudo.group(2), value))
+    elif pseudo:
+        inner = escape(value)
+    else:
+        inner = value
+
+    html = ''
+    for tag, attrs in reversed(elements):
+        if tag in VOID_TAGS and (html or inner):
+            return None
+        start = '<%s%s>' % (tag, ''.join(' %s=%s' % (a, quoteattr(v)) for a, v in attrs))
+        html = start if tag in VOID_TAGS else '%s%s</%s>' % (start, html or inner, tag)
+        inner = ''
+    return html, elements[0][0] in HEAD_TAGS
+
+
+def sample_value(field_name, url):
+    if field_name == 'articleBody':
+        return ARTICLE_BODY
+    if field_name in ('image', 'thumbnailUrl', 'contentUrl', 'embedUrl'):
+        return url.rsplit('/', 1)[0] + '/%s.jpg' % field_name
+    return SAMPLE_VALUES.get(field_name, 'Texto de %s' % field_name)
+
+
+def sample_page(items_refs, url):
+    """HTML page with a value on the first selector of each field of the
+    spider that can be built and matched"""
+    head, body = ['<meta charset="utf-8">'], []
+
+    def add_fields(fields):
+        for field_name, properties in sorted(fields.items()):
+            if 'item' in properties:
+                add_fields(properties['fields'])
+                continue
+            value = sample_value(field_name, url)
+            for selector in properties.get('selectors', {}).get('css', ()):
+                element = selector_element(selector.strip(), value)
+                if element is None:
+                    continue
+                html, on_head = element
+                if Selector(text=html).css(selector.strip()).extract():
+                    (head if on_head else body).append(html)
+                    break
+
+    for item_ref in items_refs:
+        add_fields(item_ref['fields'])
+    return ('<!DOCTYPE html>\n<html lang="pt-br">\n<head>\n%s\n</head>\n<body>\n%s\n</body>\n'
+            '</html>\n' % ('\n'.join(head), '\n'.join(body)))
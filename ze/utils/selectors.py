@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+from lxml import etree
+from cssselect import parse, SelectorSyntaxError
+from cssselect.parser import CombinedSelector, Element, Hash, Class
+from parsel.csstranslator import HTMLTranslator
+
+
+_translator = HTMLTranslator()
+# css -> (key of candidates, compiled xpath), shared by all responses
+_compiled_selectors = {}
+
+
+def _candidates_key(css):
+    """Return ``(tag, id, classes)`` of a selector with a single compound
+
+    Selectors with combinators or groups return ``None``, they must walk the
+    whole document.
+    """
+    try:
+        selectors = parse(css)
+    except SelectorSyntaxError:
+        return None
+    if len(selectors) != 1:
+        return None
+
+    tag = id_ = None; classes = []
+    tree = selectors[0].parsed_tree
+    while tree is not None:
+        if isinstance(tree, CombinedSelector):
+            return None
+        if isinstance(tree, Element):
+            tag = tree.element
+            break
+        if isinstance(tree, Hash):
+            id_ = tree.id
+        elif isinstance(tree, Class):
+            classes.append(tree.class_name)
+        tree = getattr(tree, 'selector', None)
+
+    if tag in (None, '*') and not id_ and not classes:
+        return None
+    return tag, id_, tuple(classes)
+
+
+def compile_selector(css):
+    if css not in _compiled_selectors:
+        key = _candidates_key(css)
+        if key is None:
+            xpath = _translator.css_to_xpath(css)
+        else:
+            # evaluated on each candidate element instead of the document
+            xpath = _translator.css_to_xpath(css, prefix='self::')
+        _compiled_selectors[css] = (key, etree.XPath(xpath))
+    return _compiled_selectors[css]
+
+
+def _extract(value):
+    # the same of parsel Selector.extract for html documents
+    if isinstance(value, etree._Element):
+        return etree.tostring(value, method='html', encoding='unicode', with_tail=False)
+    if value is True:
+        return '1'
+    if value is False:
+        return '0'
+    return str(value)
+
+
+class SelectorMatcher(object):
+    """Match CSS selectors of a document with a single traversal
+
+    The elements are indexed by tag, id and class, once, when the first
+    selector without combinators is requested. Each selector runs only when
+    it's requested, on its candidate elements, so the first selector that
+    match a field spares its fallbacks. Selectors with combinators run their
+    cached XPath on the whole document.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.matches = {}
+        self.elements = None
+
+    @classmethod
+    def from_response(cls, response):
+        return cls(response.selector.root)
+
+    def _index(self):
+        self.elements = {'tag': {}, 'id': {}, 'class': {}}
+        by_tag, by_id, by_class = (self.elements['tag'], self.elements['id'],
+                                   self.elements['class'])
+        for element in self.root.iter():
+            if not isinstance(element.tag, str):
+                continue
+            by_tag.setdefault(element.tag, []).append(element)
+            id_ = element.get('id')
+            if id_:
+                by_id.setdefault(id_, []).append(element)
+            for class_name in element.get('class', '').split():
+                by_class.setdefault(class_name, []).append(element)
+
+    def _candidates(self, key):
+        if self.elements is None:
+            self._index()
+        
+        tag, id_, classes = key
+        if id_:
+            return self.elements['id'].get(id_, ())
+        if classes:
+            return min((self.elements['class'].get(c, ()) for c in classes), key=len)
+        return self.elements['tag'].get(tag, ())
+
+    def _run(self, css):
+        key, xpath = compile_selector(css)
+        if key is None:
+            return [_extract(v) for v in xpath(self.root)]
+
+        values = []
+        for element in self._candidates(key):
+            values.extend(_extract(v) for v in xpath(element))
+        return values
+
+    def match(self, css):
+        if css not in self.matches:
+            self.matches[css] = self._run(css)
+        return self.matches[css]
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import tempfile
+import logging; logger = logging.getLogger(__name__)
+
+from scrapy.utils.project import data_path
+
+
+def merge_counts(counts, delta):
+    """Add the counts of ``delta`` on ``counts``, samples of other selectors
+    than the ones of ``delta`` are replaced"""
+    for spider_name, fields in delta.items():
+        for field_name, field in fields.items():
+            into = counts.setdefault(spider_name, {}).setdefault(field_name, {})
+            tries = into.setdefault('tries', {})
+            for selector, (hits, misses) in field.get('tries', {}).items():
+                selector_tries = tries.setdefault(selector, [0, 0])
+                selector_tries[0] += hits
+                selector_tries[1] += misses
+
+            if 'sampled' not in field:
+                continue
+            sampled = into.get('sampled')
+            if sampled is None or sampled['selectors'] != field['sampled']['selectors']:
+                sampled = into['sampled'] = {'selectors': field['sampled']['selectors'],
+                                             'patterns': {}}
+            for pattern, count in field['sampled']['patterns'].items():
+                sampled['patterns'][pattern] = sampled['patterns'].get(pattern, 0) + count
+    return counts
+
+
+class SelectorStats(object):
+    """Hits and misses of each selector by spider and field
+
+    ``tries`` counts the selectors as ``load_item`` tries them, until the
+    first hit. One of ``sample_every`` pages of a field has all the selectors
+    tried, and the selectors that hit together are counted on ``sampled``.
+
+    With ``adaptive`` the selectors of a field are ordered by their hit rate
+    on the samples, once there are ``min_samples``, but a selector is only
+    tried before the ones of the spider that hit on the same pages, so the
+    value extracted is the same. The first selector of the spider wins the
+    ties.
+    """
+
+    def __init__(self, path, adaptive=False, min_samples=20, sample_every=20):
+        self.path = path
+        self.adaptive = adaptive
+        self.min_samples = min_samples
+        self.sample_every = sample_every
+        self.counts = None
+        # counts of this process not saved yet
+        self.delta = {}
+        self.pages = {}
+        self.orders = {}
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(data_path(settings.get('SELECTOR_STATS_FILE')),
+                   settings.getbool('SELECTOR_STATS_ADAPTIVE'),
+                   settings.getint('SELECTOR_STATS_MIN_SAMPLES', 20),
+                   settings.getint('SELECTOR_STATS_SAMPLE_EVERY', 20))
+
+    def _read(self):
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path) as f:
+                    return json.load(f)
+            except ValueError as e:
+                logger.warning('Ignoring invalid selector stats file %s: %s', self.path, e)
+        return {}
+
+    def load(self):
+        if self.counts is None:
+            self.counts = self._read()
+        return self.counts
+
+    def save(self):
+        """Add the counts of this process to the file, crawls of other
+        processes may have saved since it was loaded"""
+        counts = merge_counts(self._read(), self.delta)
+        dirname = os.path.dirname(self.path) or '.'
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=dirname)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(counts, f, indent=1, sort_keys=True, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.counts, self.delta = counts, {}
+        self.orders = {}
+
+    def _field(self, counts, spider_name, field_name):
+        return counts.setdefault(spider_name, {}).setdefault(field_name, {})
+
+    def record(self, spider_name, field_name, selector, hit):
+        for counts in (self.load(), self.delta):
+            tries = self._field(counts, spider_name, field_name).setdefault('tries', {})
+            tries.setdefault(selector, [0, 0])[0 if hit else 1] += 1
+
+    def sample(self, spider_name, field_name):
+        """If all the selectors of this page of the field must be tried"""
+        key = (spider_name, field_name)
+        self.pages[key] = self.pages.get(key, 0) + 1
+        return self.pages[key] % self.sample_every == 1 or self.sample_every == 1
+
+    def record_sample(self, spider_name, field_name, selectors, hits):
+        """Count the ``hits``, of all ``selectors`` tried on a page"""
+        selectors = list(selectors)
+        pattern = '\n'.join(s for s in selectors if s in hits)
+        for counts in (self.load(), self.delta):
+            merge_counts(counts, {spider_name: {field_name: {
+                'sampled': {'selectors': selectors, 'patterns': {pattern: 1}}}}})
+        self.orders.pop((spider_name, field_name), None)
+
+    def hit_rate(self, spider_name, field_name, selector):
+        """Hits of ``selector`` by tries, after the misses of the selectors
+        tried before it"""
+        tries = self._field(self.load(), spider_name, field_name).get('tries', {})
+        hits, misses = tries.get(selector, (0, 0))
+        return hits / float(hits + misses) if hits + misses else None
+
+    def order(self, spider_name, field_name, selectors):
+        if not self.adaptive:
+            return selectors
+
+        key = (spider_name, field_name)
+        if key not in self.orders:
+            self.orders[key] = self._order(spider_name, field_name, selectors)
+        return self.orders[key]
+
+    def _order(self, spider_name, field_name, selectors):
+        sampled = self._field(self.load(), spider_name, field_name).get('sampled')
+        if not sampled or sampled['selectors'] != list(selectors) \
+        or sum(sampled['patterns'].values()) < self.min_samples:
+            return selectors
+
+        hits, together = dict((s, 0) for s in selectors), set()
+        for pattern, count in sampled['patterns'].items():
+            pattern_hits = pattern.split('\n') if pattern else []
+            for selector in pattern_hits:
+                hits[selector] += count
+            together.update((a, b) for a in pattern_hits for b in pattern_hits if a != b)
+
+        # the best selector that no selector before it on the spider hits
+        # together with
+        remaining, ordered = list(selectors), []
+        while remaining:
+            ready = [s for i, s in enumerate(remaining)
+                     if not any((t, s) in together for t in remaining[:i])]
+            best = max(ready, key=lambda s: (hits[s], -remaining.index(s)))
+            ordered.append(best)
+            remaining.remove(best)
+        return ordered
+
+    def dead_selectors(self):
+        """Yield ``(spider, field, selector, tries)`` of selectors without hits"""
+        for spider_name, fields in sorted(self.load().items()):
+            for field_name, field in sorted(fields.items()):
+                for selector, (hits, misses) in sorted(field.get('tries', {}).items()):
+                    if not hits and misses >= self.min_samples:
+                        yield spider_name, field_name, selector, misses
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+import re
+import sqlite3
+import hashlib
+import threading
+
+from scrapy.utils.project import data_path
+
+from . import import_module_timed
+
+
+class SimHasher(object):
+    """64 bits SimHash of the word shingles of texts
+
+    Hashes of the tokens are combined by shingle and the bits voted with
+    NumPy arrays, texts that share most shingles get fingerprints at a small
+    Hamming distance.
+    """
+
+    # golden ratio, odd multiplier that spreads the bits of the shingles
+    mix = 0x9E3779B97F4A7C15
+    token_re = re.compile(r'\w+')
+
+    def __init__(self, shingle_size=3):
+        if not 0 < shingle_size <= 9:
+            raise ValueError('Shingle size must be between 1 and 9')
+
+        self.np = import_module_timed('numpy')
+        self.shingle_size = shingle_size
+        self.bits = self.np.arange(64, dtype=self.np.uint64)
+
+    def tokens_hashes(self, tokens):
+        # each distinct token is hashed once, stable between processes
+        np = self.np
+        unique = {}
+        indexes = [unique.setdefault(t, len(unique)) for t in tokens]
+        hashes = np.array([int.from_bytes(hashlib.sha1(t.encode('utf-8')).digest()[:8],
+                                          'little') for t in unique], dtype=np.uint64)
+        return hashes[np.array(indexes, dtype=np.intp)]
+
+    def fingerprint(self, text):
+        np = self.np
+        tokens = self.token_re.findall(text.lower())
+        if not tokens:
+            return None
+        
+        hashes = self.tokens_hashes(tokens)
+        size = min(self.shingle_size, len(hashes))
+        count = len(hashes) - size + 1
+        shingles = np.zeros(count, dtype=np.uint64)
+        for i in range(size):
+            # rotated by position on the shingle, "a b" isn't "b a"
+            part = hashes[i:i + count]
+            if i:
+                part = (part << np.uint64(7 * i)) | (part >> np.uint64(64 - 7 * i))
+            shingles ^= part
+        shingles *= np.uint64(self.mix)
+        
+        ones = ((shingles[:, None] >> self.bits) & np.uint64(1)).sum(axis=0)
+        return int(((ones * 2 > count).astype(np.uint64) << self.bits).sum())
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class SimHashIndex(object):
+    """Banded LSH index of SimHash fingerprints on SQLite
+
+    The 64 bits are split on ``max_distance + 1`` bands, fingerprints at
+    distance up to ``max_distance`` share at least a band, so a lookup is an
+    indexed query by band and a distance check of few candidates. Each add
+    is committed, the workers of a sharded crawl share the file. ``match``
+    runs off the reactor, calls are serialized by a lock.
+    """
+
+    schema = '''
+        PRAGMA journal_mode=WAL;
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY, url TEXT UNIQUE NOT NULL,
+            fingerprint INTEGER NOT NULL, cluster INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS bands (
+            band INTEGER NOT NULL, value INTEGER NOT NULL, document INTEGER NOT NULL);
+        CREATE INDEX IF NOT EXISTS bands_value ON bands (band, value);
+    '''
+
+    def __init__(self, path, max_distance=3):
+        self.path = data_path(path) if path != ':memory:' else path
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width = 64 // bands
+        self.bands = [(i * width, width if i < bands - 1 else 64 - i * width)
+                      for i in range(bands)]
+        self.db = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.get('NEAR_DUPLICATES_FILE'),
+                   settings.getint('NEAR_DUPLICATES_MAX_DISTANCE'))
+
+    def open(self):
+        self.db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.db.executescript(self.schema)
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+    @staticmethod
+    def _signed(fingerprint):
+        # SQLite integers are signed 64 bits
+        return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+    def _bands_values(self, fingerprint):
+        return [(i, (fingerprint >> start) & ((1 << width) - 1))
+                for i, (start, width) in enumerate(self.bands)]
+
+    def lookup(self, fingerprint):
+        """Nearest document, ``(url, fingerprint, cluster, distance)``, or None"""
+        bands_values = self._bands_values(fingerprint)
+        rows = self.db.execute(
+            'SELECT DISTINCT d.url, d.fingerprint, d.cluster FROM bands b '
+            'JOIN documents d ON d.id = b.document WHERE %s'
+            % ' OR '.join(['(b.band = ? AND b.value = ?)'] * len(bands_values)),
+            [v for band_value in bands_values for v in band_value])
+        
+        nearest = None
+        for url, candidate, cluster in rows:
+            distance = hamming_distance(fingerprint, candidate & ((1 << 64) - 1))
+            if distance <= self.max_distance and (nearest is None or distance < nearest[3]):
+                nearest = (url, candidate & ((1 << 64) - 1), cluster, distance)
+        return nearest
+
+    def match(self, url, fingerprint):
+        """Index the document on the cluster of its nearest, return the url of
+        the first document of the cluster and the distance, or None"""
+        with self.lock:
+            nearest = self.lookup(fingerprint)
+            if nearest is None:
+                self.add(url, fingerprint)
+                return None
+            
+            nearest_url, _, cluster, distance = nearest
+            self.add(url, fingerprint, cluster)
+            return self.cluster_url(cluster) or nearest_url, distance
+
+    def cluster_url(self, cluster):
+        row = self.db.execute('SELECT url FROM documents WHERE id = ?', (cluster,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, url, fingerprint, cluster=None):
+        """Index the document on ``cluster``, a new one without it"""
+        # committed on exit, the write lock isn't held between items
+        with self.db:
+            cursor = self.db.execute(
+                'INSERT OR IGNORE INTO documents (url, fingerprint, cluster) VALUES (?, ?, ?)',
+                (url, self._signed(fingerprint), cluster or 0))
+            if not cursor.rowcount:
+                return
+            
+            document = cursor.lastrowid
+            if cluster is None:
+                self.db.execute('UPDATE documents SET cluster = id WHERE id = ?', (document,))
+            self.db.executemany('INSERT INTO bands VALUES (?, ?, ?)',
+                                [(band, value, document) for band, value in
+                                 self._bands_values(fingerprint)])
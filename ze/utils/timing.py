@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import math
+import time
+from functools import wraps
+from contextlib import contextmanager
+
+
+class StageTimer(object):
+    """Seconds and calls of the stages of the extraction
+
+    Methods are timed by ``instrument``, that replace them on their class
+    while the context is open.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+
+    def add(self, stage, seconds):
+        self.seconds[stage] = self.seconds.get(stage, 0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    @contextmanager
+    def stage(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def timed(self, func, stage):
+        @wraps(func)
+        def timed_func(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed_func
+
+    @contextmanager
+    def instrument(self, stages):
+        """Time the methods of ``stages``, ``{stage: (cls, method_name)}``"""
+        originals = []
+        for stage, (cls, method_name) in stages.items():
+            original = cls.__dict__.get(method_name)
+            originals.append((cls, method_name, original))
+            setattr(cls, method_name, self.timed(getattr(cls, method_name), stage))
+        try:
+            yield self
+        finally:
+            for cls, method_name, original in originals:
+                if original is None:
+                    delattr(cls, method_name)
+                else:
+                    setattr(cls, method_name, original)
+
+
+class Histogram(object):
+    """Count of values on logarithmic buckets
+
+    Each bucket is ``growth`` times wider than the previous, so percentiles
+    are kept with a relative error of the bucket width in constant memory.
+    """
+
+    def __init__(self, growth=2 ** 0.25, minimum=1e-6):
+        self.log_growth = math.log(growth)
+        self.minimum = minimum
+        self.buckets = {}
+        self.count = 0
+        self.sum = 0.0
+
+    def _index(self, value):
+        # bucket i holds the values from minimum * growth ** i up to the next
+        return int(math.log(value / self.minimum) / self.log_growth) \
+               if value > self.minimum else 0
+
+    def add(self, value):
+        index = self._index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, percent):
+        if not self.count:
+            return None
+        
+        rank = percent / 100.0 * self.count; seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # geometric middle of the bucket
+                return self.minimum * math.exp((index + 0.5) * self.log_growth)
+
+    def cumulative(self, bound):
+        """Count of values of the buckets below the bucket of ``bound``, all
+        of them up to ``bound``, so it never decreases as ``bound`` grows"""
+        bound_index = self._index(bound)
+        return sum(count for index, count in self.buckets.items() if index < bound_index)
+
+    def summary(self, scale=1):
+        """Count, sum and percentiles 50, 95 and 99 of values times ``scale``"""
+        summary = {'count': self.count, 'sum': self.sum * scale}
+        for percent in (50, 95, 99):
+            value = self.percentile(percent)
+            summary['p%d' % percent] = value * scale if value is not None else None
+        return summary
+
+
+class Timings(object):
+    """Latency histograms of the stages of spiders, in seconds"""
+
+    def __init__(self):
+        self.histograms = {}
+
+    def add(self, spider_name, stage, seconds):
+        key = (spider_name, stage)
+        if key not in self.histograms:
+            self.histograms[key] = Histogram()
+        self.histograms[key].add(seconds)
+
+    @contextmanager
+    def time(self, spider_name, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(spider_name, stage, time.perf_counter() - start)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, process
+import logging; logger = logging.getLogger(__name__)
+
+from twisted.internet import defer, reactor, threads
+from scrapy.utils.misc import walk_modules
+
+from . import import_class
+from ..items import run_deferred_processor
+
+
+_item_classes = {}
+
+
+def warm(modules):
+    """Import the processors registries once in the worker process
+
+    Packages are imported with all their modules, like the ``improve_html``
+    functions of spiders.
+    """
+    for module in modules:
+        try:
+            walk_modules(module)
+        except ImportError as e:
+            logger.warning('Worker can\'t import %s: %s', module, e)
+    return os.getpid()
+
+
+def initialize(modules, initializer=None):
+    """Prepare each worker process when it starts, before any task"""
+    warm(modules)
+    if initializer:
+        initializer()
+
+
+def _initialized_worker(initargs, call_queue, result_queue):
+    initialize(*initargs)
+    process._process_worker(call_queue, result_queue)
+
+
+class InitializedProcessPoolExecutor(ProcessPoolExecutor):
+    """``ProcessPoolExecutor`` with ``initializer`` on python < 3.7
+
+    The processes are spawned with the same arguments of the executor of
+    these versions, but run ``initialize`` before taking tasks.
+    """
+
+    def __init__(self, max_workers, initargs):
+        super(InitializedProcessPoolExecutor, self).__init__(max_workers)
+        self._initargs = initargs
+
+    def _adjust_process_count(self):
+        for _ in range(len(self._processes), self._max_workers):
+            p = multiprocessing.Process(
+                    target=_initialized_worker,
+                    args=(self._initargs, self._call_queue, self._result_queue))
+            p.start()
+            self._processes[p.pid] = p
+
+
+def run_deferred_processors(item_class_path, deferred, media_fields=()):
+    """Run the processors of ``deferred`` fields in a worker process
+
+    Return the processed values and the ``src`` of images of the html fields
+    in ``media_fields``.
+    """
+    if item_class_path not in _item_classes:
+        _item_classes[item_class_path] = import_class(item_class_path)
+    item = _item_classes[item_class_path]()
+
+    for field_name, (context, calls) in deferred.items():
+        run_deferred_processor(item, field_name, calls, context)
+
+    if media_fields:
+        from bs4 import BeautifulSoup
+    media_urls = {}
+    for field_name in media_fields:
+        if item.get(field_name):
+            html = BeautifulSoup(item[field_name], 'html.parser')
+            media_urls[field_name] = [img['src'] for img in html.findAll('img')
+                                      if img.get('src')]
+
+    return dict(item), media_urls
+
+
+class ProcessPool(object):
+    """``ProcessPoolExecutor`` that returns Deferreds to the reactor thread
+
+    At most ``queue_size`` calls wait or run at same time, the others wait on
+    the reactor without holding memory of the workers. Every worker imports
+    ``warm_modules`` and runs ``initializer`` when it starts.
+    """
+
+    def __init__(self, max_workers=None, queue_size=None, warm_modules=(), initializer=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.semaphore = defer.DeferredSemaphore(queue_size or self.max_workers * 2)
+        self.warm_modules = warm_modules
+        self.initializer = initializer
+        self.executor = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings.getint('PROCESS_POOL_MAX_WORKERS'),
+                   settings.getint('PROCESS_POOL_QUEUE_SIZE'),
+                   [m.strip() for m in settings.getlist('PROCESS_POOL_WARM_MODULES')])
+
+    def start(self):
+        initargs = (self.warm_modules, self.initializer)
+        if sys.version_info >= (3, 7):
+            self.executor = ProcessPoolExecutor(self.max_workers, initializer=initialize,
+                                                initargs=initargs)
+        else:
+            self.executor = InitializedProcessPoolExecutor(self.max_workers, initargs)
+        logger.info('Process pool started with %d workers', self.max_workers)
+
+    def stop(self):
+        return threads.deferToThread(self.executor.shutdown, True)
+
+    def submit(self, func, *args):
+        return self.semaphore.run(self._submit, func, *args)
+
+    def _submit(self, func, *args):
+        d = defer.Deferred()
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(lambda f: reactor.callFromThread(self._done, d, f))
+        return d
+
+    def _done(self, d, future):
+        try:
+            result = future.result()
+        except Exception:
+            d.errback()
+        else:
+            d.callback(result)